@@ -0,0 +1,78 @@
+"""Benchmarks for aggregating census data."""
+
+from progressphl_data.datasources.census import agg as census_agg
+
+from .common import INCOME_BINS, get_income_data, get_tracts, require
+
+try:
+    from progressphl_data.census_indicators import (
+        AGE_GROUPS,
+        _calculate_age_group_shares,
+    )
+except ImportError:
+    AGE_GROUPS = _calculate_age_group_shares = None
+
+try:
+    from progressphl_data.synthetic import make_acs_data
+except ImportError:
+    make_acs_data = None
+
+
+class ApproximateMedian:
+    def setup(self):
+        self.range_list = [
+            dict(min=lower, max=upper, n=n)
+            for (lower, upper, _), n in zip(INCOME_BINS, range(10, 170, 10))
+        ]
+
+    def time_approximate_median(self):
+        census_agg.approximate_median(self.range_list, sampling_percentage=5 * 2.5)
+
+
+class AggregateMedianData:
+    """Aggregate binned household income from tracts to neighborhoods."""
+
+    def setup(self):
+        tracts = get_tracts().merge(
+            census_agg.get_tract_neighborhood_crosswalk()[
+                ["tract_geoid_alt", "neighborhood_name"]
+            ],
+            left_on="id",
+            right_on="tract_geoid_alt",
+        )
+        self.data = get_income_data(tracts["neighborhood_name"])
+
+    def time_aggregate_median_data(self):
+        census_agg.aggregate_median_data(self.data, INCOME_BINS, "group")
+
+
+class TractsToNeighborhoods:
+    """Sum ACS estimates from tracts to neighborhoods."""
+
+    params = [5, 20]
+    param_names = ["n_variables"]
+
+    def setup(self, n_variables):
+        require(make_acs_data)
+        self.data = make_acs_data(get_tracts(), variables=n_variables)
+
+    def time_tracts_to_neighborhoods(self, n_variables):
+        census_agg.tracts_to_neighborhoods(self.data)
+
+
+class SexByAge:
+    """Sum B01001 age buckets into age groups and divide by the universe."""
+
+    def setup(self):
+        require(_calculate_age_group_shares, make_acs_data)
+        buckets = [b for group in AGE_GROUPS.values() for b in group]
+        variables = ["universe"] + [
+            f"{sex}_{b}" for sex in ["male", "female"] for b in ["total"] + buckets
+        ]
+        self.data = make_acs_data(get_tracts(), variables=variables)
+
+    def time_calculate_age_group_shares(self):
+        _calculate_age_group_shares(self.data)
+
+    def peakmem_calculate_age_group_shares(self):
+        _calculate_age_group_shares(self.data)
@@ -0,0 +1,55 @@
+"""Benchmarks for lookups in the indicator cube, against filtering long frames."""
+
+import tempfile
+
+from .common import get_census_output, require
+
+try:
+    from progressphl_data.cube import IndicatorCube, build_cube
+    from progressphl_data.etl import SPI_OUTPUT_COLUMNS
+    from progressphl_data.synthetic import (
+        make_crosswalks,
+        make_spi_dataset,
+        make_tracts,
+    )
+except ImportError:
+    IndicatorCube = build_cube = None
+
+
+class CubeLookups:
+    """Look up values by geography and indicator."""
+
+    params = [384, 10_000]
+    param_names = ["n_tracts"]
+    timeout = 600
+
+    def setup(self, n_tracts):
+        require(build_cube)
+        crosswalk, _ = make_crosswalks(make_tracts(n_tracts))
+        self.spi = make_spi_dataset(n_tracts).to_frame()[SPI_OUTPUT_COLUMNS]
+        self.census = get_census_output(list(crosswalk["tract_name"]))
+        self.cube = build_cube(self.spi, self.census, crosswalk=crosswalk)
+
+        self.geoid = crosswalk["tract_geoid_alt"].iloc[len(crosswalk) // 2]
+        self.variable = self.spi["variable"].iloc[0]
+
+        self.folder = tempfile.mkdtemp()
+        self.cube.save(self.folder)
+
+    def time_get(self, n_tracts):
+        self.cube.get(self.geoid, self.variable)
+
+    def time_indicator(self, n_tracts):
+        self.cube.indicator(self.variable)
+
+    def time_geography(self, n_tracts):
+        self.cube.geography(self.geoid)
+
+    def time_query_indicator(self, n_tracts):
+        self.spi.query("variable == @self.variable")
+
+    def time_query_geography(self, n_tracts):
+        self.spi.query("geoid == @self.geoid")
+
+    def time_load_mmap(self, n_tracts):
+        IndicatorCube.load(self.folder)
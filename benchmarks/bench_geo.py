@@ -0,0 +1,40 @@
+"""Benchmarks for spatial operations."""
+
+import inspect
+
+from progressphl_data.crosswalk import _calculate_crosswalk
+from progressphl_data.datasources import get_count_by_geography
+
+from .common import get_neighborhoods, get_points, get_tracts
+
+
+class CalculateCrosswalk:
+    def setup(self):
+        self.tracts = get_tracts()
+        self.neighborhoods = get_neighborhoods()
+
+    def time_calculate_crosswalk(self):
+        _calculate_crosswalk(self.tracts, self.neighborhoods, inner_id_column="id")
+
+
+class CountByGeography:
+    """Count random points by tract and neighborhood."""
+
+    params = ([10_000, 100_000], ["tract", "neighborhood"])
+    param_names = ["n_points", "geography"]
+
+    def setup(self, n_points, geography):
+        # Older commits can only count within the downloaded boundaries
+        if "boundaries" not in inspect.signature(get_count_by_geography).parameters:
+            raise NotImplementedError("Not available at this commit")
+
+        if geography == "tract":
+            self.boundaries = get_tracts()
+        else:
+            self.boundaries = get_neighborhoods()
+        self.points = get_points(self.boundaries, n_points)
+
+    def time_get_count_by_geography(self, n_points, geography):
+        get_count_by_geography(
+            self.points, geography=geography, boundaries=self.boundaries
+        )
@@ -0,0 +1,133 @@
+"""
+Benchmarks on synthetic data, scaled from a city to the whole country.
+
+Run with ``asv run --bench bench_scale`` and chart time and peak memory
+against the number of tracts with ``asv publish && asv preview``.
+"""
+
+from progressphl_data.datasources import get_count_by_geography
+from progressphl_data.datasources.census import agg as census_agg
+
+from .common import INCOME_BINS, get_income_data, get_points, require
+
+try:
+    from progressphl_data.etl import SPI_OUTPUT_COLUMNS
+    from progressphl_data.serialize import (
+        grouped_records_to_json,
+        grouped_to_columnar,
+    )
+except ImportError:
+    grouped_records_to_json = grouped_to_columnar = None
+
+try:
+    from progressphl_data.synthetic import (
+        make_acs_data,
+        make_block_groups,
+        make_crosswalks,
+        make_spi_dataset,
+        make_tracts,
+    )
+except ImportError:
+    make_acs_data = make_block_groups = make_crosswalks = None
+    make_spi_dataset = make_tracts = None
+
+# From Philadelphia to the ~85k tracts in the US
+N_TRACTS = [384, 10_000, 85_000]
+
+
+class SPIScale:
+    """Build the SPI output for synthetic tracts."""
+
+    params = N_TRACTS
+    param_names = ["n_tracts"]
+    timeout = 600
+
+    # Time cold calls on a new dataset
+    number = 1
+    repeat = 3
+    warmup_time = 0
+
+    def setup(self, n_tracts):
+        require(make_spi_dataset)
+        self.dataset = make_spi_dataset(n_tracts)
+
+    def time_to_frame(self, n_tracts):
+        self.dataset.to_frame()
+
+    def peakmem_to_frame(self, n_tracts):
+        self.dataset.to_frame()
+
+
+class SerializationScale:
+    """Serialize the SPI output for synthetic tracts."""
+
+    params = (N_TRACTS, ["records", "columnar"])
+    param_names = ["n_tracts", "output_format"]
+    timeout = 600
+
+    def setup(self, n_tracts, output_format):
+        require(make_spi_dataset, grouped_to_columnar)
+        self.spi = make_spi_dataset(n_tracts).to_frame()[SPI_OUTPUT_COLUMNS]
+
+    def _serialize(self, output_format):
+        if output_format == "columnar":
+            return grouped_to_columnar(
+                self.spi,
+                by="variable",
+                dictionary_columns=["geoid", "neighborhood_name", "puma_name"],
+                decimals={"value": 2, "rank": 0},
+            )
+        return grouped_records_to_json(self.spi, by="variable")
+
+    def time_serialize_spi(self, n_tracts, output_format):
+        self._serialize(output_format)
+
+    def peakmem_serialize_spi(self, n_tracts, output_format):
+        self._serialize(output_format)
+
+
+class CensusAggregationScale:
+    """Aggregate ACS-shaped data from tracts to neighborhoods."""
+
+    params = N_TRACTS
+    param_names = ["n_tracts"]
+    timeout = 1200
+
+    def setup(self, n_tracts):
+        require(make_tracts)
+        tracts = make_tracts(n_tracts)
+        self.crosswalk, _ = make_crosswalks(tracts)
+        self.data = make_acs_data(tracts, variables=5)
+        self.income = get_income_data(self.crosswalk["neighborhood_name"])
+
+    def time_tracts_to_neighborhoods(self, n_tracts):
+        census_agg.tracts_to_neighborhoods(self.data, crosswalk=self.crosswalk)
+
+    def time_aggregate_median_data(self, n_tracts):
+        census_agg.aggregate_median_data(self.income, INCOME_BINS, "group")
+
+
+class BlockGroupScale:
+    """Generate and count points by block group (3 per tract, ~255k total)."""
+
+    params = N_TRACTS
+    param_names = ["n_tracts"]
+    timeout = 600
+
+    def setup(self, n_tracts):
+        require(make_block_groups)
+        self.block_groups = make_block_groups(make_tracts(n_tracts))
+        self.points = get_points(self.block_groups, 2 * len(self.block_groups))
+
+    def time_get_count_by_geography(self, n_tracts):
+        get_count_by_geography(
+            self.points, geography="tract", boundaries=self.block_groups
+        )
+
+    def peakmem_get_count_by_geography(self, n_tracts):
+        get_count_by_geography(
+            self.points, geography="tract", boundaries=self.block_groups
+        )
+
+    def track_n_block_groups(self, n_tracts):
+        return len(self.block_groups)
@@ -0,0 +1,90 @@
+"""Benchmarks for serializing the ETL outputs."""
+
+from pathlib import Path
+
+from .common import get_census_output, get_tracts, require
+
+try:
+    from progressphl_data.etl import Output, _serialize_spi, get_spi_output
+except ImportError:
+    Output = _serialize_spi = get_spi_output = None
+
+try:
+    from progressphl_data.serialize import (
+        bundle,
+        compress,
+        dumps,
+        records_to_json,
+        to_columnar,
+    )
+except ImportError:
+    bundle = compress = dumps = records_to_json = to_columnar = None
+
+
+class SPISerialization:
+    """Serialize the SPI output, grouped by variable."""
+
+    params = (["1", "2"], ["records", "columnar"])
+    param_names = ["version", "output_format"]
+
+    def setup(self, version, output_format):
+        require(_serialize_spi)
+        self.spi = get_spi_output(version=version)
+        self.output = Output(
+            publisher=None,
+            version=version,
+            folder=Path("."),
+            output_format=output_format,
+        )
+
+    def time_serialize_spi(self, version, output_format):
+        _serialize_spi(self.spi, self.output)
+
+    def peakmem_serialize_spi(self, version, output_format):
+        _serialize_spi(self.spi, self.output)
+
+
+class CensusSerialization:
+    """Serialize the census indicators for each name and bundle them."""
+
+    params = ["records", "columnar"]
+    param_names = ["output_format"]
+
+    def setup(self, output_format):
+        require(bundle)
+        names = get_tracts()["name"].tolist()
+        self.groups = [
+            df.drop(columns=["name"])
+            for _, df in get_census_output(names).groupby("name")
+        ]
+
+    def time_serialize_census(self, output_format):
+        payloads = {}
+        for i, df in enumerate(self.groups):
+            if output_format == "columnar":
+                payloads[i] = dumps(
+                    to_columnar(
+                        df, dictionary_columns=["indicator"], decimals={"estimate": 4}
+                    )
+                )
+            else:
+                payloads[i] = records_to_json(df)
+        bundle(payloads)
+
+
+class Compression:
+    params = ["gzip", "br"]
+    param_names = ["encoding"]
+
+    def setup(self, encoding):
+        require(_serialize_spi, compress)
+        if encoding == "br":
+            try:
+                import brotli  # noqa: F401
+            except ImportError:
+                raise NotImplementedError("brotli is not installed")
+        output = Output(publisher=None, version="2", folder=Path("."))
+        self.body = _serialize_spi(get_spi_output(version="2"), output)
+
+    def time_compress(self, encoding):
+        compress(self.body, encoding)
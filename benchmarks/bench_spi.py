@@ -0,0 +1,96 @@
+"""Benchmarks for loading and reshaping the SPI data."""
+
+from progressphl_data.core import get_spi_data
+
+from .common import require
+
+try:
+    from progressphl_data.core import get_spi_dataset, load_spi_workbook
+except ImportError:
+    get_spi_dataset = load_spi_workbook = None
+
+try:
+    from progressphl_data.ranks import RankIndex
+    from progressphl_data.synthetic import make_spi_dataset
+except ImportError:
+    RankIndex = None
+
+
+class SPIData:
+    """Build the SPI output from the cached workbook."""
+
+    params = ["1", "2"]
+    param_names = ["version"]
+
+    # Time cold calls: reset the memoized dataset before each one
+    number = 1
+    repeat = 10
+    warmup_time = 0
+
+    def setup(self, version):
+        require(get_spi_dataset)
+        load_spi_workbook(version=version)
+        get_spi_dataset.cache_clear()
+
+    def time_get_spi_data(self, version):
+        get_spi_data(version=version)
+
+    def peakmem_get_spi_data(self, version):
+        get_spi_data(version=version)
+
+
+class SPIDataSubset:
+    """Filter a memoized dataset by variable and geography."""
+
+    params = ["1", "2"]
+    param_names = ["version"]
+
+    def setup(self, version):
+        require(get_spi_dataset)
+        self.dataset = get_spi_dataset(version=version)
+        self.variable = self.dataset.meta.names[0]
+
+        # Warm up the memoized values
+        self.dataset.to_frame()
+
+    def time_to_frame(self, version):
+        self.dataset.to_frame()
+
+    def time_to_frame_variable(self, version):
+        self.dataset.to_frame(variables=[self.variable], expand=False)
+
+
+class RankLookups:
+    """Answer "compare" queries from the rank index, against re-ranking the data."""
+
+    params = [384, 10_000]
+    param_names = ["n_tracts"]
+
+    def setup(self, n_tracts):
+        require(RankIndex)
+        self.dataset = make_spi_dataset(n_tracts)
+        self.index = RankIndex.from_dataset(self.dataset)
+        self.variable = self.dataset.meta.names[0]
+        self.geoid = self.index.geoids[n_tracts // 2]
+
+    def time_build_index(self, n_tracts):
+        RankIndex.from_dataset(self.dataset)
+
+    def time_locate(self, n_tracts):
+        self.index.locate(self.geoid, self.variable)
+
+    def time_top_decile(self, n_tracts):
+        self.index.top(self.variable, percent=10)
+
+    def time_rerank_locate(self, n_tracts):
+        values = self.dataset.values[self.variable]
+        sign = -1.0 if self.variable not in self.dataset.meta.inverted else 1.0
+        ranks = (values * sign).rank(method="min")
+        ranks.xs(self.geoid, level="geoid")
+
+    def time_rerank_top_decile(self, n_tracts):
+        values = self.dataset.values[self.variable]
+        if self.variable in self.dataset.meta.inverted:
+            values[values <= values.quantile(0.1)].sort_values()
+        else:
+            values[values >= values.quantile(0.9)].sort_values(ascending=False)
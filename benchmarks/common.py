@@ -0,0 +1,109 @@
+"""Offline fixtures shared by the benchmarks."""
+
+from __future__ import annotations
+
+from functools import lru_cache
+
+import geopandas as gpd
+import numpy as np
+import pandas as pd
+
+from progressphl_data import DATA_DIR
+
+# Household income bins, as (min, max, column)
+INCOME_BINS = [
+    (2499, 9999, "less_than_10k"),
+    (10000, 14999, "10k_to_15k"),
+    (15000, 19999, "15k_to_20k"),
+    (20000, 24999, "20k_to_25k"),
+    (25000, 29999, "25k_to_30k"),
+    (30000, 34999, "30k_to_35k"),
+    (35000, 39999, "35k_to_40k"),
+    (40000, 44999, "40k_to_45k"),
+    (45000, 49999, "45k_to_50k"),
+    (50000, 59999, "50k_to_60k"),
+    (60000, 74999, "60k_to_75k"),
+    (75000, 99999, "75k_to_100k"),
+    (100000, 124999, "100k_to_125k"),
+    (125000, 149999, "125k_to_150k"),
+    (150000, 199999, "150k_to_200k"),
+    (200000, 250001, "more_than_200k"),
+]
+
+
+@lru_cache(maxsize=None)
+def _read_crosswalk() -> gpd.GeoDataFrame:
+    return gpd.read_file(DATA_DIR / "tract-neighborhood-crosswalk.geojson")
+
+
+def get_tracts() -> gpd.GeoDataFrame:
+    """Census tracts, from the cached crosswalk (no network access)."""
+    return (
+        _read_crosswalk()
+        .rename(columns={"tract_geoid_alt": "id", "tract_name_alt": "name"})[
+            ["id", "name", "geometry"]
+        ]
+        .sort_values("id", ignore_index=True)
+    )
+
+
+def get_neighborhoods() -> gpd.GeoDataFrame:
+    """Neighborhoods, dissolved from the cached crosswalk."""
+    return (
+        _read_crosswalk()
+        .dissolve("neighborhood_id")[["geometry", "neighborhood_name"]]
+        .reset_index()
+        .rename(columns={"neighborhood_id": "id", "neighborhood_name": "name"})
+    )
+
+
+def get_income_data(groups: pd.Series, seed: int = 42) -> pd.DataFrame:
+    """Household counts in each income bin, with a column to group by."""
+    rng = np.random.default_rng(seed)
+    counts = rng.integers(0, 200, (len(groups), len(INCOME_BINS)))
+    return pd.DataFrame(counts, columns=[b[-1] for b in INCOME_BINS]).assign(
+        group=groups.to_numpy()
+    )
+
+
+def get_points(
+    boundaries: gpd.GeoDataFrame, n: int, seed: int = 42
+) -> gpd.GeoDataFrame:
+    """Random points within the bounding box of the boundaries."""
+    rng = np.random.default_rng(seed)
+    xmin, ymin, xmax, ymax = boundaries.total_bounds
+    return gpd.GeoDataFrame(
+        geometry=gpd.points_from_xy(
+            rng.uniform(xmin, xmax, n), rng.uniform(ymin, ymax, n)
+        ),
+        crs=boundaries.crs,
+    )
+
+
+def get_census_output(
+    names: list[str], n_indicators: int = 60, seed: int = 42
+) -> pd.DataFrame:
+    """A frame shaped like the output of ``get_census_indicators()``."""
+    rng = np.random.default_rng(seed)
+    indicators = [f"indicator_{i}" for i in range(n_indicators)]
+    n = len(names) * n_indicators
+    return pd.DataFrame(
+        {
+            "name": np.repeat(names, n_indicators),
+            "estimate": rng.uniform(0, 1e5, n),
+            "indicator": np.tile(indicators, len(names)),
+        }
+    )
+
+
+def require(*apis):
+    """
+    Skip a benchmark if any of the APIs it uses are missing.
+
+    asv runs the current benchmarks against older commits (e.g., with
+    ``asv run <sha>..HEAD``), where newer APIs don't exist yet. They are
+    imported with a fallback of None, and benchmarks that use them are
+    skipped by raising NotImplementedError in ``setup``.
+    """
+    if any(api is None for api in apis):
+        raise NotImplementedError("Not available at this commit")
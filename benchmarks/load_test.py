@@ -0,0 +1,147 @@
+"""
+Load test a running query service (``progressphl-data serve``).
+
+Sends a random mix of lookups from concurrent clients, each over its own
+keep-alive connection, and reports the throughput and latency percentiles.
+With ``--revalidate``, clients send the ETag of their last response for
+each URL, so repeated lookups are answered with 304s.
+
+Usage:
+
+    poetry run python -m benchmarks.load_test --requests 5000 --concurrency 16
+"""
+
+from __future__ import annotations
+
+import argparse
+import http.client
+import json
+import random
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlencode, urlsplit
+
+import numpy as np
+
+
+def get_paths(summary: dict, n: int, seed: int = 42) -> list[str]:
+    """Return a random mix of lookups, using the values in the service summary."""
+    rng = random.Random(seed)
+    n_tracts = len(summary["geoid"])
+
+    def spi_by(param):
+        return lambda: {param: rng.choice(summary[param])}
+
+    def spi_by_rank():
+        start = rng.randint(1, max(n_tracts - 10, 1))
+        return {
+            "variable": rng.choice(summary["variable"]),
+            "min_rank": start,
+            "max_rank": start + 9,
+        }
+
+    def census_by_name():
+        return {"name": rng.choice(summary["name"])}
+
+    lookups = [
+        ("/spi", spi_by("geoid")),
+        ("/spi", spi_by("neighborhood")),
+        ("/spi", spi_by("puma")),
+        ("/spi", spi_by("variable")),
+        ("/spi", spi_by_rank),
+        ("/census", census_by_name),
+    ]
+
+    paths = []
+    for _ in range(n):
+        path, get_query = rng.choice(lookups)
+        paths.append(f"{path}?{urlencode(get_query())}")
+    return paths
+
+
+def _run_client(
+    host: str, port: int, paths: list[str], gzip: bool, revalidate: bool
+) -> tuple[list[float], Counter, int]:
+    """Send requests over one connection; return latencies, statuses, and bytes."""
+    connection = http.client.HTTPConnection(host, port)
+    etags: dict[str, str] = {}
+    latencies = []
+    statuses = Counter()
+    n_bytes = 0
+
+    for path in paths:
+        headers = {"Accept-Encoding": "gzip"} if gzip else {}
+        if revalidate and path in etags:
+            headers["If-None-Match"] = etags[path]
+
+        start = time.perf_counter()
+        connection.request("GET", path, headers=headers)
+        response = connection.getresponse()
+        body = response.read()
+        latencies.append(time.perf_counter() - start)
+
+        statuses[response.status] += 1
+        n_bytes += len(body)
+        if response.getheader("ETag"):
+            etags[path] = response.getheader("ETag")
+
+    connection.close()
+    return latencies, statuses, n_bytes
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0].strip())
+    parser.add_argument("--url", default="http://127.0.0.1:8000")
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--unique", type=int, default=500, help="Distinct lookups")
+    parser.add_argument("--no-gzip", action="store_true")
+    parser.add_argument("--revalidate", action="store_true")
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    url = urlsplit(args.url)
+    host, port = url.hostname, url.port or 80
+
+    # Build the mix of lookups from the service summary
+    connection = http.client.HTTPConnection(host, port)
+    connection.request("GET", "/")
+    summary = json.loads(connection.getresponse().read())
+    connection.close()
+    unique = get_paths(summary, args.unique, seed=args.seed)
+    rng = random.Random(args.seed)
+    paths = [rng.choice(unique) for _ in range(args.requests)]
+
+    # Split the requests between the clients
+    batches = [paths[i :: args.concurrency] for i in range(args.concurrency)]
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.concurrency) as executor:
+        results = list(
+            executor.map(
+                lambda batch: _run_client(
+                    host, port, batch, not args.no_gzip, args.revalidate
+                ),
+                batches,
+            )
+        )
+    elapsed = time.perf_counter() - start
+
+    # Summarize
+    latencies = np.concatenate([r[0] for r in results]) * 1e3
+    statuses = sum((r[1] for r in results), Counter())
+    n_bytes = sum(r[2] for r in results)
+    p50, p95, p99 = np.percentile(latencies, [50, 95, 99])
+    print(
+        f"{len(latencies)} requests in {elapsed:.2f}s ({len(latencies) / elapsed:.0f}/s)"
+    )
+    print(
+        f"latency (ms): p50={p50:.2f} p95={p95:.2f} p99={p99:.2f} max={latencies.max():.2f}"
+    )
+    print(
+        f"statuses: {dict(sorted(statuses.items()))}; {n_bytes / 1e6:.1f} MB received"
+    )
+
+
+if __name__ == "__main__":
+    main()
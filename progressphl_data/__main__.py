@@ -1,24 +1,41 @@
 """The main command line module that defines the "progressphl-data" tool."""
 
 
-from io import StringIO
+from contextlib import nullcontext
 from pathlib import Path
 
-import boto3
 import click
-import simplejson as json
 from dotenv import find_dotenv, load_dotenv
 
-from .census_indicators import get_census_indicators, get_trend_variables
-from .core import get_spi_data, load_meta_data
+from .census_indicators import ALL_GEOGRAPHIES, GEOGRAPHIES
+from .core import get_spi_dataset
 from .crosswalk import *
+from .etl import ETL_STAGES, Output, get_etl_pipeline
 from .geo import *
-
-BUCKET = "spi-dashboard-data"
+from .memo import RunCache
+from .profiling import Profiler
+from .publish import BUCKET, S3Publisher
+from .region import get_regional_census_indicators
+from .scope import Scope
+from .serialize import ENCODINGS, FORMATS
+from .serve import QueryService, make_server
 
 here = Path(__file__).parent.absolute()
 
 
+def _check_encoding(ctx, param, value):
+    """Make sure the package for the encoding is installed, before any work."""
+    if value == "br":
+        try:
+            import brotli  # noqa: F401
+        except ImportError:
+            raise click.BadParameter(
+                "'br' requires the 'brotli' package; install it with "
+                "'poetry install -E brotli'"
+            )
+    return value
+
+
 @click.group()
 @click.version_option()
 def cli():
@@ -28,15 +45,53 @@ def cli():
 
 @cli.command()
 @click.option("--version", type=str, default="2")
-def etl(version="2"):
+@click.option(
+    "--workers", type=int, default=16, help="The number of concurrent s3 uploads."
+)
+@click.option("--force", is_flag=True, help="Upload all files, even if unchanged.")
+@click.option(
+    "--encoding",
+    type=click.Choice(ENCODINGS),
+    default="gzip",
+    callback=_check_encoding,
+    help="The content encoding of uploaded files.",
+)
+@click.option(
+    "--format",
+    "output_format",
+    type=click.Choice(FORMATS),
+    default="records",
+    help="The output format: arrays of records or columnar arrays.",
+)
+@click.option(
+    "--only",
+    type=click.Choice(ETL_STAGES),
+    multiple=True,
+    help="Only re-run (and publish) the specified stage(s).",
+)
+@click.option("--fresh", is_flag=True, help="Ignore any cached stage outputs.")
+@click.option(
+    "--profile",
+    is_flag=True,
+    help="Record the time and peak memory of each stage and call.",
+)
+@click.option("--trace", is_flag=True, help="Also save the profile as a Chrome trace.")
+def etl(
+    version="2",
+    workers=16,
+    force=False,
+    encoding="gzip",
+    output_format="records",
+    only=(),
+    fresh=False,
+    profile=False,
+    trace=False,
+):
     """Process and upload the data."""
 
     # Load the credentials
     load_dotenv(find_dotenv())
 
-    # Initialize the s3 resource
-    s3_resource = boto3.resource("s3")
-
     # Setup local output folder
     local_output_folder = (
         here / ".." / "data-products" / "dashboard-inputs" / f"v{version}"
@@ -44,116 +99,71 @@ def etl(version="2"):
     if not local_output_folder.exists():
         local_output_folder.mkdir(parents=True)
 
-    # The SPI data
-    spi_data = get_spi_data(version=version)
-
-    # Reformat it
-    OUTPUT_COLUMNS = [
-        "geoid",
-        "neighborhood_name",
-        "puma_name",
-        "tract_id",
-        "variable",
-        "value",
-        "average_label",
-        "rank",
-    ]
-    spi_data_trimmed = spi_data[OUTPUT_COLUMNS].copy()
-
-    # Convert to dict
-    out = {}
-    for variable in spi_data_trimmed["variable"].unique():
-        out[variable] = (
-            spi_data_trimmed.query("variable == @variable")
-            .drop(columns=["variable"])
-            .to_dict(orient="records")
-        )
-
-    # Save to a buffer
-    buffer = StringIO()
-    json.dump(out, buffer, ignore_nan=True)
-    json.dump(out, (local_output_folder / "spi-data.json").open("w"), ignore_nan=True)
-
-    # Upload to s3
-    s3_resource.Object(BUCKET, f"v{version}/spi-data.json").put(
-        Body=buffer.getvalue(), ACL="public-read"
+    # Initialize the s3 publisher, skipping unchanged objects
+    publisher = S3Publisher(
+        bucket=BUCKET,
+        max_workers=workers,
+        content_encoding=encoding,
+        manifest_key=f"v{version}/manifest.json",
+        manifest_path=local_output_folder / "manifest.json",
+        force=force,
     )
-
-    # Do the metadata
-    tags = ["aliases", "hierarchy", "definitions"]
-    meta = {}
-    for tag in tags:
-        meta[tag] = load_meta_data(tag=tag, version=version)
-
-    # Save to a buffer
-    buffer = StringIO()
-    json.dump(meta, buffer)
-    json.dump(meta, (local_output_folder / "spi-metadata.json").open("w"))
-
-    # Upload to s3
-    s3_resource.Object(BUCKET, f"v{version}/spi-metadata.json").put(
-        Body=buffer.getvalue(), ACL="public-read"
+    output = Output(
+        publisher=publisher,
+        version=version,
+        folder=local_output_folder,
+        output_format=output_format,
     )
 
-    # Census indicators
-    data = get_census_indicators()
-    missing = ["Park", "Airport-Navy Yard", "NE Airport"]
-
-    # Make output census folder
-    census_output_folder = local_output_folder / "census-data"
-    if not census_output_folder.exists():
-        census_output_folder.mkdir(parents=True)
-
-    # Save each name
-    for name, df in data.groupby("name"):
-        if any(name.startswith(m) for m in missing):
-            continue
-
-        # Don't need the name column
-        out = df.drop(columns=["name"])
-
-        # Save to a buffer
-        buffer = StringIO()
-        out.to_json(buffer, orient="records")
-        out.to_json(census_output_folder / f"{name}.json", orient="records")
-
-        # Upload to s3
-        s3_resource.Object(BUCKET, f"v{version}/census-data/{name}.json").put(
-            Body=buffer.getvalue(), ACL="public-read"
+    # Profile the run?
+    profiler = Profiler() if profile or trace else None
+
+    # NOTE: the run cache shares indicators between the census and trends stages
+    with profiler or nullcontext(), RunCache():
+        # Run the stages, re-running the requested ones
+        pipeline = get_etl_pipeline(output)
+        stages = list(only) or ETL_STAGES
+        targets = [f"publish-{stage}" for stage in stages]
+        if not only:
+            targets.append("save-cube")
+        pipeline.run(
+            targets=targets,
+            fresh=True if fresh else list(only),
         )
 
-    # Trend variables
-    data = get_trend_variables()
-
-    # Make output trend folder
-    trend_output_folder = local_output_folder / "trends"
-    if not trend_output_folder.exists():
-        trend_output_folder.mkdir(parents=True)
+        # Wait for the uploads to finish
+        # NOTE: only remove old files from s3 if we published everything
+        publisher.close(delete_removed=not only)
+    print(publisher.summary())
 
-    # Save each name
-    for name, df in data.groupby("indicator"):
-        # Don't need the indicator column
-        out = df.drop(columns=["indicator"])
-
-        # Save to a buffer
-        buffer = StringIO()
-        out.to_json(buffer, orient="records")
-        out.to_json(trend_output_folder / f"{name}.json", orient="records")
-
-        # Upload to s3
-        s3_resource.Object(BUCKET, f"v{version}/trends/{name}.json").put(
-            Body=buffer.getvalue(), ACL="public-read"
-        )
+    # Save the profile
+    if profiler is not None:
+        profile_folder = here / ".." / "data-products" / "profiles"
+        profile_folder.mkdir(parents=True, exist_ok=True)
+        profiler.save(profile_folder / f"etl-v{version}.json")
+        if trace:
+            profiler.save_trace(profile_folder / f"etl-v{version}.trace.json")
+        print(profiler.summary())
 
 
 @cli.command()
 @click.option("--version", type=str, default="2")
-def geo(version="2"):
+@click.option(
+    "--format",
+    "formats",
+    type=click.Choice(list(GEO_FORMATS)),
+    multiple=True,
+    default=["geojson"],
+    help="The output format(s); can be passed multiple times.",
+)
+@click.option(
+    "--workers", type=int, default=4, help="The number of files to write at once."
+)
+def geo(version="2", formats=("geojson",), workers=4):
     """Save geographies."""
 
-    # Get data and geoids
-    data = get_spi_data(version=version)
-    geoids = data["geoid"].unique()
+    # Get the geoids with SPI data
+    geoids = get_spi_dataset(version=version).values.index.unique("geoid")
 
     layers = {}
 
@@ -161,10 +171,10 @@ def geo(version="2"):
     tract_hood_crosswalk = get_tract_neighborhood_crosswalk()
     tract_puma_crosswalk = get_tract_puma_crosswalk()
 
-    # The geographies
+    # The geographies, loading the tracts once
     tracts = get_census_tracts()
-    neighborhoods = get_neighborhoods()
-    pumas = get_pumas()
+    neighborhoods = get_neighborhoods(tracts=tracts)
+    pumas = get_pumas(tracts=tracts)
 
     # Neighborhoods
     layers["neighborhoods"] = neighborhoods.rename(
@@ -202,9 +212,67 @@ def geo(version="2"):
     )
 
     output_folder = here / ".." / "data-products" / "geographies"
-    for k in layers:
-        print(f"Saving {k}...")
-        layers[k].to_file(output_folder / f"{k}.geojson", driver="GeoJSON")
+    print(f"Saving {', '.join(layers)} as {', '.join(formats)}...")
+    write_layers(layers, output_folder, formats=list(formats), max_workers=workers)
+
+
+@cli.command()
+@click.option(
+    "--county",
+    "counties",
+    multiple=True,
+    help="The five-digit FIPS code of a county; defaults to the Philadelphia region.",
+)
+@click.option(
+    "--workers", type=int, default=None, help="The number of counties to run at once."
+)
+@click.option(
+    "--block-groups",
+    is_flag=True,
+    help="Also calculate indicators for block groups.",
+)
+def region(counties=(), workers=None, block_groups=False):
+    """Calculate census indicators for each county in the region."""
+
+    # Load the credentials
+    load_dotenv(find_dotenv())
+
+    # Run each county in parallel
+    scopes = [Scope.from_fips(fips) for fips in counties] or None
+    geographies = ALL_GEOGRAPHIES if block_groups else GEOGRAPHIES
+    data = get_regional_census_indicators(
+        scopes=scopes, max_workers=workers, geographies=geographies
+    )
+
+    # Save
+    output_folder = here / ".." / "data-products" / "region"
+    output_folder.mkdir(parents=True, exist_ok=True)
+    data.to_csv(output_folder / "census-indicators.csv", index=False)
+    print(f"Saved {len(data)} rows for {data['fips'].nunique()} counties")
+
+
+@cli.command()
+@click.option("--version", type=str, default="2")
+@click.option("--host", type=str, default="127.0.0.1", help="The host to bind to.")
+@click.option("--port", type=int, default=8000, help="The port to listen on.")
+@click.option("--quiet", is_flag=True, help="Don't log each request.")
+def serve(version="2", host="127.0.0.1", port=8000, quiet=False):
+    """Serve lookups over the SPI data and census indicators."""
+
+    # Load the credentials, in case the census indicators aren't cached
+    load_dotenv(find_dotenv())
+
+    # Load the outputs once
+    service = QueryService.load(version=version)
+    server = make_server(service, host=host, port=port, quiet=quiet)
+
+    print(f"Serving {service} on http://{host}:{server.server_port}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
 
 
 if __name__ == "__main__":
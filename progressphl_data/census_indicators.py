@@ -1,64 +1,140 @@
+from __future__ import annotations
+
 import collections
+import dataclasses
+import hashlib
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Callable, Literal
 
 import numpy as np
 import pandas as pd
 
-from .crosswalk import get_tract_neighborhood_crosswalk, get_tract_puma_crosswalk
+from . import DATA_DIR
+from .crosswalk import (
+    get_block_group_crosswalk,
+    get_tract_neighborhood_crosswalk,
+    get_tract_puma_crosswalk,
+)
 from .datasources import get_acs_by_geography
+from .datasources.census import agg as census_agg
 from .datasources.census.agg import aggregate_median_data
-from .datasources.census.core import get_decennial
-from .geo import get_pumas
+from .datasources.census.core import get_decennial_population
+from .memo import memoize_batch
+from .profiling import span
+from .scope import PHILADELPHIA, Scope
 
+# The geographies calculated by default
 GEOGRAPHIES = ["tract", "neighborhood", "puma"]
 
+# All supported geographies, including the (opt-in) block groups
+ALL_GEOGRAPHIES = ["tract", "neighborhood", "puma", "block group"]
+
+
+def _get_geographies(
+    scope: Scope,
+    geographies: list[str] = GEOGRAPHIES,
+    supported: list[str] = ALL_GEOGRAPHIES,
+) -> list[str]:
+    """
+    The geographies to calculate an indicator for.
+
+    These are the requested geographies that the indicator supports, in the
+    order of ``supported``. Neighborhoods and PUMAs are only defined for
+    Philadelphia, so other counties only use tracts and block groups.
+    """
+    local = ["tract", "block group"]
+    return [
+        g
+        for g in supported
+        if g in geographies and (scope == PHILADELPHIA or g in local)
+    ]
 
-def _get_population(year=2019):
-    """Get ACS population data."""
 
-    pumas = get_pumas()
-    tract_hood_crosswalk = get_tract_neighborhood_crosswalk()
+def _get_puma_names() -> pd.DataFrame:
+    """
+    Return the dashboard name of each Philadelphia PUMA, as "id" and "name".
 
-    out = []
-    for geography in GEOGRAPHIES:
+    The names are read from the tract-PUMA crosswalk (without dissolving the
+    tracts), and are memoized for the run.
+    """
 
-        table = "B01001"
-        variables = {table + "_001": "universe"}
-
-        # Get data by desired geography
-        data = get_acs_by_geography(
-            survey="acs5", year=year, variables=variables, geography=geography
+    def _compute(keys):
+        pumas = (
+            pd.read_csv(DATA_DIR / "tract-puma-crosswalk.csv", dtype=str)[
+                ["puma_id", "puma_name"]
+            ]
+            .drop_duplicates()
+            .rename(columns={"puma_id": "id", "puma_name": "name"})
         )
+        return {key: pumas for key in keys}
 
-        # PUMA/Tract
-        if geography == "puma":
-            data = data.drop(columns=["name"]).merge(pumas[["name", "id"]], on="id")
-        elif geography == "tract":
-            data = (
-                data[["id", "estimate"]]
-                .rename(columns={"id": "tract_geoid_alt"})
-                .merge(
-                    tract_hood_crosswalk[["tract_geoid_alt", "tract_name"]],
-                    on="tract_geoid_alt",
-                )
-                .rename(columns={"tract_name": "name"})
+    key = ("puma_names",)
+    data, _ = memoize_batch([key], _compute)
+    return data[key]
+
+
+def _format_names(data: pd.DataFrame, geography: str, scope: Scope) -> pd.DataFrame:
+    """
+    Set the output names of PUMAs, tracts, and block groups.
+
+    In Philadelphia, PUMAs are named by the dashboard's PUMA names, and
+    tracts and block groups by their neighborhood (e.g., "Fishtown 01").
+    Elsewhere, the Census names are used.
+    """
+    if scope != PHILADELPHIA:
+        return data
+
+    if geography == "puma":
+        pumas = _get_puma_names()
+        data = data.drop(columns=["name"]).merge(pumas[["name", "id"]], on="id")
+    elif geography == "tract":
+        tract_hood_crosswalk = get_tract_neighborhood_crosswalk()
+        data = (
+            data.drop(columns=["name"])
+            .merge(
+                tract_hood_crosswalk[["tract_geoid_alt", "tract_name"]],
+                left_on="id",
+                right_on="tract_geoid_alt",
             )
-        out.append(data[["name", "estimate"]])
+            .drop(columns=["tract_geoid_alt"])
+            .rename(columns={"tract_name": "name"})
+        )
+    elif geography == "block group":
+        crosswalk = get_block_group_crosswalk(data["id"].unique())
+        data = (
+            data.drop(columns=["name"])
+            .merge(
+                crosswalk[["block_group_geoid", "block_group_name"]],
+                left_on="id",
+                right_on="block_group_geoid",
+            )
+            .drop(columns=["block_group_geoid"])
+            .rename(columns={"block_group_name": "name"})
+        )
+
+    return data
 
-    return pd.concat(out).assign(indicator="population")
 
+def _get_2010_population(year=2010, scope=PHILADELPHIA, geographies=GEOGRAPHIES):
+    """Get decennial population data."""
+
+    def _get_universe(geography):
+        data = get_decennial_population(geography=geography, year=year, scope=scope)
+        return data.loc[data["variable"] == "universe"]
+
+    # Tracts, neighborhoods, and PUMAs all use the same tract-level request
+    geographies = _get_geographies(scope, geographies)
+    if any(geography != "block group" for geography in geographies):
+        tracts = _get_universe("tract")
 
-def _get_2010_population():
     out = []
-    for geography in GEOGRAPHIES:
+    for geography in geographies:
 
-        data = get_decennial(
-            variables={
-                "P012001": "universe",
-            },
-            sumfile="sf1",
-            year=2010,
-            geography="tract",
-        )
+        if geography == "block group":
+            data = _get_universe("block group")
+        else:
+            data = tracts
 
         if geography == "neighborhood" or geography == "puma":
 
@@ -79,44 +155,87 @@ def _get_2010_population():
                 .rename(columns={f"{geography}_id": "id", f"{geography}_name": "name"})
             )
         else:
-            crosswalk = get_tract_neighborhood_crosswalk()
-            data = (
-                data[["id", "estimate"]]
-                .rename(columns={"id": "tract_geoid_alt"})
-                .merge(
-                    crosswalk[["tract_geoid_alt", "tract_name"]], on="tract_geoid_alt"
-                )
-                .rename(columns={"tract_name": "name"})
-            )
+            data = _format_names(data, geography, scope)
 
-        out.append(data[["name", "estimate"]])
+        out.append(data[["id", "name", "estimate"]].assign(geography=geography))
 
-    return pd.concat(out).assign(indicator=f"population_2010")
+    return (
+        pd.concat(out)
+        .rename(columns={"id": "geoid"})
+        .assign(indicator=f"population_2010")
+    )
 
 
-def _get_sex_by_age(year=2019):
-    """Get sex by age"""
+# The age groups for sex by age, as sums of the B01001 age buckets
+AGE_GROUPS = collections.OrderedDict(
+    {
+        "under_18": ["under_5", "5_to_9", "10_to_14", "15_to_17"],
+        "18_to_34": ["18_to_19", "20", "21", "22_to_24", "25_to_29", "30_to_34"],
+        "35_to_49": ["35_to_39", "40_to_44", "45_to_49"],
+        "50_to_64": ["50_to_54", "55_to_59", "60_to_61", "62_to_64"],
+        "65_and_over": [
+            "65_to_66",
+            "67_to_69",
+            "70_to_74",
+            "75_to_79",
+            "80_to_84",
+            "85_and_over",
+        ],
+    }
+)
+
+
+def _calculate_age_group_shares(data: pd.DataFrame) -> pd.DataFrame:
+    """
+    Calculate the share of the population in each age group, by sex.
+
+    The tidy B01001 data is pivoted to a (geography x age bucket) matrix, so
+    the age group sums are one product with a (bucket x group) membership
+    matrix, and the shares one division by the universe.
+
+    Returns "id", "name", "estimate", and "variable" columns, with the male
+    groups for each geography followed by the female groups.
+    """
+    wide = data.pivot(index=["id", "name"], columns="variable", values="estimate")
+    ids = wide.index.get_level_values("id").to_numpy()
+    names = wide.index.get_level_values("name").to_numpy()
+    universe = wide["universe"].to_numpy()
 
-    pumas = get_pumas()
-    tract_hood_crosswalk = get_tract_neighborhood_crosswalk()
-
-    # Group sets we'll need
-    groupsets = collections.OrderedDict(
-        {
-            "under_18": ["under_5", "5_to_9", "10_to_14", "15_to_17"],
-            "18_to_34": ["18_to_19", "20", "21", "22_to_24", "25_to_29", "30_to_34"],
-            "35_to_49": ["35_to_39", "40_to_44", "45_to_49"],
-            "50_to_64": ["50_to_54", "55_to_59", "60_to_61", "62_to_64"],
-            "65_and_over": [
-                "65_to_66",
-                "67_to_69",
-                "70_to_74",
-                "75_to_79",
-                "80_to_84",
-                "85_and_over",
-            ],
-        }
-    )
+    out = []
+    for sex in ["male", "female"]:
+
+        # Which group each age bucket belongs to
+        buckets = []
+        membership = []
+        for i, group_list in enumerate(AGE_GROUPS.values()):
+            buckets += [f"{sex}_{bucket}" for bucket in group_list]
+            membership += [i] * len(group_list)
+        M = np.zeros((len(buckets), len(AGE_GROUPS)))
+        M[np.arange(len(buckets)), membership] = 1
+
+        # Sum the buckets (missing estimates count as zero) and normalize
+        sums = np.nan_to_num(wide[buckets].to_numpy(dtype=float)) @ M
+        with np.errstate(divide="ignore", invalid="ignore"):
+            shares = sums / universe[:, None]
+
+        out.append(
+            pd.DataFrame(
+                {
+                    "id": np.repeat(ids, len(AGE_GROUPS)),
+                    "name": np.repeat(names, len(AGE_GROUPS)),
+                    "estimate": shares.ravel(),
+                    "variable": np.tile(
+                        [f"{sex}_{group}" for group in AGE_GROUPS], len(ids)
+                    ),
+                }
+            )
+        )
+
+    return pd.concat(out, ignore_index=True)
+
+
+def _get_sex_by_age(year=2019, scope=PHILADELPHIA, geographies=GEOGRAPHIES):
+    """Get sex by age"""
 
     # Calculate the variables
     groups = [
@@ -155,438 +274,515 @@ def _get_sex_by_age(year=2019):
             cnt += 1
 
     all_data = []
-    for geography in ["puma", "tract", "neighborhood"]:
+    for geography in _get_geographies(
+        scope, geographies, ["puma", "tract", "neighborhood", "block group"]
+    ):
 
         # Get data by desired geography
         data = get_acs_by_geography(
-            survey="acs5", year=year, variables=variables, geography=geography
+            survey="acs5",
+            year=year,
+            variables=variables,
+            geography=geography,
+            scope=scope,
         )
 
-        # Sum over the custom groups
-        for groupset, group_list in groupsets.items():
-            for tag in ["male", "female"]:
-
-                # cols to sum over
-                cols_to_sum = [f"{tag}_{f}" for f in group_list]
-
-                # do the aggregation
-                data = pd.concat(
-                    [
-                        data,
-                        data.query("variable in @cols_to_sum")
-                        .groupby(["id", "name"], as_index=False)["estimate"]
-                        .sum()
-                        .assign(variable=f"{tag}_{groupset}"),
-                    ],
-                    axis=0,
-                    ignore_index=True,
-                )
+        # Percent of each age group relative to total population
+        out = _calculate_age_group_shares(data)
 
-        # Final groups we want
-        final_groups = ["under_18", "18_to_34", "35_to_49", "50_to_64", "65_and_over"]
-
-        # Calculate percent of each group relative to total population
-        out = []
-        for sex in ["male", "female"]:
-
-            def calculate_percent(grp):
-                sel = grp["variable"] == "universe"
-                norm = grp.loc[sel, "estimate"].squeeze()
-                out = grp[~sel].copy()
-                out["estimate"] /= norm
-                return out
-
-            X = (
-                data.loc[
-                    data.variable.isin(
-                        [f"{sex}_{grp}" for grp in final_groups] + ["universe"]
-                    )
-                ]
-                .drop(columns=["moe"])
-                .groupby(["id", "name"], group_keys=False)
-                .apply(calculate_percent)
-            )
-            out.append(X)
-
-        out = pd.concat(out)
-
-        # PUMA/Tract
-        if geography == "puma":
-            out = out.drop(columns=["name"]).merge(pumas[["name", "id"]], on="id")
-        elif geography == "tract":
-            out = (
-                out[["id", "estimate", "variable"]]
-                .rename(columns={"id": "tract_geoid_alt"})
-                .merge(
-                    tract_hood_crosswalk[["tract_geoid_alt", "tract_name"]],
-                    on="tract_geoid_alt",
-                )
-                .rename(columns={"tract_name": "name"})
-            )
+        # PUMA/Tract names
+        out = _format_names(out, geography, scope)
 
-        all_data.append(out[["name", "estimate", "variable"]])
+        all_data.append(
+            out[["id", "name", "estimate", "variable"]].assign(geography=geography)
+        )
 
     return pd.concat(all_data, axis=0, ignore_index=True).rename(
-        columns={"variable": "indicator"}
+        columns={"id": "geoid", "variable": "indicator"}
     )
 
 
-def _get_median_household_income(year=2019):
-    """Get median household income."""
-
-    pumas = get_pumas()
-    tract_hood_crosswalk = get_tract_neighborhood_crosswalk()
+@dataclass(frozen=True)
+class IndicatorSpec:
+    """
+    A census indicator, declared by the ACS variables it is calculated from.
+
+    ACS indicators are calculated by kind:
+
+    - "estimate": the estimate of ``value``
+    - "ratio": ``numerator`` divided by ``denominator``
+    - "shares": each variable in ``shares`` divided by ``denominator``, plus
+      the ``remainder`` not in any of them
+    - "median": the median ``value``; for neighborhoods, it is interpolated
+      from the tract-level distribution in ``bins``
+
+    Indicators that don't fit one of these kinds provide an ``evaluator``
+    instead, which is called as ``evaluator(year=..., scope=...,
+    geographies=...)`` and returns "geoid", "name", "estimate", "indicator",
+    and "geography" columns.
+
+    Parameters
+    ----------
+    name :
+        The indicator name (for "shares", the name of the group)
+    kind :
+        How the indicator is calculated
+    value, numerator, denominator :
+        ACS variables (e.g., "B17001_002")
+    shares :
+        The output indicator name for each ACS variable, for "shares"
+    remainder :
+        The output indicator name of the remaining share, for "shares"
+    bins :
+        The distribution to interpolate medians from, as (min, max, variable)
+    geographies :
+        The geographies the indicator supports (where its table is published)
+    year :
+        A fixed data year; by default, the year being evaluated
+    evaluator :
+        A custom function to calculate the indicator
+    """
+
+    name: str
+    kind: Literal["estimate", "ratio", "shares", "median", "custom"]
+    value: str | None = None
+    numerator: str | None = None
+    denominator: str | None = None
+    shares: tuple[tuple[str, str], ...] = ()
+    remainder: str | None = None
+    bins: tuple[tuple[float, float, str], ...] = ()
+    geographies: tuple[str, ...] = tuple(ALL_GEOGRAPHIES)
+    year: int | None = None
+    evaluator: Callable[..., pd.DataFrame] | None = None
+
+    @property
+    def variables(self) -> list[str]:
+        """The ACS variables the indicator is calculated from."""
+        variables = [self.value, self.numerator, self.denominator]
+        variables += [variable for variable, _ in self.shares]
+        return [v for v in variables if v is not None]
+
+    @property
+    def bin_variables(self) -> list[str]:
+        """The ACS variables of the median distribution."""
+        return [variable for _, _, variable in self.bins]
+
+
+# Household income distribution (B19001), as (min, max, variable)
+INCOME_BINS = (
+    (0, 9999, "B19001_002"),
+    (10000, 14999, "B19001_003"),
+    (15000, 19999, "B19001_004"),
+    (20000, 24999, "B19001_005"),
+    (25000, 29999, "B19001_006"),
+    (30000, 34999, "B19001_007"),
+    (35000, 39999, "B19001_008"),
+    (40000, 44999, "B19001_009"),
+    (45000, 49999, "B19001_010"),
+    (50000, 59999, "B19001_011"),
+    (60000, 74999, "B19001_012"),
+    (75000, 99999, "B19001_013"),
+    (100000, 124999, "B19001_014"),
+    (125000, 149999, "B19001_015"),
+    (150000, 199999, "B19001_016"),
+    (200000, np.inf, "B19001_017"),
+)
+
+# The registry of indicators, by name
+INDICATORS = {
+    spec.name: spec
+    for spec in [
+        IndicatorSpec(
+            "population_2010",
+            "custom",
+            year=2010,
+            evaluator=_get_2010_population,
+        ),
+        IndicatorSpec("population", "estimate", value="B01001_001"),
+        IndicatorSpec(
+            "poverty_rate",
+            "ratio",
+            numerator="B17001_002",
+            denominator="B17001_001",
+            geographies=tuple(GEOGRAPHIES),  # Not published for block groups
+        ),
+        IndicatorSpec(
+            "unemployment_rate",
+            "ratio",
+            numerator="B23025_005",
+            denominator="B23025_002",
+        ),
+        IndicatorSpec(
+            "foreignborn",
+            "ratio",
+            numerator="B05002_013",
+            denominator="B05002_001",
+            geographies=tuple(GEOGRAPHIES),  # Not published for block groups
+        ),
+        IndicatorSpec(
+            "race_ethnicity",
+            "shares",
+            denominator="B03002_001",
+            shares=(
+                ("B03002_006", "percent_asian"),
+                ("B03002_004", "percent_black"),
+                ("B03002_012", "percent_hispanic"),
+                ("B03002_003", "percent_white"),
+            ),
+            remainder="percent_other",
+        ),
+        IndicatorSpec("sex_by_age", "custom", evaluator=_get_sex_by_age),
+        IndicatorSpec(
+            "median_household_income",
+            "median",
+            value="B19013_001",
+            bins=INCOME_BINS,
+        ),
+    ]
+}
+
+# The indicators for the "Indicators" section of the dashboard
+CENSUS_INDICATORS = [
+    "population_2010",
+    "population",
+    "poverty_rate",
+    "race_ethnicity",
+    "sex_by_age",
+    "median_household_income",
+]
+
+# The indicators for the "Citywide Trends" section of the dashboard
+TREND_INDICATORS = [
+    "poverty_rate",
+    "median_household_income",
+    "unemployment_rate",
+    "race_ethnicity",
+]
+
+
+def _to_wide(data: pd.DataFrame) -> pd.DataFrame:
+    """Pivot tidy ACS data to a (geography x variable) frame of estimates."""
+    return data.pivot(index=["id", "name"], columns="variable", values="estimate")
+
+
+def _evaluate_spec(
+    spec: IndicatorSpec,
+    wide: pd.DataFrame,
+    geography: str,
+    tracts: pd.DataFrame | None,
+) -> pd.DataFrame:
+    """
+    Calculate an ACS indicator from the wide estimates for a geography.
+
+    Returns "id", "name", "estimate", and "indicator" columns.
+    """
+    if spec.kind == "estimate":
+        data = wide[spec.value].rename("estimate").reset_index()
+        return data.assign(indicator=spec.name)
+
+    elif spec.kind == "ratio":
+        data = (wide[spec.numerator] / wide[spec.denominator]).rename("estimate")
+        return data.reset_index().assign(indicator=spec.name)
+
+    elif spec.kind == "shares":
+        variables = [variable for variable, _ in spec.shares]
+        X = wide[variables]
+        remainder = wide[spec.denominator] - X.sum(axis=1)
+        return (
+            X.assign(**{spec.remainder: remainder})
+            .divide(wide[spec.denominator], axis=0)
+            .dropna(axis=0, how="all")
+            .rename(columns=dict(spec.shares))
+            .melt(ignore_index=False, value_name="estimate", var_name="indicator")
+            .reset_index()
+        )
 
-    out = []
-    for geography in GEOGRAPHIES:
+    elif spec.kind == "median":
 
         # Pull exact data
-        if geography in ["tract", "puma"]:
-
-            table = "B19013"
-            variables = {table + "_001": "median"}
+        if geography != "neighborhood":
+            data = wide[spec.value].rename("estimate").reset_index()
+            return data.assign(indicator=spec.name)
 
-            # Get data by desired geography
-            data = get_acs_by_geography(
-                survey="acs5", year=year, variables=variables, geography=geography
+        # Estimate from the tract-level distribution for neighborhoods
+        crosswalk = get_tract_neighborhood_crosswalk()
+        data = (
+            tracts[spec.bin_variables]
+            .reset_index()
+            .drop(columns=["name"])
+            .rename(columns={"id": "tract_geoid_alt"})
+            .merge(
+                crosswalk[["tract_geoid_alt", "neighborhood_name"]],
+                on="tract_geoid_alt",
             )
-
-        # Estimate from tract level for neighborhood
-        else:
-            # Crosswalk to neighborhoods
-            crosswalk = get_tract_neighborhood_crosswalk()
-
-            # Get the data
-            table = "B19001"
-            variables = {
-                table + "_001": "universe",
-                table + "_002": "0_to_9999",
-                table + "_003": "10000_to_14999",
-                table + "_004": "15000_to_19999",
-                table + "_005": "20000_to_24999",
-                table + "_006": "25000_to_29999",
-                table + "_007": "30000_to_34999",
-                table + "_008": "35000_to_39999",
-                table + "_009": "40000_to_44999",
-                table + "_010": "45000_to_49999",
-                table + "_011": "50000_to_59999",
-                table + "_012": "60000_to_74999",
-                table + "_013": "75000_to_99999",
-                table + "_014": "100000_to_124999",
-                table + "_015": "125000_to_149999",
-                table + "_016": "150000_to_199999",
-                table + "_017": "200000_or_more",
-            }
-
-            # Get data in wide format with tract/neighborhood info
-            data = (
-                get_acs_by_geography(
-                    survey="acs5", year=year, variables=variables, geography="tract"
-                )
-                .pivot_table(
-                    index=["id", "name"], columns="variable", values="estimate"
-                )
-                .reset_index()
-                .rename(columns={"id": "tract_geoid_alt"})
-                .drop(columns=["name"])
-                .merge(
-                    crosswalk[["tract_geoid_alt", "neighborhood_name", "tract_name"]],
-                    on="tract_geoid_alt",
-                )
+        )
+        return (
+            aggregate_median_data(
+                data,
+                groupby="neighborhood_name",
+                bins=list(spec.bins),
+                sampling_percentage=5 * 2.5,
             )
-
-            # Get bins for aggregation
-            bins = []
-            for i in range(2, 18):
-                column = variables[f"{table}_{i:03d}"]
-                if column.endswith("or_more"):
-                    start = float(column.split("_")[0])
-                    end = np.inf
-                else:
-                    start, end = map(float, column.split("_to_"))
-                bins.append((start, end, column))
-
-            # Approximate from the distribution
-            data = (
-                aggregate_median_data(
-                    data,
-                    groupby="neighborhood_name",
-                    bins=bins,
-                    sampling_percentage=5 * 2.5,
-                )
-                .reset_index()
-                .merge(
-                    crosswalk[["neighborhood_id", "neighborhood_name"]],
-                    on="neighborhood_name",
-                )
-                .rename(columns={"neighborhood_name": "name", "neighborhood_id": "id"})
+            .reset_index()
+            .merge(
+                crosswalk[["neighborhood_id", "neighborhood_name"]].drop_duplicates(),
+                on="neighborhood_name",
             )
+            .rename(columns={"neighborhood_name": "name", "neighborhood_id": "id"})[
+                ["id", "name", "estimate"]
+            ]
+            .assign(indicator=spec.name)
+        )
 
-        # PUMA/Tract
-        if geography == "puma":
-            data = data.drop(columns=["name"]).merge(pumas[["name", "id"]], on="id")
-        elif geography == "tract":
-            data = (
-                data[["id", "estimate"]]
-                .rename(columns={"id": "tract_geoid_alt"})
-                .merge(
-                    tract_hood_crosswalk[["tract_geoid_alt", "tract_name"]],
-                    on="tract_geoid_alt",
-                )
-                .rename(columns={"tract_name": "name"})
-            )
+    raise ValueError(f"Unrecognized indicator kind '{spec.kind}'")
 
-        out.append(data[["name", "estimate"]])
 
-    return pd.concat(out).assign(indicator=f"median_household_income")
+def _evaluate_acs(
+    pairs: list[tuple[IndicatorSpec, str]], year: int, scope: Scope
+) -> dict[tuple[str, str], pd.DataFrame]:
+    """
+    Calculate ACS indicators for (indicator, geography) pairs, in a batch.
 
+    The variables of all indicators are requested together, once per
+    geography, and neighborhoods are summed from the tract-level request.
+    The names for each geography are set once for all indicators.
 
-def _get_unemployment_rate(year=2019):
-    """Get percent of population who is unemployed."""
+    Returns the "geoid", "name", "estimate", "indicator", and "geography"
+    columns for each (indicator name, geography) pair.
+    """
+    geographies = [g for g in ALL_GEOGRAPHIES if any(g == pg for _, pg in pairs)]
 
-    pumas = get_pumas()
-    tract_hood_crosswalk = get_tract_neighborhood_crosswalk()
+    def _specs(geography):
+        return [spec for spec, g in pairs if g == geography]
 
-    out = []
-    for geography in GEOGRAPHIES:
+    def _variables(geography, bins=False):
+        variables = {}
+        for spec in _specs(geography):
+            if bins:
+                variables.update(dict.fromkeys(spec.bin_variables))
+            elif spec.kind != "median" or geography != "neighborhood":
+                variables.update(dict.fromkeys(spec.variables))
+        return {variable: variable for variable in variables}
 
-        table = "B23025"
+    # Tract data is used for tracts and neighborhoods
+    tract_data = tracts = None
+    if "tract" in geographies or "neighborhood" in geographies:
         variables = {
-            table + "_002": "in_labor_force",
-            table + "_005": "civilian_unemployed",
+            **_variables("tract"),
+            **_variables("neighborhood"),
+            **_variables("neighborhood", bins=True),
         }
-
-        # Get data by desired geography
-        data = get_acs_by_geography(
-            survey="acs5", year=year, variables=variables, geography=geography
+        tract_data = get_acs_by_geography(
+            survey="acs5",
+            year=year,
+            variables=variables,
+            geography="tract",
+            scope=scope,
         )
-
-        # Calculate the ratio
-        X = data.set_index(["name", "id"])
-        data = (
-            X.query("variable == 'civilian_unemployed'")["estimate"]
-            / X.query("variable == 'in_labor_force'")["estimate"]
-        ).reset_index()
-
-        # PUMA/Tract
-        if geography == "puma":
-            data = data.drop(columns=["name"]).merge(pumas[["name", "id"]], on="id")
-        elif geography == "tract":
-            data = (
-                data[["id", "estimate"]]
-                .rename(columns={"id": "tract_geoid_alt"})
-                .merge(
-                    tract_hood_crosswalk[["tract_geoid_alt", "tract_name"]],
-                    on="tract_geoid_alt",
+        tracts = _to_wide(tract_data)
+
+    results = {}
+    for geography in geographies:
+
+        # Get the estimates for all indicators
+        if geography == "tract":
+            wide = tracts
+        elif geography == "neighborhood":
+            variables = list(_variables("neighborhood"))
+            wide = _to_wide(
+                census_agg.tracts_to_neighborhoods(
+                    tract_data.loc[tract_data["variable"].isin(variables)]
                 )
-                .rename(columns={"tract_name": "name"})
             )
-
-        out.append(data[["name", "estimate"]])
-
-    return pd.concat(out).assign(indicator="unemployment_rate")
-
-
-def _get_poverty_rate(year=2019):
-    """Get percent of population below poverty line."""
-
-    pumas = get_pumas()
-    tract_hood_crosswalk = get_tract_neighborhood_crosswalk()
-
-    out = []
-    for geography in GEOGRAPHIES:
-
-        table = "B17001"
-        variables = {table + "_001": "universe", table + "_002": "below_poverty_line"}
-
-        # Get data by desired geography
-        data = get_acs_by_geography(
-            survey="acs5", year=year, variables=variables, geography=geography
-        )
-
-        # Calculate the ratio
-        X = data.set_index(["name", "id"])
-        data = (
-            X.query("variable == 'below_poverty_line'")["estimate"]
-            / X.query("variable == 'universe'")["estimate"]
-        ).reset_index()
-
-        # PUMA/Tract
-        if geography == "puma":
-            data = data.drop(columns=["name"]).merge(pumas[["name", "id"]], on="id")
-        elif geography == "tract":
-            data = (
-                data[["id", "estimate"]]
-                .rename(columns={"id": "tract_geoid_alt"})
-                .merge(
-                    tract_hood_crosswalk[["tract_geoid_alt", "tract_name"]],
-                    on="tract_geoid_alt",
+        else:
+            wide = _to_wide(
+                get_acs_by_geography(
+                    survey="acs5",
+                    year=year,
+                    variables=_variables(geography),
+                    geography=geography,
+                    scope=scope,
                 )
-                .rename(columns={"tract_name": "name"})
             )
 
-        out.append(data[["name", "estimate"]])
-
-    return pd.concat(out).assign(indicator="poverty_rate")
-
-
-def _get_foreignborn(year=2019):
-    """Get percent of population that is foreign-born."""
-
-    pumas = get_pumas()
-    tract_hood_crosswalk = get_tract_neighborhood_crosswalk()
-
-    out = []
-    for geography in GEOGRAPHIES:
-
-        table = "B05002"
-        variables = {table + "_001": "universe", table + "_013": "foreign_born"}
-
-        # Get data by desired geography
-        data = get_acs_by_geography(
-            survey="acs5", year=year, variables=variables, geography=geography
+        # Calculate each indicator
+        data = pd.concat(
+            [
+                _evaluate_spec(spec, wide, geography, tracts).assign(spec=spec.name)
+                for spec in _specs(geography)
+            ],
+            ignore_index=True,
         )
 
-        # Calculate the ratio
-        X = data.set_index(["name", "id"])
-        data = (
-            X.query("variable == 'foreign_born'")["estimate"]
-            / X.query("variable == 'universe'")["estimate"]
-        ).reset_index()
-
-        # PUMA/Tract
-        if geography == "puma":
-            data = data.drop(columns=["name"]).merge(pumas[["name", "id"]], on="id")
-        elif geography == "tract":
-            data = (
-                data[["id", "estimate"]]
-                .rename(columns={"id": "tract_geoid_alt"})
-                .merge(
-                    tract_hood_crosswalk[["tract_geoid_alt", "tract_name"]],
-                    on="tract_geoid_alt",
-                )
-                .rename(columns={"tract_name": "name"})
-            )
-
-        out.append(data[["name", "estimate"]])
-
-    return pd.concat(out).assign(indicator=f"foreignborn")
+        # PUMA/Tract names
+        data = _format_names(data, geography, scope)
 
+        # NOTE: results don't depend on the rest of the batch, since they're shared
+        for name, group in data.groupby("spec", sort=False):
+            results[name, geography] = (
+                group[["id", "name", "estimate", "indicator"]]
+                .rename(columns={"id": "geoid"})
+                .assign(geography=geography)
+                .reset_index(drop=True)
+            )
 
-def _get_race_ethnicity(year=2019):
-    """Get ACS data on race/ethnicity."""
+    return results
+
+
+def get_indicators(
+    names: list[str],
+    year: int = 2019,
+    scope: Scope = PHILADELPHIA,
+    geographies: list[str] = GEOGRAPHIES,
+) -> pd.DataFrame:
+    """
+    Calculate indicators from the registry.
+
+    If a :class:`RunCache` is active, each indicator is only calculated once
+    per (indicator, year, county, geography) during the run, even across
+    threads; e.g., the indicators shared by :func:`get_census_indicators`
+    and :func:`get_trend_variables` are reused.
+
+    Parameters
+    ----------
+    names :
+        The names of the indicators in ``INDICATORS``
+    year :
+        The data year, for indicators without a fixed year
+    scope :
+        The county to calculate indicators for
+    geographies :
+        The geographies to calculate
+
+    Returns
+    -------
+    A data frame with "geoid", "name", "estimate", "indicator", and
+    "geography" columns, with the indicators in the order of ``names``. For
+    neighborhoods, the "geoid" is the neighborhood id.
+    """
+    specs = [INDICATORS[name] for name in names]
+    geographies = _get_geographies(scope, geographies)
+
+    # ACS indicators are calculated in a batch for each year
+    results = {}
+    acs_specs = [spec for spec in specs if spec.evaluator is None]
+    for acs_year in sorted({spec.year or year for spec in acs_specs}):
+        keys = [
+            (spec.name, acs_year, scope, geography)
+            for spec in acs_specs
+            if (spec.year or year) == acs_year
+            for geography in geographies
+            if geography in spec.geographies
+        ]
+
+        def _compute(keys, year=acs_year):
+            pairs = [(INDICATORS[name], geography) for name, _, _, geography in keys]
+            data = _evaluate_acs(pairs, year, scope)
+            return {key: data.get((key[0], key[-1])) for key in keys}
+
+        with span("acs", "indicator", scope=scope.fips, indicators=len(keys)) as args:
+            data, args["reused"] = memoize_batch(keys, _compute)
+            args["cached"] = args["reused"] == len(keys)
+        results.update(data)
+
+    # Custom indicators
+    for spec in specs:
+        if spec.evaluator is not None:
+            key = (spec.name, spec.year or year, scope, tuple(geographies))
+
+            def _compute(keys, spec=spec):
+                data = spec.evaluator(
+                    year=spec.year or year, scope=scope, geographies=geographies
+                )
+                return {key: data for key in keys}
 
-    pumas = get_pumas()
-    tract_hood_crosswalk = get_tract_neighborhood_crosswalk()
+            with span(spec.name, "indicator", scope=scope.fips) as args:
+                data, reused = memoize_batch([key], _compute)
+                args["cached"] = reused > 0
+            results.update(data)
 
+    # Combine, in order
     out = []
-    for geography in GEOGRAPHIES:
-
-        # Set up
-        table = "B03002"
-        variables = {
-            table + "_001": "universe",
-            table + "_003": "white_alone",
-            table + "_004": "black_alone",
-            table + "_006": "asian_alone",
-            table + "_012": "hispanic_alone",
-        }
-
-        # Get data by desired geography
-        data = get_acs_by_geography(
-            survey="acs5", year=year, variables=variables, geography=geography
-        )
-
-        # Reshape to wide format
-        X = data.drop(columns=["moe"]).pivot_table(
-            index=["id", "name"], columns="variable", values="estimate"
-        )
-
-        # Add the other column
-        X["other_alone"] = X["universe"] - X[
-            ["asian_alone", "black_alone", "hispanic_alone", "white_alone"]
-        ].sum(axis=1)
-
-        # Calculate the percent
-        data = (
-            X[
-                [
-                    "asian_alone",
-                    "black_alone",
-                    "hispanic_alone",
-                    "white_alone",
-                    "other_alone",
-                ]
+    for spec in specs:
+        if spec.evaluator is not None:
+            out.append(results[spec.name, spec.year or year, scope, tuple(geographies)])
+        else:
+            frames = [
+                results[spec.name, spec.year or year, scope, geography]
+                for geography in geographies
+                if geography in spec.geographies
             ]
-            .divide(X["universe"], axis=0)
-            .dropna(axis=0, how="all")
-            .rename(
-                columns={
-                    "white_alone": "percent_white",
-                    "black_alone": "percent_black",
-                    "asian_alone": "percent_asian",
-                    "hispanic_alone": "percent_hispanic",
-                    "other_alone": "percent_other",
-                }
-            )
-            .melt(ignore_index=False, value_name="estimate", var_name="indicator")
-            .reset_index()
-        )
-
-        # PUMA/Tract
-        if geography == "puma":
-            data = data.drop(columns=["name"]).merge(pumas[["name", "id"]], on="id")
-        elif geography == "tract":
-            data = (
-                data[["id", "estimate", "indicator"]]
-                .rename(columns={"id": "tract_geoid_alt"})
-                .merge(
-                    tract_hood_crosswalk[["tract_geoid_alt", "tract_name"]],
-                    on="tract_geoid_alt",
-                )
-                .rename(columns={"tract_name": "name"})
-            )
-
-        out.append(data[["name", "estimate", "indicator"]])
+            frames = [frame for frame in frames if frame is not None]
+            if frames:
+                out.append(pd.concat(frames))
 
     return pd.concat(out)
 
 
-def get_census_indicators():
-    """Get census-based indicators for all geographies (tract, puma, neighborhood)."""
-
-    functions = [
-        _get_2010_population,
-        _get_population,
-        # _get_foreignborn,
-        _get_poverty_rate,
-        _get_race_ethnicity,
-        _get_sex_by_age,
-        _get_median_household_income,
-    ]
-
-    indicators = []
-    for f in functions:
-        indicators.append(f())
-
-    return pd.concat(indicators, axis=0).dropna()
-
+def get_indicators_key() -> str:
+    """
+    Return a hash of the indicator definitions and the code that evaluates them.
+
+    This covers the :data:`INDICATORS` registry and the source of this module
+    and the data sources, so cached indicators are invalidated when either
+    changes.
+    """
+    sha = hashlib.sha256()
+
+    # The registry, with custom evaluators by name
+    for spec in INDICATORS.values():
+        evaluator = spec.evaluator
+        spec = dataclasses.replace(spec, evaluator=None)
+        sha.update(repr(spec).encode())
+        if evaluator is not None:
+            sha.update(f"{evaluator.__module__}.{evaluator.__qualname__}".encode())
+
+    # The code
+    here = Path(__file__).parent
+    for path in [Path(__file__), *sorted((here / "datasources").rglob("*.py"))]:
+        sha.update(path.read_bytes())
+
+    return sha.hexdigest()[:16]
+
+
+def get_census_indicators(
+    year: int = 2019,
+    scope: Scope = PHILADELPHIA,
+    geographies: list[str] = GEOGRAPHIES,
+    with_geography: bool = False,
+):
+    """
+    Get census-based indicators for all geographies (tract, puma, neighborhood).
+
+    Parameters
+    ----------
+    year :
+        The ACS year
+    scope :
+        The county to get indicators for; outside of Philadelphia, only
+        tract-level (and block-group-level) indicators are calculated
+    geographies :
+        The geographies to calculate; add "block group" to also calculate
+        indicators for block groups (where the tables are published)
+    with_geography :
+        If True, keep the "geoid" and "geography" of each row; by default,
+        only the "name", "estimate", and "indicator" columns are returned
+    """
+    indicators = get_indicators(
+        CENSUS_INDICATORS, year=year, scope=scope, geographies=geographies
+    )
+    columns = ["name", "estimate", "indicator"]
+    if with_geography:
+        columns = ["geography", "geoid", *columns]
+    return indicators[columns].dropna()
 
-def get_trend_variables():
-    """Get comparison variables for trend analysis."""
-    functions = [
-        _get_poverty_rate,
-        _get_median_household_income,
-        _get_unemployment_rate,
-        _get_race_ethnicity,
-    ]
 
-    indicators = []
-    for f in functions:
-        indicators.append(f())
+def get_trend_variables(year: int = 2019):
+    """Get comparison variables for trend analysis, for an ACS year."""
 
     # Combine
-    out = pd.concat(indicators, axis=0).dropna()
+    out = get_indicators(TREND_INDICATORS, year=year)
+    out = out[["name", "estimate", "indicator"]].dropna()
 
     # Trim to census tracts only
     tracts = get_tract_neighborhood_crosswalk()[
@@ -1,137 +1,348 @@
 from __future__ import annotations
 
-import json
+import copy
+import hashlib
+import os
+import threading
+from functools import cached_property, lru_cache
+from pathlib import Path
 from typing import Literal
 
+import numpy as np
 import pandas as pd
 
 from . import DATA_DIR
 from .crosswalk import get_tract_neighborhood_crosswalk, get_tract_puma_crosswalk
+from .meta import get_metadata
+from .profiling import span
+
+# The SPI workbook and the sheets to combine for each version
+SPI_WORKBOOKS = {
+    "1": ("SPI Philly Tableau.xlsx", ["SPI All"]),
+    "2": ("ProgressPHL_Recalculated_v1.xlsx", ["SPI", "rawvalues_indicators"]),
+}
 
 
 def load_meta_data(
     tag: Literal["variables", "hierarchy"], version: Literal["1"] = "1"
 ) -> dict | list:
     """Load metadata"""
-    meta_data_dir = DATA_DIR / f"v{version}" / "meta"
-    return json.load((meta_data_dir / f"{tag}.json").open("r"))
+    return copy.deepcopy(get_metadata(version=version)[tag])
+
+
+def _hash_file(path: Path, chunk_size: int = 2**20) -> str:
+    """Return the SHA-256 hash of a file's contents."""
+    sha = hashlib.sha256()
+    with path.open("rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            sha.update(chunk)
+    return sha.hexdigest()
+
 
+def load_spi_workbook(
+    version: Literal["1", "2"] = "2", fresh: bool = False
+) -> pd.DataFrame:
+    """
+    Load the raw SPI workbook for the specified version.
 
-def get_spi_data(version: Literal["1", "2"] = "2") -> pd.DataFrame:
-    """Load processed SPI data."""
+    The parsed sheets are cached as Parquet in the version's data folder,
+    keyed by the hash of the workbook's contents. The workbook is only
+    re-parsed (in a single pass over all needed sheets) if it changes.
 
+    Parameters
+    ----------
+    version :
+        The SPI version to load
+    fresh :
+        If True, ignore any cached data and re-parse the workbook
+
+    Returns
+    -------
+    A wide data frame indexed by (geoid, tract_name) with a column for each
+    raw SPI variable.
+    """
     # Data dir for this version
     data_dir = DATA_DIR / f"v{version}"
-    if not data_dir.exists():
+    if not data_dir.exists() or version not in SPI_WORKBOOKS:
         raise ValueError(f"No data for specified version '{version}'")
 
-    # Load the raw dataframe
-    if version == "1":
-        filename = data_dir / "SPI Philly Tableau.xlsx"
-        spi_data = pd.read_excel(
-            filename,
-            sheet_name="SPI All",
-            dtype={"geoid": str, "tract_name": str},
-        ).set_index(["geoid", "tract_name"])
-    elif version == "2":
-        filename = data_dir / "ProgressPHL_Recalculated_v1.xlsx"
-
-        # Read SPI variables and combine with indicators
-        spi_data = (
-            pd.read_excel(
-                filename,
-                sheet_name="SPI",
-                dtype={"geoid": str, "tract_name": str},
-            )
-            .set_index(["geoid", "tract_name"])
-            .join(
-                pd.read_excel(
-                    filename,
-                    sheet_name="rawvalues_indicators",
-                    dtype={"geoid": str, "tract_name": str},
-                ).set_index(["geoid", "tract_name"])
-            )
-        )
+    # The cache path depends on the workbook contents
+    filename, sheets = SPI_WORKBOOKS[version]
+    path = data_dir / filename
+    cache_path = data_dir / f"spi-{_hash_file(path)[:16]}.parquet"
 
-    # Rename variables
-    variables = load_meta_data(tag="variables", version=version)
-    spi_data = spi_data.rename(columns=variables)
-
-    # Melt
-    spi_data = spi_data.melt(ignore_index=False).sort_index()
-
-    # Rescale variables
-    need_to_rescale = [
-        "associate_degree_holders",
-        "eviction_rate",
-        "food_stamp_usage",
-        "no_plumbing",
-    ]
-    for col in need_to_rescale:
-        sel = spi_data["variable"] == col
-        spi_data.loc[sel, "value"] *= 100
-
-    # Add parent
-    hierarchy = load_meta_data(tag="hierarchy", version=version)
-    for k, v in hierarchy.items():
-        sel = spi_data["variable"].isin(v)
-        assert k in spi_data["variable"].unique()
-        spi_data.loc[sel, "parent"] = k
-
-    # Figure out which ones are inverted
-    definitions = load_meta_data(tag="definitions", version=version)
-    inverted = [name for name, d in definitions.items() if d["inverted"]]
-
-    # Add ranks
-    t = []
-    for var_name, grp in spi_data.groupby("variable"):
-        grp["rank"] = grp.value.rank(ascending=var_name in inverted, method="min")
-        t.append(grp)
-    spi_data = pd.concat(t, ignore_index=False)
-
-    # Calculate percentile ranges
-    percentile_ranges = (
-        spi_data.groupby("variable")["value"]
-        .quantile([0.25, 0.5, 0.75])
-        .reset_index()
-        .rename(columns={"level_1": "quantile_range"})
-        .assign(
-            quantile_range=lambda df: df.quantile_range.replace(
-                {0.25: "lower", 0.75: "upper", 0.5: "median"}
+    with span("load_spi_workbook", "spi", version=version) as args:
+        args["cached"] = not fresh and cache_path.exists()
+        if not args["cached"]:
+            # Read all of the sheets at once
+            raw = pd.read_excel(
+                path, sheet_name=sheets, dtype={"geoid": str, "tract_name": str}
             )
-        )
-        .pivot_table(index="variable", columns="quantile_range", values="value")
-    )
 
-    def assign_average_labels(row):
-        name = row["variable"]
-        value = row["value"]
-        ranges = percentile_ranges.loc[name].squeeze()
+            # Combine SPI variables with any indicators
+            spi_data = raw[sheets[0]].set_index(["geoid", "tract_name"])
+            for sheet in sheets[1:]:
+                spi_data = spi_data.join(raw[sheet].set_index(["geoid", "tract_name"]))
+
+            # Remove stale caches and save
+            for stale in data_dir.glob("spi-*.parquet"):
+                stale.unlink(missing_ok=True)
 
-        if ranges["lower"] <= value <= ranges["upper"]:
-            return "Average"
-        elif value < ranges["lower"]:
-            return "Above Average" if name in inverted else "Below Average"
-        else:
-            return "Below Average" if name in inverted else "Above Average"
+            # Write atomically, so a partial file is never trusted
+            tmp = cache_path.with_name(f"{cache_path.name}.{os.getpid()}.tmp")
+            spi_data.to_parquet(tmp)
+            os.replace(tmp, cache_path)
 
-    # Add average label
-    spi_data["average_label"] = spi_data.apply(assign_average_labels, axis=1)
+        return pd.read_parquet(cache_path)
 
-    # Add geo info
-    tract_hood_crosswalk = get_tract_neighborhood_crosswalk()
-    tract_puma_crosswalk = get_tract_puma_crosswalk()
 
+def get_quantile_table(values: pd.DataFrame, inverted: list[str]) -> pd.DataFrame:
+    """
+    Calculate the quartile boundaries for each SPI variable.
+
+    Parameters
+    ----------
+    values :
+        The SPI values in wide format, with a column for each variable
+    inverted :
+        The names of variables where lower values are better
+
+    Returns
+    -------
+    A data frame indexed by variable with "lower", "median", and "upper"
+    columns, and an "inverted" flag.
+    """
     return (
-        tract_hood_crosswalk[["tract_geoid_alt", "neighborhood_name", "tract_id"]]
-        .merge(
+        values.quantile([0.25, 0.5, 0.75])
+        .T.rename(columns={0.25: "lower", 0.5: "median", 0.75: "upper"})
+        .rename_axis("variable")
+        .assign(inverted=lambda df: df.index.isin(inverted))
+    )
+
+
+def _get_average_labels(values: pd.DataFrame, quantiles: pd.DataFrame) -> np.ndarray:
+    """Label values as above/below average relative to the interquartile range."""
+
+    # Line up the quantiles with each column
+    ranges = quantiles.loc[values.columns]
+    lower = ranges["lower"].to_numpy()
+    upper = ranges["upper"].to_numpy()
+    inverted = ranges["inverted"].to_numpy(dtype=bool)
+    value = values.to_numpy()
+
+    # Values outside of the range (or missing) are above average by default
+    is_average = (lower <= value) & (value <= upper)
+    is_low = value < lower
+    inverted = np.broadcast_to(inverted, value.shape)
+    return np.select(
+        [is_average, is_low & inverted, is_low & ~inverted, inverted],
+        ["Average", "Above Average", "Below Average", "Below Average"],
+        default="Above Average",
+    )
+
+
+class SPIDataset:
+    """
+    Lazily materialized SPI data for a single version.
+
+    The raw workbook is only loaded when first needed, and the derived
+    columns (ranks, quartiles, and average labels) are computed per variable
+    on first use and cached, so requesting a subset of variables only pays
+    for that subset. The dataset is shared (see :func:`get_spi_dataset`), so
+    the derived columns are computed under a lock.
+
+    Parameters
+    ----------
+    version :
+        The SPI version
+    data :
+        Optional raw SPI data in wide format, indexed by (geoid, tract_name);
+        if not provided, the version's workbook is loaded
+    geographies :
+        Optional neighborhood and PUMA for each tract, with "tract_geoid_alt",
+        "neighborhood_name", "tract_id", and "puma_name" columns; if not
+        provided, the cached crosswalks are loaded
+    """
+
+    def __init__(
+        self,
+        version: Literal["1", "2"] = "2",
+        data: pd.DataFrame | None = None,
+        geographies: pd.DataFrame | None = None,
+    ):
+        self.version = version
+        self.meta = get_metadata(version=version)
+        self._data = data
+        self._geographies = geographies
+        self._ranks = pd.DataFrame()
+        self._labels = pd.DataFrame()
+        self._quantiles = pd.DataFrame()
+        self._lock = threading.Lock()
+
+    @cached_property
+    def values(self) -> pd.DataFrame:
+        """The SPI values in wide format, with a column for each variable."""
+
+        # Load the raw dataframe
+        data = self._data
+        if data is None:
+            data = load_spi_workbook(version=self.version)
+
+        # Rename variables
+        data = data.rename(columns=self.meta.variables).sort_index()
+
+        # Rescale variables
+        for col in self.meta.rescale:
+            if col in data.columns:
+                data[col] *= 100
+
+        # Make sure the hierarchy is complete
+        for k in self.meta.hierarchy:
+            assert k in data.columns
+
+        return data
+
+    @cached_property
+    def geographies(self) -> pd.DataFrame:
+        """The neighborhood and PUMA for each census tract."""
+        if self._geographies is not None:
+            return self._geographies
+
+        tract_hood_crosswalk = get_tract_neighborhood_crosswalk()
+        tract_puma_crosswalk = get_tract_puma_crosswalk()
+
+        return tract_hood_crosswalk[
+            ["tract_geoid_alt", "neighborhood_name", "tract_id"]
+        ].merge(
             tract_puma_crosswalk[["tract_geoid_alt", "puma_name"]], on="tract_geoid_alt"
         )
-        .merge(
-            spi_data.reset_index(),
-            left_on="tract_geoid_alt",
-            right_on="geoid",
-            how="right",
-        )
-        .drop(columns=["tract_geoid_alt"])
-    )
+
+    def _materialize(self, variables: list[str]):
+        """Calculate and cache the derived columns for the input variables."""
+        with self._lock:
+            # Only calculate what we haven't yet
+            missing = [v for v in variables if v not in self._ranks.columns]
+            if not missing:
+                return
+            values = self.values[missing]
+
+            # Add ranks: flip the sign of non-inverted variables so that an
+            # ascending rank gives the right ordering
+            sign = np.where(self.meta.is_inverted(missing), 1.0, -1.0)
+            ranks = (values * sign).rank(method="min")
+
+            # Add average labels
+            quantiles = get_quantile_table(values, inverted=self.meta.inverted)
+            labels = pd.DataFrame(
+                _get_average_labels(values, quantiles),
+                index=values.index,
+                columns=values.columns,
+            )
+
+            # Cache
+            self._ranks = pd.concat([self._ranks, ranks], axis=1)
+            self._labels = pd.concat([self._labels, labels], axis=1)
+            self._quantiles = pd.concat([self._quantiles, quantiles])
+
+    def _check_variables(self, variables: list[str] | None) -> list[str]:
+        """Validate the input variables, defaulting to all of them."""
+        if variables is None:
+            return list(self.values.columns)
+
+        unknown = [v for v in variables if v not in self.values.columns]
+        if unknown:
+            raise ValueError(f"Unknown SPI variable(s): {unknown}")
+        return list(variables)
+
+    def quantiles(self, variables: list[str] | None = None) -> pd.DataFrame:
+        """
+        Return the quartile boundaries used for the average labels.
+
+        See :func:`get_quantile_table` for the format.
+        """
+        variables = self._check_variables(variables)
+        self._materialize(variables)
+        return self._quantiles.loc[sorted(variables)]
+
+    def to_frame(
+        self,
+        variables: list[str] | None = None,
+        geography: str | list[str] | None = None,
+        expand: bool = True,
+    ) -> pd.DataFrame:
+        """
+        Return the processed SPI data in long format.
+
+        See :func:`get_spi_data` for a description of the parameters.
+        """
+        # The variables to include, sorted by name
+        variables = self._check_variables(variables)
+        if expand:
+            variables = self.meta.descendants(variables)
+        variables = sorted(variables)
+        self._materialize(variables)
+
+        # Melt each column
+        spi_data = self.values[variables].melt(ignore_index=False)
+        spi_data["parent"] = spi_data["variable"].map(self.meta.parents)
+        spi_data["rank"] = self._ranks[variables].to_numpy().ravel(order="F")
+        spi_data["average_label"] = self._labels[variables].to_numpy().ravel(order="F")
+
+        # Add geo info
+        spi_data = (
+            self.geographies.merge(
+                spi_data.reset_index(),
+                left_on="tract_geoid_alt",
+                right_on="geoid",
+                how="right",
+            )
+        ).drop(columns=["tract_geoid_alt"])
+
+        # Trim to the requested geographies
+        if geography is not None:
+            if isinstance(geography, str):
+                geography = [geography]
+            sel = (
+                spi_data["geoid"].isin(geography)
+                | spi_data["neighborhood_name"].isin(geography)
+                | spi_data["puma_name"].isin(geography)
+            )
+            spi_data = spi_data.loc[sel].reset_index(drop=True)
+
+        return spi_data
+
+
+@lru_cache(maxsize=None)
+def get_spi_dataset(version: Literal["1", "2"] = "2") -> SPIDataset:
+    """Return the (cached) lazily materialized SPI dataset for a version."""
+    return SPIDataset(version=version)
+
+
+def get_spi_data(
+    version: Literal["1", "2"] = "2",
+    variables: list[str] | None = None,
+    geography: str | list[str] | None = None,
+    expand: bool = True,
+) -> pd.DataFrame:
+    """
+    Load processed SPI data.
+
+    Parameters
+    ----------
+    version :
+        The SPI version to load
+    variables :
+        The SPI variables to include; by default, all variables are included
+    geography :
+        Trim the output to these tract geoid(s), neighborhood name(s), or
+        PUMA name(s); ranks and labels are always relative to all tracts
+    expand :
+        Whether to include all descendants of the input variables in the
+        SPI hierarchy
+
+    Returns
+    -------
+    The SPI data in long format, with a row for each tract and variable.
+    """
+    dataset = get_spi_dataset(version=version)
+    return dataset.to_frame(variables=variables, geography=geography, expand=expand)
@@ -1,7 +1,8 @@
 import geopandas as gpd
+import pandas as pd
 
 from . import DATA_DIR
-from .geo import get_census_tracts, get_neighborhoods, get_pumas
+from .geo import get_block_groups, get_census_tracts, get_neighborhoods, get_pumas
 
 
 def _calculate_crosswalk(
@@ -137,3 +138,59 @@ def get_tract_neighborhood_crosswalk(fresh: bool = False) -> gpd.GeoDataFrame:
         crosswalk.to_file(path, driver="GeoJSON")
 
     return _as_strings(gpd.read_file(path))
+
+
+def get_block_group_crosswalk(block_groups=None) -> pd.DataFrame:
+    """
+    Calculate the crosswalk between block groups and tracts, neighborhoods,
+    and PUMAs.
+
+    Block groups nest exactly within tracts (the tract geoid is the first 11
+    digits of the block group geoid), so this joins the tract crosswalks
+    rather than intersecting geometries. Block groups are named by their
+    tract, e.g., "Fishtown 1 Block Group 2".
+
+    Parameters
+    ----------
+    block_groups :
+        The block group geoids; by default, the Philadelphia block groups are
+        loaded with :func:`get_block_groups`
+    """
+    if block_groups is None:
+        block_groups = get_block_groups()["id"]
+
+    # Tract crosswalks, without geometries
+    tract_hood_crosswalk = get_tract_neighborhood_crosswalk()[
+        [
+            "tract_geoid_alt",
+            "tract_name_alt",
+            "tract_name",
+            "neighborhood_id",
+            "neighborhood_name",
+        ]
+    ]
+    tract_puma_crosswalk = get_tract_puma_crosswalk()[
+        ["tract_geoid_alt", "puma_id", "puma_name"]
+    ]
+
+    # Merge on the tract geoid
+    block_groups = pd.Series(block_groups, dtype=str).to_numpy()
+    crosswalk = (
+        pd.DataFrame(
+            {
+                "block_group_geoid": block_groups,
+                "tract_geoid_alt": [geoid[:11] for geoid in block_groups],
+            }
+        )
+        .merge(tract_hood_crosswalk, on="tract_geoid_alt")
+        .merge(tract_puma_crosswalk, on="tract_geoid_alt")
+    )
+    crosswalk.insert(
+        1,
+        "block_group_name",
+        crosswalk["tract_name"]
+        + " Block Group "
+        + crosswalk["block_group_geoid"].str[-1],
+    )
+
+    return crosswalk.sort_values("block_group_geoid", ignore_index=True)
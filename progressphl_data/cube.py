@@ -0,0 +1,263 @@
+"""A dense, memory-mappable cube of indicator values for fast lookups."""
+
+from __future__ import annotations
+
+import json
+import os
+from pathlib import Path
+from typing import Literal
+
+import numpy as np
+import pandas as pd
+
+from . import DATA_DIR
+from .crosswalk import get_tract_neighborhood_crosswalk
+
+__all__ = ["IndicatorCube", "build_cube", "get_cube_path"]
+
+
+class IndicatorCube:
+    """
+    Indicator values as a dense (geography x indicator) array.
+
+    Geography names, tract geoids, and indicators map to integer positions
+    with dicts, so looking up a value is O(1), and one indicator
+    across all geographies (or one geography across all indicators) is a
+    slice of the array rather than a filter of a long data frame. Missing
+    values are NaN.
+
+    Parameters
+    ----------
+    values :
+        The values, with shape (geographies, indicators)
+    geographies :
+        The geography names
+    indicators :
+        The indicator names
+    geoids :
+        The geoid of each tract, keyed by geography name
+
+    Examples
+    --------
+    >>> cube = IndicatorCube.load(get_cube_path(version="2"))
+    >>> cube.get("42101000100", "poverty_rate")
+    >>> cube.indicator("poverty_rate")  # All geographies
+    >>> cube.geography("Fishtown")  # All indicators
+    """
+
+    def __init__(
+        self,
+        values: np.ndarray,
+        geographies: list[str],
+        indicators: list[str],
+        geoids: dict[str, str] | None = None,
+    ):
+        if values.shape != (len(geographies), len(indicators)):
+            raise ValueError("The shape of 'values' doesn't match the labels")
+        self.values = values
+        self.geographies = list(geographies)
+        self.indicators = list(indicators)
+        self.geoids = dict(geoids or {})
+
+        # Labels for slices
+        self._geography_labels = pd.Index(self.geographies, name="name")
+        self._indicator_labels = pd.Index(self.indicators, name="indicator")
+
+        # Integer index maps
+        self._geography_index = {name: i for i, name in enumerate(self.geographies)}
+        self._indicator_index = {name: i for i, name in enumerate(self.indicators)}
+        for name, geoid in self.geoids.items():
+            self._geography_index.setdefault(geoid, self._geography_index[name])
+
+    def __repr__(self) -> str:
+        g, i = self.values.shape
+        return f"IndicatorCube(geographies={g}, indicators={i})"
+
+    @classmethod
+    def from_frame(
+        cls,
+        data: pd.DataFrame,
+        geography: str = "name",
+        indicator: str = "indicator",
+        value: str = "estimate",
+        geoids: dict[str, str] | None = None,
+    ) -> IndicatorCube:
+        """
+        Create a cube from long-format data, with a row per value.
+
+        Labels are ordered by first appearance; if a (geography, indicator)
+        appears more than once, the last value is kept.
+        """
+        g, geographies = pd.factorize(data[geography])
+        i, indicators = pd.factorize(data[indicator])
+
+        values = np.full((len(geographies), len(indicators)), np.nan)
+        values[g, i] = data[value].to_numpy(dtype=float)
+
+        return cls(values, list(geographies), list(indicators), geoids)
+
+    def _get_position(self, index: dict, label, kind: str) -> int:
+        try:
+            return index[label]
+        except KeyError:
+            raise KeyError(f"Unknown {kind} '{label}'") from None
+
+    def get(self, geography: str, indicator: str) -> float:
+        """
+        Return a single value.
+
+        Parameters
+        ----------
+        geography :
+            The geography name, or the geoid of a tract
+        indicator :
+            The indicator name
+        """
+        g = self._get_position(self._geography_index, geography, "geography")
+        i = self._get_position(self._indicator_index, indicator, "indicator")
+        return float(self.values[g, i])
+
+    def indicator(self, indicator: str) -> pd.Series:
+        """Return one indicator across all geographies, indexed by name."""
+        i = self._get_position(self._indicator_index, indicator, "indicator")
+        return pd.Series(
+            self.values[:, i],
+            index=self._geography_labels,
+            name=indicator,
+        )
+
+    def geography(self, geography: str) -> pd.Series:
+        """Return all indicators for one geography (a name or tract geoid)."""
+        g = self._get_position(self._geography_index, geography, "geography")
+        return pd.Series(
+            self.values[g, :],
+            index=self._indicator_labels,
+            name=self.geographies[g],
+        )
+
+    def to_frame(self) -> pd.DataFrame:
+        """Return the non-missing values in long format."""
+        g, i = np.nonzero(~np.isnan(self.values))
+        return pd.DataFrame(
+            {
+                "name": np.asarray(self.geographies, dtype=object)[g],
+                "indicator": np.asarray(self.indicators, dtype=object)[i],
+                "value": self.values[g, i],
+            }
+        )
+
+    def save(self, folder: Path | str):
+        """
+        Save the cube to a folder.
+
+        The values are saved as a ``values.npy`` array, which can be
+        memory-mapped by :meth:`load`, and the labels as ``labels.json``.
+        """
+        folder = Path(folder)
+        folder.mkdir(parents=True, exist_ok=True)
+
+        # Write atomically, so readers never load a partial file
+        tmp = folder / f"values.{os.getpid()}.tmp.npy"
+        np.save(tmp, np.ascontiguousarray(self.values))
+        os.replace(tmp, folder / "values.npy")
+
+        labels = {
+            "geographies": self.geographies,
+            "indicators": self.indicators,
+            "geoids": self.geoids,
+        }
+        tmp = folder / f"labels.{os.getpid()}.tmp.json"
+        tmp.write_text(json.dumps(labels))
+        os.replace(tmp, folder / "labels.json")
+
+    @classmethod
+    def load(cls, folder: Path | str, mmap: bool = True) -> IndicatorCube:
+        """
+        Load a saved cube.
+
+        Parameters
+        ----------
+        folder :
+            The folder passed to :meth:`save`
+        mmap :
+            If True, memory-map the values (read-only), so processes share
+            the same pages rather than each loading a copy
+        """
+        folder = Path(folder)
+        labels = json.loads((folder / "labels.json").read_text())
+        values = np.load(folder / "values.npy", mmap_mode="r" if mmap else None)
+        return cls(values, **labels)
+
+
+def get_cube_path(version: Literal["1", "2"] = "2") -> Path:
+    """The folder the ETL pipeline saves the cube to, for an SPI version."""
+    return DATA_DIR / f"v{version}" / "cube"
+
+
+def build_cube(
+    spi: pd.DataFrame,
+    census: pd.DataFrame,
+    crosswalk: pd.DataFrame | None = None,
+) -> IndicatorCube:
+    """
+    Build a cube from the SPI and census outputs of the ETL pipeline.
+
+    SPI values are stored under the variable name, and their ranks under
+    "{variable}_rank". SPI rows are keyed by tract geoid, so they are
+    named like the census tracts (e.g., "Fishtown 1") using the crosswalk;
+    tracts can be looked up by either.
+
+    The cube has no year axis: the census indicators are for a single ACS
+    year, and the SPI data has no year of its own.
+
+    Parameters
+    ----------
+    spi :
+        The SPI data, with "geoid", "variable", "value", and "rank" columns
+    census :
+        The census indicators, with "name", "indicator", and "estimate"
+        columns
+    crosswalk :
+        The tract-to-neighborhood crosswalk; by default, the cached
+        crosswalk is loaded
+    """
+    if crosswalk is None:
+        crosswalk = get_tract_neighborhood_crosswalk()
+    names = dict(zip(crosswalk["tract_geoid_alt"], crosswalk["tract_name"]))
+
+    # SPI values and ranks, named by tract
+    spi_names = spi["geoid"].map(names).fillna(spi["geoid"])
+    spi = pd.concat(
+        [
+            pd.DataFrame(
+                {
+                    "name": spi_names,
+                    "indicator": spi["variable"],
+                    "estimate": spi["value"],
+                }
+            ),
+            pd.DataFrame(
+                {
+                    "name": spi_names,
+                    "indicator": spi["variable"] + "_rank",
+                    "estimate": spi["rank"],
+                }
+            ),
+        ],
+        ignore_index=True,
+    )
+
+    # SPI and census names can't overlap
+    overlap = set(spi["indicator"]) & set(census["indicator"])
+    if overlap:
+        raise ValueError(f"SPI and census indicators overlap: {sorted(overlap)}")
+
+    data = pd.concat(
+        [spi, census[["name", "indicator", "estimate"]]], ignore_index=True
+    )
+
+    # Tract geoids, for the tracts in the data
+    tract_names = set(data["name"])
+    geoids = {name: geoid for geoid, name in names.items() if name in tract_names}
+
+    return IndicatorCube.from_frame(data, geoids=geoids)
@@ -1,39 +1,18 @@
 from ...crosswalk import get_tract_neighborhood_crosswalk
-from ..census.core import get_decennial
+from ..census.core import get_decennial_population
 
 
 def get_adult_population_by_tract():
     """2010 decennial population by tract for adults >= 18 years old."""
 
-    # Query the censsu
-    data = get_decennial(
-        variables={
-            "P012001": "universe",
-            "P012003": "male_under_5",
-            "P012004": "male_5_to_9",
-            "P012005": "male_10_to_14",
-            "P012006": "male_15_to_17",
-            "P012027": "female_under_5",
-            "P012028": "female_5_to_9",
-            "P012029": "female_10_to_14",
-            "P012030": "female_15_to_17",
-        },
-        sumfile="sf1",
-        year=2010,
-        geography="tract",
+    # Query the census (shared with the population indicators)
+    data = get_decennial_population(geography="tract", year=2010).pivot(
+        index=["id", "name"], columns="variable", values="estimate"
     )
 
-    def calculate_pop_18_and_over(grp):
-        universe = grp.query("variable == 'universe'")["estimate"].squeeze()
-        under_17 = grp.query("variable != 'universe'")["estimate"].sum()
-        return universe - under_17
-
     # This is the total population 18 and over
-    return (
-        data.groupby(["id", "name"])
-        .apply(calculate_pop_18_and_over)
-        .reset_index(name="estimate")
-    )
+    under_18 = data.columns.drop("universe")
+    return (data["universe"] - data[under_18].sum(axis=1)).reset_index(name="estimate")
 
 
 def tracts_to_neighborhoods(data):
@@ -1,13 +1,19 @@
+from __future__ import annotations
+
 from typing import Literal
 
 import httpx
 import pandas as pd
 
+from ...profiling import span
+from ...scope import PHILADELPHIA, Scope
+
 
 def get_places_data(
     measure: str,
     year: Literal[2020, 2021, 2022] = 2020,
     geography: Literal["tract", "county"] = "tract",
+    scope: Scope = PHILADELPHIA,
 ) -> pd.DataFrame:
     """
     Get CDC places data.
@@ -20,6 +26,8 @@ def get_places_data(
         The release year
     geography :
         The returned geography
+    scope :
+        The county to get data for
     """
     # Get the dataset url
     url = None
@@ -42,14 +50,25 @@ def get_places_data(
         raise ValueError("Invalid geography/year combination")
 
     # Set up the request params
+    if scope.county is None:
+        raise ValueError("CDC PLACES data can only be requested for a county")
     params = {"measure": measure}
     if geography == "tract":
-        params["countyfips"] = "42101"
+        params["countyfips"] = scope.fips
     else:
-        params["locationID"] = "42101"
+        params["locationID"] = scope.fips
 
     # Request
-    r = httpx.get(url, params=params)
+    with span(
+        "get_places_data",
+        "cdc",
+        measure=measure,
+        year=year,
+        geography=geography,
+        scope=scope.fips,
+    ) as args:
+        r = httpx.get(url, params=params)
+        args["bytes"] = len(r.content)
 
     # Create the dataframe
     return (
@@ -335,19 +335,67 @@ def approximate_sum(data):
     return pd.Series({"estimate": estimate, "moe": moe})
 
 
-def tracts_to_neighborhoods(data):
-    """Aggregrate data from the tract-level to neighborhood-level."""
+def approximate_sums(data, groupby):
+    """
+    Approximate a sum for each group.
+
+    This is a vectorized version of :func:`approximate_sum`, which avoids
+    calling a function for each group.
+
+    Parameters
+    ----------
+    data :
+        The data, with "estimate" and "moe" columns
+    groupby :
+        The column(s) to group by
+
+    Returns
+    -------
+    A data frame with "estimate" and "moe" columns, indexed by the groups.
+    """
+    # Zero estimates only contribute their largest moe
+    zero = data["estimate"] == 0
+    sums = (
+        data.assign(
+            moe_squared=data["moe"].where(~zero) ** 2,
+            zero_moe=data["moe"].where(zero),
+            zero=zero,
+        )
+        .groupby(groupby)
+        .agg(
+            estimate=("estimate", "sum"),
+            moe_squared=("moe_squared", "sum"),
+            zero_moe=("zero_moe", "max"),
+            zero=("zero", "any"),
+        )
+    )
+    moe_squared = sums["moe_squared"] + np.where(sums["zero"], sums["zero_moe"] ** 2, 0)
+
+    return sums[["estimate"]].assign(moe=moe_squared**0.5)
+
+
+def tracts_to_neighborhoods(data, crosswalk=None):
+    """
+    Aggregrate data from the tract-level to neighborhood-level.
+
+    Parameters
+    ----------
+    data :
+        The tract-level data
+    crosswalk :
+        The tract-to-neighborhood crosswalk; by default, the cached
+        crosswalk is loaded
+    """
 
     # Merge in the crosswalk
-    crosswalk = get_tract_neighborhood_crosswalk()
+    if crosswalk is None:
+        crosswalk = get_tract_neighborhood_crosswalk()
     data = data.merge(crosswalk, left_on="id", right_on="tract_geoid_alt")
 
     # Approximate sum over tracts
     data = (
-        data.groupby(
-            ["neighborhood_id", "neighborhood_name", "variable"], as_index=False
-        )
-        .apply(approximate_sum)
+        approximate_sums(data, ["neighborhood_id", "neighborhood_name", "variable"])
+        .reset_index()
         .rename(columns={"neighborhood_id": "id", "neighborhood_name": "name"})
     )
 
@@ -369,8 +417,8 @@ def sum_over_variables(data, variable_name, excluded=None):
 
     # Do the groupby -> sum
     data = (
-        data_to_sum.groupby(["id", "name"], as_index=False)
-        .apply(approximate_sum)
+        approximate_sums(data_to_sum, ["id", "name"])
+        .reset_index()
         .assign(variable=variable_name)
     )
 
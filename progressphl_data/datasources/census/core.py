@@ -1,5 +1,8 @@
 from __future__ import annotations
 
+import hashlib
+import json
+import os
 from functools import reduce
 from typing import Callable, Literal
 
@@ -7,7 +10,60 @@ import numpy as np
 import pandas as pd
 from pygris.data import get_census
 
-__all__ = ["get_acs", "get_decennial"]
+from ... import DATA_DIR
+from ...memo import memoize_batch
+from ...profiling import span
+from ...scope import PHILADELPHIA, Scope
+
+__all__ = ["get_acs", "get_decennial", "get_decennial_population"]
+
+# Census API responses are cached here (shared by all processes)
+CENSUS_CACHE_DIR = DATA_DIR / "census"
+
+# Decennial population (table P012): the total and the population under 18, by sex
+DECENNIAL_POPULATION_VARIABLES = {
+    "P012001": "universe",
+    "P012003": "male_under_5",
+    "P012004": "male_5_to_9",
+    "P012005": "male_10_to_14",
+    "P012006": "male_15_to_17",
+    "P012027": "female_under_5",
+    "P012028": "female_5_to_9",
+    "P012029": "female_10_to_14",
+    "P012030": "female_15_to_17",
+}
+
+
+def _get_census_cached(
+    dataset: str, variables: list[str], params: dict, year: int
+) -> tuple[pd.DataFrame, bool]:
+    """
+    Query the Census API, caching the response on disk.
+
+    Released Census data doesn't change, so responses are keyed by the
+    request. Returns the data and whether it came from the cache.
+    """
+    key = json.dumps([dataset, year, variables, params], sort_keys=True)
+    path = CENSUS_CACHE_DIR / f"{hashlib.sha256(key.encode()).hexdigest()[:16]}.parquet"
+    if path.exists():
+        return pd.read_parquet(path), True
+
+    data = get_census(
+        dataset=dataset,
+        variables=variables,
+        params=params,
+        year=year,
+        return_geoid=True,
+        guess_dtypes=True,
+    )
+
+    # Write atomically, so concurrent runs never read a partial file
+    CENSUS_CACHE_DIR.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_suffix(f".{os.getpid()}.tmp")
+    data.to_parquet(tmp)
+    os.replace(tmp, path)
+
+    return data, False
 
 
 def _query_census_api(
@@ -17,30 +73,22 @@ def _query_census_api(
     geography: Literal["tract", "county", "block group", "puma"],
     chunk_size: int = 48,
     no_errors=False,
+    scope: Scope = PHILADELPHIA,
+    cache: bool = True,
 ) -> pd.DataFrame:
     """
     Internal function to query the Census API.
+
+    Parameters
+    ----------
+    scope :
+        The county (or state) to query
+    cache :
+        Whether to use the on-disk cache of responses
     """
 
     # Determine params
-    params = {}
-    if geography == "tract":
-        params["for"] = "tract:*"
-        params["in"] = "state:42 county:101"
-    elif geography == "county":
-        params["for"] = "county:101"
-        params["in"] = "state:42"
-    elif geography == "block group":
-        params["for"] = "block group:*"
-        params["in"] = "state:42 county:101 tract:*"
-    elif geography == "block":
-        params["for"] = "block:*"
-        params["in"] = "state:42 county:101 tract:*"
-    elif geography == "puma":
-        params["for"] = "public use microdata area:*"
-        params["in"] = "state:42"
-    else:
-        raise ValueError("Unrecognized 'geography' keyword")
+    params = scope.census_params(geography)
 
     # Chucnk the variables
     variable_chunks = np.array_split(variables, len(variables) // chunk_size + 1)
@@ -52,18 +100,36 @@ def _query_census_api(
             variable_chunk.append("NAME")
 
         # Request
-        _data = get_census(
+        with span(
+            "_query_census_api",
+            "census",
             dataset=dataset,
-            variables=variable_chunk,
-            params=params,
             year=year,
-            return_geoid=True,
-            guess_dtypes=True,
-        )
+            geography=geography,
+            scope=scope.fips,
+            variables=len(variable_chunk),
+        ) as args:
+            if cache:
+                _data, args["cached"] = _get_census_cached(
+                    dataset=dataset, variables=variable_chunk, params=params, year=year
+                )
+            else:
+                _data = get_census(
+                    dataset=dataset,
+                    variables=variable_chunk,
+                    params=params,
+                    year=year,
+                    return_geoid=True,
+                    guess_dtypes=True,
+                )
+            args["rows"] = len(_data)
+            args["bytes"] = int(_data.memory_usage(deep=True).sum())
 
-        # Trim to just Philadelphia PUMAs
-        if geography == "puma":
-            _data = _data.query("NAME.str.contains('Philadelphia City', na=False)")
+        # Trim to just the PUMAs in scope
+        if geography == "puma" and scope.puma_pattern is not None:
+            _data = _data.loc[
+                _data["NAME"].str.contains(scope.puma_pattern, na=False, regex=False)
+            ]
 
         # Put into tidy format
         _data = _data.melt(
@@ -101,6 +167,7 @@ def get_acs(
     survey: Literal["acs5", "acs5/subject", "acs5/profile"],
     year: int = 2019,
     geography: Literal["tract", "county", "block group", "puma"] = "tract",
+    scope: Scope = PHILADELPHIA,
 ) -> pd.DataFrame:
     """Get data from the ACS."""
 
@@ -115,6 +182,7 @@ def get_acs(
             year=year,
             variables=variables_full,
             geography=geography,
+            scope=scope,
         )
         .rename(columns={"GEOID": "id", "NAME": "name"})
         .assign(variable=lambda df: df.variable.replace(variables))
@@ -138,6 +206,7 @@ def get_decennial(
     ] = "sf1",
     geography: Literal["tract", "county", "block group", "block"] = "tract",
     year: Literal[2000, 2010, 2020] = 2010,
+    scope: Scope = PHILADELPHIA,
 ) -> pd.DataFrame:
     """Get decennial census data."""
 
@@ -154,6 +223,7 @@ def get_decennial(
             variables=list(variables),
             geography=geography,
             no_errors=True,
+            scope=scope,
         )
         .rename(columns={"GEOID": "id", "NAME": "name"})
         .assign(variable=lambda df: df.variable.replace(variables))
@@ -161,3 +231,37 @@ def get_decennial(
 
     # Return
     return result
+
+
+def get_decennial_population(
+    geography: Literal["tract", "county", "block group"] = "tract",
+    year: Literal[2000, 2010] = 2010,
+    scope: Scope = PHILADELPHIA,
+) -> pd.DataFrame:
+    """
+    Get the decennial population, in total and under 18 by sex (table P012).
+
+    The variables used by the population indicators and by the adult
+    population weights for CDC data are requested together, so they share
+    one request. While a :class:`RunCache` is active, the data is only
+    requested once per run.
+
+    Returns
+    -------
+    A tidy data frame with "id", "name", "variable", and "estimate" columns;
+    see ``DECENNIAL_POPULATION_VARIABLES`` for the variables.
+    """
+
+    def _compute(keys):
+        data = get_decennial(
+            variables=DECENNIAL_POPULATION_VARIABLES,
+            sumfile="sf1",
+            year=year,
+            geography=geography,
+            scope=scope,
+        )
+        return {key: data for key in keys}
+
+    key = ("decennial_population", geography, year, scope)
+    data, _ = memoize_batch([key], _compute)
+    return data[key]
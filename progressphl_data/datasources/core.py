@@ -8,6 +8,7 @@ import pandas as pd
 from pydantic import validate_arguments
 
 from .. import geo
+from ..scope import PHILADELPHIA, Scope
 from .cdc import agg as cdc_agg
 from .cdc.core import get_places_data
 from .census import agg as census_agg
@@ -18,10 +19,15 @@ from .census.core import get_acs
 def get_acs_by_geography(
     variables: dict[str, str],
     year: int,
-    geography: Literal["tract", "neighborhood", "county", "puma"],
+    geography: Literal["block group", "tract", "neighborhood", "county", "puma"],
     survey: Literal["acs5", "acs5/subject", "acs5/profile"],
+    scope: Scope = PHILADELPHIA,
 ) -> gpd.GeoDataFrame:
 
+    # Neighborhoods are only defined for Philadelphia
+    if geography == "neighborhood" and scope != PHILADELPHIA:
+        raise ValueError("Neighborhoods are only defined for Philadelphia")
+
     # County wide
     if geography == "county":
         data = get_acs(
@@ -29,13 +35,15 @@ def get_acs_by_geography(
             survey=survey,
             geography="county",
             variables=variables,
+            scope=scope,
         )
-    elif geography == "puma":
+    elif geography in ["puma", "block group"]:
         data = get_acs(
             year=year,
             survey=survey,
-            geography="puma",
+            geography=geography,
             variables=variables,
+            scope=scope,
         )
     else:
         # Get the data at the tract level
@@ -44,6 +52,7 @@ def get_acs_by_geography(
             survey=survey,
             geography="tract",
             variables=variables,
+            scope=scope,
         )
 
         if geography == "neighborhood":
@@ -57,15 +66,24 @@ def get_cdc_places_by_geography(
     measure: str,
     year: Literal[2020, 2021, 2022],
     geography: Literal["tract", "neighborhood", "county"],
+    scope: Scope = PHILADELPHIA,
 ) -> gpd.GeoDataFrame:
 
+    # Neighborhoods are only defined for Philadelphia
+    if geography == "neighborhood" and scope != PHILADELPHIA:
+        raise ValueError("Neighborhoods are only defined for Philadelphia")
+
     # County wide
     if geography == "county":
-        data = get_places_data(measure=measure, year=year, geography="county")
+        data = get_places_data(
+            measure=measure, year=year, geography="county", scope=scope
+        )
     else:
 
         # Get the data at the tract level
-        data = get_places_data(measure=measure, year=year, geography="tract")
+        data = get_places_data(
+            measure=measure, year=year, geography="tract", scope=scope
+        )
 
         # Handle neighborhood aggregation
         if geography == "neighborhood":
@@ -78,18 +96,42 @@ def get_count_by_geography(
     data: gpd.GeoDataFrame,
     geography: Literal["tract", "neighborhood", "county"],
     id_column: str = "id",
+    boundaries: gpd.GeoDataFrame | None = None,
+    scope: Scope = PHILADELPHIA,
 ) -> pd.Series:
-    """Count the input point-like data by a specific geographic boundary."""
+    """
+    Count the input point-like data by a specific geographic boundary.
+
+    Parameters
+    ----------
+    data :
+        The point-like data to count
+    geography :
+        The geography to count by
+    id_column :
+        The column specifying the boundary id
+    boundaries :
+        The boundaries for the geography, with "id", "name", and "geometry"
+        columns; by default, they are loaded for the specified geography
+    scope :
+        The county to load boundaries for
+    """
 
     # Get the boundaries
-    if geography == "county":
-        boundaries = geo.get_city_limits()
-    elif geography == "tract":
-        boundaries = geo.get_census_tracts()
-    elif geography == "neighborhood":
-        boundaries = geo.get_neighborhoods()
-    else:
+    if geography not in ["county", "tract", "neighborhood"]:
         raise ValueError("Unexpected 'geography' value")
+    if geography == "neighborhood" and scope != PHILADELPHIA:
+        raise ValueError("Neighborhoods are only defined for Philadelphia")
+    if boundaries is None:
+        if geography == "county":
+            if scope == PHILADELPHIA:
+                boundaries = geo.get_city_limits()
+            else:
+                boundaries = geo.get_counties(scope)
+        elif geography == "tract":
+            boundaries = geo.get_census_tracts(scope)
+        else:
+            boundaries = geo.get_neighborhoods()
 
     # Spatial join
     data = gpd.sjoin(data, boundaries.to_crs(data.crs), predicate="within")
@@ -99,7 +141,7 @@ def get_count_by_geography(
         count = (
             pd.Series({"estimate": len(data)})
             .to_frame()
-            .T.assign(id="42101", name="Philadelphia County")
+            .T.assign(id=boundaries["id"].iloc[0], name=boundaries["name"].iloc[0])
         )
     # Groupby id and return
     else:
@@ -118,10 +160,13 @@ def get_rate_by_geography(
     id_column: str = "id",
     pop_year: int = 2019,
     norm: float = 1e4,
+    scope: Scope = PHILADELPHIA,
 ):
 
     # Get the counts
-    counts = get_count_by_geography(data, geography=geography, id_column=id_column)
+    counts = get_count_by_geography(
+        data, geography=geography, id_column=id_column, scope=scope
+    )
 
     # Get the population
     pop = get_acs_by_geography(
@@ -129,6 +174,7 @@ def get_rate_by_geography(
         variables={"S0101_C01_001": "universe"},
         geography=geography,
         survey="acs5/subject",
+        scope=scope,
     )
 
     # Calculate value per population
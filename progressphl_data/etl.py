@@ -0,0 +1,267 @@
+"""The stages of the ETL pipeline that produces the dashboard inputs."""
+
+from __future__ import annotations
+
+from dataclasses import dataclass
+from pathlib import Path
+
+import pandas as pd
+
+from .census_indicators import (
+    GEOGRAPHIES,
+    get_census_indicators,
+    get_indicators_key,
+    get_trend_variables,
+)
+from .core import get_spi_data, get_spi_dataset
+from .cube import IndicatorCube, build_cube, get_cube_path
+from .meta import get_metadata
+from .pipeline import Pipeline, Stage
+from .profiling import span
+from .publish import S3Publisher
+from .scope import PHILADELPHIA
+from .serialize import (
+    bundle,
+    decimals_from_fmt,
+    dumps,
+    grouped_records_to_json,
+    grouped_to_columnar,
+    records_to_json,
+    to_columnar,
+)
+
+__all__ = ["ETL_STAGES", "Output", "get_data_stages", "get_etl_pipeline"]
+
+# The stages that produce data; each has a matching "publish-*" stage
+ETL_STAGES = ["spi", "metadata", "census", "trends"]
+
+# The columns in the SPI output
+SPI_OUTPUT_COLUMNS = [
+    "geoid",
+    "neighborhood_name",
+    "puma_name",
+    "tract_id",
+    "variable",
+    "value",
+    "average_label",
+    "rank",
+]
+
+# The ACS year of the census indicators and trends
+ACS_YEAR = 2019
+
+# Decimals to keep for census estimates in the columnar format
+CENSUS_DECIMALS = 4
+
+# Neighborhoods without census data
+MISSING_NEIGHBORHOODS = ["Park", "Airport-Navy Yard", "NE Airport"]
+
+
+@dataclass
+class Output:
+    """Where and how to save the outputs of the ETL pipeline."""
+
+    publisher: S3Publisher
+    version: str
+    folder: Path
+    output_format: str = "records"
+
+    def publish(self, name: str, body: bytes, **kwargs):
+        """Save a serialized payload locally and upload it to s3."""
+        path = self.folder / name
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with span("write", "output", name=name, bytes=len(body)):
+            path.write_bytes(body)
+        self.publisher.put(f"v{self.version}/{name}", body, **kwargs)
+
+
+def get_spi_output(version: str) -> pd.DataFrame:
+    """The SPI data, trimmed to the output columns."""
+    return get_spi_data(version=version)[SPI_OUTPUT_COLUMNS].copy()
+
+
+def get_spi_metadata(version: str) -> dict:
+    """The SPI metadata, including the quartiles used for the average labels."""
+    registry = get_metadata(version=version)
+    tags = ["aliases", "hierarchy", "definitions"]
+    meta = {}
+    for tag in tags:
+        meta[tag] = registry[tag]
+
+    # Add the quartiles used for the average labels (e.g., for legends)
+    quantiles = get_spi_dataset(version=version).quantiles()
+    meta["quantiles"] = quantiles.to_dict(orient="index")
+
+    return meta
+
+
+def _serialize_spi(spi: pd.DataFrame, output: Output) -> bytes:
+    """Serialize the SPI data in the output format."""
+    if output.output_format == "columnar":
+        # Round values based on each variable's format
+        registry = get_metadata(version=output.version)
+        value_decimals = {
+            variable: decimals_from_fmt(
+                registry.definitions.get(variable, {}).get("fmt")
+            )
+            for variable in registry.names
+        }
+        return dumps(
+            grouped_to_columnar(
+                spi,
+                by="variable",
+                dictionary_columns=[
+                    "geoid",
+                    "neighborhood_name",
+                    "puma_name",
+                    "tract_id",
+                    "average_label",
+                ],
+                decimals={"value": value_decimals, "rank": 0},
+            )
+        )
+    else:
+        return grouped_records_to_json(spi, by="variable")
+
+
+def publish_spi(spi: pd.DataFrame, output: Output):
+    """Save and upload the SPI data, grouped by variable."""
+    with span("spi-data", "serialize") as args:
+        body = _serialize_spi(spi, output)
+        args["bytes"] = len(body)
+
+    output.publish("spi-data.json", body)
+
+
+def publish_metadata(metadata: dict, output: Output):
+    """Save and upload the SPI metadata."""
+    with span("spi-metadata", "serialize") as args:
+        body = dumps(metadata)
+        args["bytes"] = len(body)
+
+    output.publish("spi-metadata.json", body)
+
+
+def publish_census(census: pd.DataFrame, output: Output):
+    """Save and upload the census indicators for each name."""
+
+    # Save each name
+    census_payloads = {}
+    for name, df in census.groupby("name"):
+        if any(name.startswith(m) for m in MISSING_NEIGHBORHOODS):
+            continue
+
+        # Don't need the name column
+        out = df.drop(columns=["name"])
+
+        # Serialize
+        with span("census-data", "serialize", name=name) as args:
+            if output.output_format == "columnar":
+                body = dumps(
+                    to_columnar(
+                        out,
+                        dictionary_columns=["indicator"],
+                        decimals={"estimate": CENSUS_DECIMALS},
+                    )
+                )
+            else:
+                body = records_to_json(out)
+            args["bytes"] = len(body)
+
+        # Save and upload
+        census_payloads[name] = body
+        output.publish(f"census-data/{name}.json", body)
+
+    # Also save all names in a single bundle with a byte-offset index
+    # NOTE: the bundle isn't compressed so that range requests work
+    with span("census-data.bundle", "serialize") as args:
+        bundle_body, bundle_index = bundle(census_payloads)
+        args["bytes"] = len(bundle_body)
+    output.publish("census-data.bundle.json", bundle_body, content_encoding="identity")
+    output.publish(
+        "census-data.index.json",
+        dumps({"bundle": "census-data.bundle.json", "entries": bundle_index}),
+    )
+
+
+def publish_trends(trends: pd.DataFrame, output: Output):
+    """Save and upload the trend variables for each indicator."""
+    for name, df in trends.groupby("indicator"):
+        # Don't need the indicator column
+        out = df.drop(columns=["indicator"])
+
+        # Serialize
+        with span("trends", "serialize", name=name) as args:
+            if output.output_format == "columnar":
+                body = dumps(to_columnar(out, decimals={"estimate": CENSUS_DECIMALS}))
+            else:
+                body = records_to_json(out)
+            args["bytes"] = len(body)
+
+        output.publish(f"trends/{name}.json", body)
+
+
+def save_cube(cube: IndicatorCube, output: Output):
+    """Save the indicator cube to the data folder; it isn't uploaded."""
+    with span("cube", "output", bytes=cube.values.nbytes):
+        cube.save(get_cube_path(version=output.version))
+
+
+def get_data_stages(version: str) -> list[Stage]:
+    """
+    Return the stages that produce the output data, without publishing it.
+
+    The census stages are cached, so other consumers of the outputs (e.g.,
+    the query service) reuse the results of the last ETL run. They are keyed
+    by the ACS year, scope, and geographies, and by a hash of the indicator
+    definitions and code, so they are recalculated when any of them change.
+    """
+    indicators_key = get_indicators_key()
+    return [
+        Stage("spi", get_spi_output, params={"version": version}),
+        Stage("metadata", get_spi_metadata, params={"version": version}),
+        Stage(
+            "census",
+            get_census_indicators,
+            params={
+                "year": ACS_YEAR,
+                "scope": PHILADELPHIA,
+                "geographies": GEOGRAPHIES,
+            },
+            cache=True,
+            key=indicators_key,
+        ),
+        Stage(
+            "trends",
+            get_trend_variables,
+            params={"year": ACS_YEAR},
+            cache=True,
+            key=indicators_key,
+        ),
+    ]
+
+
+def get_etl_pipeline(output: Output, max_workers: int = 4) -> Pipeline:
+    """
+    Return the ETL pipeline.
+
+    The SPI data, metadata, census indicators, and trend variables are
+    independent, and each is published as soon as it is ready. The census
+    stages query the Census API, so their outputs are cached between runs.
+    The SPI data and census indicators are also combined into an
+    :class:`IndicatorCube` for fast lookups.
+    """
+    return Pipeline(
+        [
+            *get_data_stages(output.version),
+            Stage("publish-spi", publish_spi, ["spi"], {"output": output}),
+            Stage(
+                "publish-metadata", publish_metadata, ["metadata"], {"output": output}
+            ),
+            Stage("publish-census", publish_census, ["census"], {"output": output}),
+            Stage("publish-trends", publish_trends, ["trends"], {"output": output}),
+            Stage("cube", build_cube, ["spi", "census"]),
+            Stage("save-cube", save_cube, ["cube"], {"output": output}),
+        ],
+        max_workers=max_workers,
+    )
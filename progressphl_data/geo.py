@@ -1,11 +1,24 @@
+from __future__ import annotations
+
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
 import geopandas as gpd
 import pandas as pd
 import pygris
 
 from . import DATA_DIR
+from .scope import PHILADELPHIA, Scope
 
 EPSG = 2272
 
+# The supported output formats for geographies: file extension and driver
+GEO_FORMATS = {
+    "geojson": ("geojson", "GeoJSON"),
+    "parquet": ("parquet", None),
+    "flatgeobuf": ("fgb", "FlatGeobuf"),
+}
+
 
 def get_city_limits() -> gpd.GeoDataFrame:
     """
@@ -22,25 +35,84 @@ def get_city_limits() -> gpd.GeoDataFrame:
     )
 
 
-def get_census_tracts() -> gpd.GeoDataFrame:
+def get_counties(scope: Scope = PHILADELPHIA) -> gpd.GeoDataFrame:
     """
-    Return Philadelphia census tracts.
+    Return county boundaries from the Census.
 
-    This returns the census tracts as defined in the 2010 Census.
+    Parameters
+    ----------
+    scope :
+        The county to return, or all counties in a state
+    """
+    counties = pygris.counties(state=scope.state, year=2019, cache=True)
+    if scope.county is not None:
+        counties = counties.loc[counties["COUNTYFP"] == scope.county]
+
+    return (
+        counties.rename(columns={"GEOID": "id", "NAMELSAD": "name"})[
+            ["id", "name", "geometry"]
+        ]
+        .to_crs(epsg=EPSG)
+        .sort_values("id", ignore_index=True)
+    )
+
+
+def get_census_tracts(scope: Scope = PHILADELPHIA) -> gpd.GeoDataFrame:
+    """
+    Return census tracts, by default for Philadelphia.
+
+    This returns the census tracts as defined in the 2010 Census. The
+    boundary files are cached on disk, so they are shared between runs.
+
+    Parameters
+    ----------
+    scope :
+        The county (or state) to get tracts for
+    """
+    # Use 2019 by default
+    return (
+        pygris.tracts(state=scope.state, county=scope.county, year=2019, cache=True)
+        .rename(columns={"GEOID": "id", "NAMELSAD": "name"})[["id", "name", "geometry"]]
+        .to_crs(epsg=EPSG)
+        .sort_values("id", ignore_index=True)
+    )
+
+
+def get_block_groups(scope: Scope = PHILADELPHIA) -> gpd.GeoDataFrame:
+    """
+    Return census block groups, by default for Philadelphia.
+
+    This returns the block groups as defined in the 2010 Census. Block
+    groups nest within tracts: the first 11 digits of the "id" are the tract
+    geoid.
+
+    Parameters
+    ----------
+    scope :
+        The county (or state) to get block groups for
     """
+    # Use 2019 by default, to match the tracts
     return (
-        pygris.tracts(state="42", county="101", year=2019)  # Use 2019 by default
+        pygris.block_groups(
+            state=scope.state, county=scope.county, year=2019, cache=True
+        )
         .rename(columns={"GEOID": "id", "NAMELSAD": "name"})[["id", "name", "geometry"]]
         .to_crs(epsg=EPSG)
         .sort_values("id", ignore_index=True)
     )
 
 
-def get_neighborhoods() -> gpd.GeoDataFrame:
+def get_neighborhoods(tracts: gpd.GeoDataFrame | None = None) -> gpd.GeoDataFrame:
     """
     Return Philadelphia neighborhoods.
 
     These neighborhoods are defined as exact groupings of census tracts.
+
+    Parameters
+    ----------
+    tracts :
+        The census tracts to dissolve; by default, they are loaded with
+        :func:`get_census_tracts`
     """
 
     # Load neighborhood definitions
@@ -49,7 +121,8 @@ def get_neighborhoods() -> gpd.GeoDataFrame:
     )
 
     # Load census tracts
-    tracts = get_census_tracts()
+    if tracts is None:
+        tracts = get_census_tracts()
 
     # Dissolve and return
     return (
@@ -62,16 +135,27 @@ def get_neighborhoods() -> gpd.GeoDataFrame:
     )
 
 
-def get_pumas(use_census=False) -> gpd.GeoDataFrame:
+def get_pumas(
+    use_census=False, tracts: gpd.GeoDataFrame | None = None
+) -> gpd.GeoDataFrame:
     """
     Return Philadelphia Public Use Microdata Areas (PUMAs).
 
     The returns PUMAs as defined in the 2010 Census.
+
+    Parameters
+    ----------
+    use_census :
+        If True, use the PUMA boundaries from the Census; otherwise, dissolve
+        census tracts
+    tracts :
+        The census tracts to dissolve; by default, they are loaded with
+        :func:`get_census_tracts`
     """
     if use_census:
         # Get the raw geometries
         pumas = (
-            pygris.pumas(state="42", year=2019)  # Use 2019 by default
+            pygris.pumas(state="42", year=2019, cache=True)  # Use 2019 by default
             .query("NAMELSAD10.str.contains('Philadelphia City', na=False)")
             .rename(columns={"GEOID10": "id", "NAMELSAD10": "name"})[
                 ["id", "name", "geometry"]
@@ -105,7 +189,8 @@ def get_pumas(use_census=False) -> gpd.GeoDataFrame:
         )
 
         # Load census tracts
-        tracts = get_census_tracts()
+        if tracts is None:
+            tracts = get_census_tracts()
 
         # Dissolve and return
         pumas = (
@@ -118,3 +203,63 @@ def get_pumas(use_census=False) -> gpd.GeoDataFrame:
         )
 
     return pumas
+
+
+def _write_layer(layer: gpd.GeoDataFrame, path: Path, driver: str | None):
+    if driver is None:
+        layer.to_parquet(path)
+    else:
+        # Some drivers don't overwrite existing files
+        path.unlink(missing_ok=True)
+        layer.to_file(path, driver=driver)
+
+
+def write_layers(
+    layers: dict[str, gpd.GeoDataFrame],
+    folder: Path,
+    formats: list[str] | None = None,
+    max_workers: int = 4,
+) -> list[Path]:
+    """
+    Save geography layers in one or more formats, concurrently.
+
+    Parameters
+    ----------
+    layers :
+        The layers to save, keyed by file name (without the extension)
+    folder :
+        The output folder
+    formats :
+        The formats to save: "geojson" (the default), "parquet" (GeoParquet),
+        and/or "flatgeobuf"
+    max_workers :
+        The maximum number of files to write at once
+
+    Returns
+    -------
+    The paths of the saved files.
+    """
+    if formats is None:
+        formats = ["geojson"]
+    for fmt in formats:
+        if fmt not in GEO_FORMATS:
+            raise ValueError(
+                f"Unrecognized format '{fmt}'; allowed: {list(GEO_FORMATS)}"
+            )
+
+    folder = Path(folder)
+    folder.mkdir(parents=True, exist_ok=True)
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = {}
+        for name, layer in layers.items():
+            for fmt in formats:
+                extension, driver = GEO_FORMATS[fmt]
+                path = folder / f"{name}.{extension}"
+                futures[path] = executor.submit(_write_layer, layer, path, driver)
+
+        # Raise any errors
+        for future in futures.values():
+            future.result()
+
+    return list(futures)
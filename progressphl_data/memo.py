@@ -0,0 +1,116 @@
+from __future__ import annotations
+
+import threading
+from concurrent.futures import Future
+from typing import Any, Callable, Hashable
+
+__all__ = ["RunCache", "memoize_batch"]
+
+# The active run cache, if any
+_cache: RunCache | None = None
+
+
+class RunCache:
+    """
+    Memoize results within a single run, across threads.
+
+    Each result is stored as a future, keyed by the caller (e.g., by
+    indicator, year, and geography). The first caller to request a key
+    computes it, and concurrent callers wait on the same future rather
+    than computing it again. Results are shared, so callers must not
+    modify them.
+
+    Results are only memoized while the cache is active; see
+    :func:`memoize_batch`.
+
+    Examples
+    --------
+    >>> with RunCache():
+    ...     census = get_census_indicators()
+    ...     trends = get_trend_variables()  # Reuses the shared indicators
+    """
+
+    def __init__(self):
+        self._futures: dict[Hashable, Future] = {}
+        self._lock = threading.Lock()
+
+    def __enter__(self) -> RunCache:
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.stop()
+
+    def start(self):
+        """Start memoizing, making this the active cache."""
+        global _cache
+        if _cache is not None:
+            raise RuntimeError("Another run cache is already active")
+        _cache = self
+
+    def stop(self):
+        """Stop memoizing and clear the results."""
+        global _cache
+        if _cache is self:
+            _cache = None
+        with self._lock:
+            self._futures.clear()
+
+    def __len__(self) -> int:
+        return len(self._futures)
+
+    def claim(self, keys: list[Hashable]) -> tuple[dict[Hashable, Future], list]:
+        """
+        Return the future for each key, and the keys the caller must compute.
+
+        Unclaimed keys get a new future, which the caller must resolve with
+        :meth:`Future.set_result` (or :meth:`Future.set_exception`).
+        """
+        futures = {}
+        owned = []
+        with self._lock:
+            for key in keys:
+                if key not in self._futures:
+                    self._futures[key] = Future()
+                    owned.append(key)
+                futures[key] = self._futures[key]
+        return futures, owned
+
+
+def memoize_batch(
+    keys: list[Hashable], compute: Callable[[list], dict[Hashable, Any]]
+) -> tuple[dict[Hashable, Any], int]:
+    """
+    Compute results for a batch of keys, reusing results from the active cache.
+
+    Parameters
+    ----------
+    keys :
+        The keys to return results for
+    compute :
+        A function that computes the results for a list of keys, returning
+        a dict from key to result; it is called once, with only the keys
+        that haven't been computed (or claimed) by another caller
+
+    Returns
+    -------
+    The result for each key, and the number of keys that were reused.
+    """
+    cache = _cache
+    if cache is None:
+        return compute(keys), 0
+
+    # Compute the keys no one else has claimed
+    futures, owned = cache.claim(keys)
+    if owned:
+        try:
+            results = compute(owned)
+        except BaseException as e:
+            for key in owned:
+                futures[key].set_exception(e)
+            raise
+        for key in owned:
+            futures[key].set_result(results.get(key))
+
+    # Wait for any keys being computed by other callers
+    return {key: futures[key].result() for key in keys}, len(keys) - len(owned)
@@ -0,0 +1,121 @@
+from __future__ import annotations
+
+import json
+from functools import lru_cache
+from typing import Literal
+
+import numpy as np
+import pandas as pd
+
+from . import DATA_DIR
+
+__all__ = ["MetadataRegistry", "get_metadata"]
+
+# Variables stored as fractions that should be shown as percentages
+RESCALE_VARIABLES = [
+    "associate_degree_holders",
+    "eviction_rate",
+    "food_stamp_usage",
+    "no_plumbing",
+]
+
+
+class MetadataRegistry:
+    """
+    The compiled SPI metadata for a single version.
+
+    The metadata files are parsed once, and lookups derived from them
+    (inverted variables, parents, hierarchy levels) are precomputed as
+    arrays aligned with :attr:`names`.
+
+    Parameters
+    ----------
+    version :
+        The SPI version
+    """
+
+    TAGS = ["variables", "hierarchy", "definitions", "aliases"]
+
+    def __init__(self, version: Literal["1", "2"] = "2"):
+        meta_data_dir = DATA_DIR / f"v{version}" / "meta"
+        if not meta_data_dir.exists():
+            raise ValueError(f"No metadata for specified version '{version}'")
+        self.version = version
+
+        # Load the raw metadata
+        self._raw = {}
+        for tag in self.TAGS:
+            with (meta_data_dir / f"{tag}.json").open("r") as f:
+                self._raw[tag] = json.load(f)
+
+        # The raw column name to variable name mapping
+        self.variables: dict[str, str] = self._raw["variables"]
+        self.hierarchy: dict[str, list[str]] = self._raw["hierarchy"]
+        self.definitions: dict[str, dict] = self._raw["definitions"]
+        self.aliases: dict[str, str] = self._raw["aliases"]
+
+        # All variable names and their positions
+        self.names = pd.Index(list(dict.fromkeys(self.variables.values())))
+
+        # Which variables are inverted (lower values are better)
+        self.inverted = sorted(
+            name for name, d in self.definitions.items() if d["inverted"]
+        )
+        self.inverted_mask = self.names.isin(self.inverted)
+
+        # Child to parent mapping
+        self.parents = {child: k for k, v in self.hierarchy.items() for child in v}
+        self.parent_index = self.names.get_indexer(
+            [self.parents.get(name) for name in self.names]
+        )
+
+        # Hierarchy levels, starting from the root(s)
+        self.levels = []
+        level = [k for k in self.hierarchy if k not in self.parents]
+        while level:
+            self.levels.append(level)
+            level = [c for k in level for c in self.hierarchy.get(k, [])]
+
+        # Variables that need to be rescaled to percentages
+        self.rescale = [name for name in RESCALE_VARIABLES if name in self.names]
+
+    def __getitem__(self, tag: str) -> dict:
+        """Return the raw metadata for a tag, e.g., "hierarchy"."""
+        return self._raw[tag]
+
+    def __repr__(self) -> str:
+        return f"MetadataRegistry(version={self.version!r})"
+
+    def is_inverted(self, variables: list[str]) -> np.ndarray:
+        """Return a boolean mask of which input variables are inverted."""
+        index = self.names.get_indexer(variables)
+        return np.where(index >= 0, self.inverted_mask[index], False)
+
+    def parent_of(self, variables: list[str]) -> np.ndarray:
+        """Return the parent of each input variable (None if no parent)."""
+        index = self.names.get_indexer(variables)
+        parent_index = np.where(index >= 0, self.parent_index[index], -1)
+        parents = self.names.to_numpy(dtype=object)[parent_index]
+        parents[parent_index < 0] = None
+        return parents
+
+    def descendants(self, variables: list[str]) -> list[str]:
+        """Expand the input variables to include all of their descendants."""
+        out = []
+        queue = list(variables)
+        while queue:
+            variable = queue.pop(0)
+            if variable not in out:
+                out.append(variable)
+                queue += self.hierarchy.get(variable, [])
+        return out
+
+
+@lru_cache(maxsize=None)
+def get_metadata(version: Literal["1", "2"] = "2") -> MetadataRegistry:
+    """
+    Return the (memoized) metadata registry for a version.
+
+    Note that the registry is shared, so it should not be modified.
+    """
+    return MetadataRegistry(version=version)
@@ -0,0 +1,200 @@
+from __future__ import annotations
+
+import hashlib
+import os
+import pickle
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Callable
+
+from . import DATA_DIR, __version__
+from .profiling import span
+
+__all__ = ["Pipeline", "Stage"]
+
+
+@dataclass
+class Stage:
+    """
+    A named step in a pipeline.
+
+    Parameters
+    ----------
+    name :
+        The name of the stage
+    func :
+        The function to run; it is called with the outputs of its
+        dependencies as keyword arguments (keyed by dependency name), plus
+        any parameters
+    deps :
+        The names of the stages this stage depends on
+    params :
+        Extra inputs passed to the function; these are part of the cache key
+    cache :
+        Whether to persist the output of this stage
+    key :
+        Extra inputs to the cache key that aren't passed to the function,
+        e.g., a hash of the code or definitions the output depends on
+    """
+
+    name: str
+    func: Callable[..., Any]
+    deps: list[str] = field(default_factory=list)
+    params: dict[str, Any] = field(default_factory=dict)
+    cache: bool = False
+    key: str = ""
+
+
+class Pipeline:
+    """
+    A dependency graph of stages, run concurrently where possible.
+
+    Each stage runs as soon as all of its dependencies have finished, on a
+    shared thread pool. Outputs of cached stages are persisted to disk,
+    keyed by a hash of the stage's name, parameters, key, and the keys of its
+    dependencies, and are reused on later runs.
+
+    Parameters
+    ----------
+    stages :
+        The stages in the pipeline
+    cache_dir :
+        The folder to persist stage outputs in
+    max_workers :
+        The maximum number of stages to run at once
+    """
+
+    def __init__(
+        self,
+        stages: list[Stage],
+        cache_dir: Path = DATA_DIR / "stages",
+        max_workers: int = 4,
+    ):
+        self.stages = {stage.name: stage for stage in stages}
+        self.cache_dir = Path(cache_dir)
+        self.max_workers = max_workers
+
+        # Check the dependencies
+        for stage in stages:
+            for dep in stage.deps:
+                if dep not in self.stages:
+                    raise ValueError(f"Unknown dependency '{dep}' of '{stage.name}'")
+
+    def _get_required(self, targets: list[str]) -> list[str]:
+        """Return the targets and all of their dependencies, in run order."""
+        order = []
+        visiting = set()
+
+        def visit(name):
+            if name in order:
+                return
+            if name in visiting:
+                raise ValueError(f"Cycle detected at stage '{name}'")
+            if name not in self.stages:
+                raise ValueError(f"Unknown stage '{name}'")
+            visiting.add(name)
+            for dep in self.stages[name].deps:
+                visit(dep)
+            visiting.discard(name)
+            order.append(name)
+
+        for name in targets:
+            visit(name)
+        return order
+
+    def get_key(self, name: str) -> str:
+        """The cache key of a stage, based on all of its inputs."""
+        stage = self.stages[name]
+        sha = hashlib.sha256()
+        sha.update(f"{__version__}:{name}:{sorted(stage.params.items())!r}".encode())
+        sha.update(stage.key.encode())
+        for dep in stage.deps:
+            sha.update(self.get_key(dep).encode())
+        return sha.hexdigest()[:16]
+
+    def _get_cache_path(self, name: str) -> Path:
+        return self.cache_dir / f"{name}-{self.get_key(name)}.pkl"
+
+    def _run_stage(self, name: str, inputs: dict[str, Any], fresh: bool) -> Any:
+        """Run a single stage, using the cached output if possible."""
+        stage = self.stages[name]
+        path = self._get_cache_path(name) if stage.cache else None
+
+        with span(name, "stage") as args:
+            # Use the cache
+            if stage.cache and not fresh and path.exists():
+                args["cached"] = True
+                with path.open("rb") as f:
+                    return pickle.load(f)
+
+            # Run the stage
+            kwargs = {dep: inputs[dep] for dep in stage.deps}
+            result = stage.func(**kwargs, **stage.params)
+
+            # Save atomically, removing stale outputs for this stage
+            # NOTE: the temporary file doesn't match the "{name}-*.pkl" outputs
+            if stage.cache:
+                self.cache_dir.mkdir(parents=True, exist_ok=True)
+                for stale in self.cache_dir.glob(f"{name}-*.pkl"):
+                    stale.unlink(missing_ok=True)
+                tmp = self.cache_dir / f"{name}.{os.getpid()}.tmp"
+                with tmp.open("wb") as f:
+                    pickle.dump(result, f)
+                os.replace(tmp, path)
+
+            return result
+
+    def run(
+        self, targets: list[str] | None = None, fresh: list[str] | bool = False
+    ) -> dict[str, Any]:
+        """
+        Run the stages needed for the specified targets.
+
+        Parameters
+        ----------
+        targets :
+            The stages to run, along with their dependencies; by default,
+            all stages are run
+        fresh :
+            The stages to re-run even if a cached output exists, or True to
+            re-run all stages
+
+        Returns
+        -------
+        The outputs of all stages that were run, keyed by name.
+        """
+        if targets is None:
+            targets = list(self.stages)
+        required = self._get_required(targets)
+        if fresh is True:
+            fresh = required
+        fresh = set(fresh or [])
+
+        outputs: dict[str, Any] = {}
+        pending = list(required)
+        running: dict[Future, str] = {}
+
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            while pending or running:
+                # Submit everything that is ready
+                for name in list(pending):
+                    if all(dep in outputs for dep in self.stages[name].deps):
+                        pending.remove(name)
+                        future = executor.submit(
+                            self._run_stage, name, outputs, name in fresh
+                        )
+                        running[future] = name
+
+                # Wait for the next stage to finish
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    name = running.pop(future)
+                    try:
+                        outputs[name] = future.result()
+                    except BaseException:
+                        for other in running:
+                            other.cancel()
+                        raise
+
+        return outputs
@@ -0,0 +1,352 @@
+from __future__ import annotations
+
+import json
+import os
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Iterator
+
+__all__ = ["Profiler", "event", "span"]
+
+# The active profiler, if any
+_profiler: Profiler | None = None
+
+
+@dataclass
+class Span:
+    """A timed (or instant) event recorded by a profiler."""
+
+    name: str
+    category: str
+    start: float
+    thread: int
+    thread_name: str
+    args: dict[str, Any] = field(default_factory=dict)
+    duration: float | None = None
+    peak_memory: int = 0
+
+
+class Profiler:
+    """
+    Record the wall time and peak memory of instrumented code.
+
+    Code is instrumented with :func:`span` and :func:`event`, which are
+    no-ops unless a profiler is active. While active, the profiler traces
+    memory allocations with :mod:`tracemalloc` and samples the traced
+    memory on a background thread; the peak memory of a span is the highest
+    sample taken while it was open. Note that spans that overlap in time
+    (e.g., concurrent pipeline stages) share the same samples.
+
+    Parameters
+    ----------
+    memory :
+        Whether to trace memory usage; tracing slows down allocation-heavy
+        code, so disable it for more accurate timings
+    interval :
+        The time between memory samples, in seconds
+
+    Examples
+    --------
+    >>> with Profiler() as profiler:
+    ...     pipeline.run()
+    >>> print(profiler.summary())
+    >>> profiler.save("profile.json")
+    """
+
+    def __init__(self, memory: bool = True, interval: float = 0.01):
+        self.memory = memory
+        self.interval = interval
+
+        self.spans: list[Span] = []
+        self.samples: list[tuple[float, int]] = []
+        self.peak_memory = 0
+        self._open: list[Span] = []
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._sampler: threading.Thread | None = None
+        self._started_tracemalloc = False
+        self._start = None
+        self._end = None
+
+    def __enter__(self) -> Profiler:
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.stop()
+
+    def start(self):
+        """Start profiling, making this the active profiler."""
+        global _profiler
+        if _profiler is not None:
+            raise RuntimeError("Another profiler is already active")
+        _profiler = self
+        self._start = time.perf_counter()
+
+        # Start sampling memory
+        if self.memory:
+            self._started_tracemalloc = not tracemalloc.is_tracing()
+            if self._started_tracemalloc:
+                tracemalloc.start()
+            self._stop.clear()
+            self._sampler = threading.Thread(
+                target=self._sample_loop, name="profiler-memory", daemon=True
+            )
+            self._sampler.start()
+
+    def stop(self):
+        """Stop profiling."""
+        global _profiler
+        if _profiler is self:
+            _profiler = None
+        self._end = time.perf_counter()
+
+        # Stop sampling memory
+        if self._sampler is not None:
+            self._stop.set()
+            self._sampler.join()
+            self._sampler = None
+            if self._started_tracemalloc:
+                tracemalloc.stop()
+
+    def _sample(self) -> int:
+        """Record the traced memory, updating the peak of any open spans."""
+        if not tracemalloc.is_tracing():
+            return 0
+        current = tracemalloc.get_traced_memory()[0]
+        with self._lock:
+            self.samples.append((time.perf_counter(), current))
+            self.peak_memory = max(self.peak_memory, current)
+            for s in self._open:
+                s.peak_memory = max(s.peak_memory, current)
+        return current
+
+    def _sample_loop(self):
+        while not self._stop.wait(self.interval):
+            self._sample()
+
+    def _new_span(self, name: str, category: str, args: dict) -> Span:
+        thread = threading.current_thread()
+        return Span(
+            name=name,
+            category=category,
+            start=time.perf_counter(),
+            thread=thread.ident,
+            thread_name=thread.name,
+            args=args,
+        )
+
+    @contextmanager
+    def span(self, name: str, category: str, /, **args) -> Iterator[dict[str, Any]]:
+        """Time a block of code; see :func:`span`."""
+        s = self._new_span(name, category, args)
+        with self._lock:
+            self._open.append(s)
+        if self.memory:
+            self._sample()
+        try:
+            yield s.args
+        finally:
+            if self.memory:
+                self._sample()
+            s.duration = time.perf_counter() - s.start
+            with self._lock:
+                self._open.remove(s)
+                self.spans.append(s)
+
+    def event(self, name: str, category: str, /, **args):
+        """Record an instant event; see :func:`event`."""
+        s = self._new_span(name, category, args)
+        with self._lock:
+            self.spans.append(s)
+
+    @property
+    def elapsed(self) -> float:
+        """The time since profiling started (until stopped)."""
+        if self._start is None:
+            return 0.0
+        end = self._end if self._end is not None else time.perf_counter()
+        return end - self._start
+
+    def report(self) -> dict:
+        """
+        Return the profile as a JSON-serializable dict.
+
+        The report includes every recorded span, plus summary statistics for
+        each (category, name) pair: the number of calls, their total, mean,
+        and max latency, the highest peak memory, the total bytes, and the
+        number of cache hits. Spans report bytes and cache hits through their
+        "bytes" and "cached" arguments.
+        """
+        with self._lock:
+            spans = sorted(self.spans, key=lambda s: s.start)
+
+        # Summarize each (category, name) pair
+        summary: dict[str, dict[str, dict]] = {}
+        timed: dict[tuple[str, str], int] = {}
+        for s in spans:
+            stats = summary.setdefault(s.category, {}).setdefault(
+                s.name,
+                {
+                    "count": 0,
+                    "total_time": 0.0,
+                    "mean_time": 0.0,
+                    "max_time": 0.0,
+                    "peak_memory": 0,
+                    "bytes": 0,
+                    "cache_hits": 0,
+                },
+            )
+            stats["count"] += 1
+            if s.duration is not None:
+                timed[s.category, s.name] = timed.get((s.category, s.name), 0) + 1
+                stats["total_time"] += s.duration
+                stats["max_time"] = max(stats["max_time"], s.duration)
+            stats["peak_memory"] = max(stats["peak_memory"], s.peak_memory)
+            stats["bytes"] += int(s.args.get("bytes", 0) or 0)
+            stats["cache_hits"] += int(bool(s.args.get("cached", False)))
+        for category, names in summary.items():
+            for name, stats in names.items():
+                count = timed.get((category, name), 0)
+                stats["mean_time"] = stats["total_time"] / max(count, 1)
+
+        return {
+            "wall_time": self.elapsed,
+            "peak_memory": self.peak_memory,
+            "summary": summary,
+            "spans": [
+                {
+                    "name": s.name,
+                    "category": s.category,
+                    "start": s.start - self._start,
+                    "duration": s.duration,
+                    "peak_memory": s.peak_memory,
+                    "thread": s.thread_name,
+                    "args": s.args,
+                }
+                for s in spans
+            ],
+        }
+
+    def trace(self) -> dict:
+        """
+        Return the profile in the Chrome trace event format.
+
+        The trace can be opened in ``chrome://tracing`` or Perfetto. Each
+        thread is shown as a separate track, with the traced memory as a
+        counter.
+        """
+        pid = os.getpid()
+
+        def _us(t: float) -> float:
+            return (t - self._start) * 1e6
+
+        with self._lock:
+            spans = list(self.spans)
+            samples = list(self.samples)
+
+        # Name the threads
+        events = []
+        threads = {s.thread: s.thread_name for s in spans}
+        for tid, thread_name in threads.items():
+            events.append(
+                {
+                    "name": "thread_name",
+                    "ph": "M",
+                    "pid": pid,
+                    "tid": tid,
+                    "args": {"name": thread_name},
+                }
+            )
+
+        # Spans and instant events
+        for s in spans:
+            e = {
+                "name": s.name,
+                "cat": s.category,
+                "pid": pid,
+                "tid": s.thread,
+                "ts": _us(s.start),
+                "args": {**s.args, "peak_memory": s.peak_memory},
+            }
+            if s.duration is None:
+                e.update(ph="i", s="t")
+            else:
+                e.update(ph="X", dur=s.duration * 1e6)
+            events.append(e)
+
+        # Memory counter
+        for t, current in samples:
+            events.append(
+                {
+                    "name": "traced memory",
+                    "ph": "C",
+                    "pid": pid,
+                    "ts": _us(t),
+                    "args": {"MB": current / 1e6},
+                }
+            )
+
+        return {"traceEvents": events, "displayTimeUnit": "ms"}
+
+    def save(self, path: Path | str):
+        """Save the JSON report."""
+        Path(path).write_text(json.dumps(self.report(), indent=2, default=str))
+
+    def save_trace(self, path: Path | str):
+        """Save the Chrome trace."""
+        Path(path).write_text(json.dumps(self.trace(), default=str))
+
+    def summary(self) -> str:
+        """A table of the time and peak memory of each (category, name) pair."""
+        report = self.report()
+        lines = [
+            f"Profiled {report['wall_time']:.1f} s, "
+            f"peak memory {report['peak_memory'] / 1e6:.1f} MB",
+            f"{'category':<12} {'name':<32} {'count':>6} {'total (s)':>10} "
+            f"{'mean (s)':>9} {'peak (MB)':>10} {'MB':>8} {'hits':>6}",
+        ]
+        for category, names in report["summary"].items():
+            for name, stats in sorted(
+                names.items(), key=lambda item: -item[1]["total_time"]
+            ):
+                lines.append(
+                    f"{category:<12} {name[:32]:<32} {stats['count']:>6} "
+                    f"{stats['total_time']:>10.2f} {stats['mean_time']:>9.3f} "
+                    f"{stats['peak_memory'] / 1e6:>10.1f} "
+                    f"{stats['bytes'] / 1e6:>8.2f} {stats['cache_hits']:>6}"
+                )
+        return "\n".join(lines)
+
+
+@contextmanager
+def span(name: str, category: str, /, **args) -> Iterator[dict[str, Any]]:
+    """
+    Time a block of code with the active profiler, if any.
+
+    Yields the span's arguments, which can be updated inside the block to
+    record extra metrics (e.g., "bytes" or "cached").
+
+    Examples
+    --------
+    >>> with span("get_places_data", "cdc", measure=measure) as args:
+    ...     r = httpx.get(url, params=params)
+    ...     args["bytes"] = len(r.content)
+    """
+    profiler = _profiler
+    if profiler is None:
+        yield args
+    else:
+        with profiler.span(name, category, **args) as out:
+            yield out
+
+
+def event(name: str, category: str, /, **args):
+    """Record an instant event with the active profiler, if any."""
+    profiler = _profiler
+    if profiler is not None:
+        profiler.event(name, category, **args)
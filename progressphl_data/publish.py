@@ -0,0 +1,293 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from pathlib import Path
+
+import boto3
+from botocore.config import Config
+from botocore.exceptions import ClientError
+
+from .profiling import event, span
+from .serialize import compress
+
+__all__ = ["S3Publisher"]
+
+# The bucket the dashboard reads from
+BUCKET = "spi-dashboard-data"
+
+
+def _hash_object(body: bytes, kwargs: dict) -> str:
+    """Hash an object's contents and any upload options (e.g., encoding)."""
+    sha = hashlib.sha256(body)
+    sha.update(json.dumps(kwargs, sort_keys=True, default=str).encode("utf-8"))
+    return sha.hexdigest()
+
+
+class S3Publisher:
+    """
+    Upload objects to s3 concurrently through a shared client.
+
+    Uploads are run on a bounded thread pool: at most ``max_workers``
+    uploads run at once, and :meth:`put` blocks once ``2 * max_workers``
+    uploads are pending. Failed requests are retried by the client, with
+    botocore's exponential backoff. Bodies are compressed on the pool with
+    the specified content encoding.
+
+    If a manifest key is given, the content hash of every published object
+    is tracked in a manifest that is stored on s3 (and optionally locally).
+    Objects whose hash matches the previous manifest are skipped, and
+    objects from the previous manifest that were not published in this run
+    are deleted when the publisher is closed.
+
+    Parameters
+    ----------
+    bucket :
+        The name of the s3 bucket
+    max_workers :
+        The maximum number of concurrent uploads
+    max_retries :
+        The number of times to retry a failed request (if a client is given,
+        its own retry configuration is used instead)
+    acl :
+        The canned ACL for uploaded objects
+    client :
+        An existing s3 client to use; by default, a new client is created
+    content_encoding :
+        The default content encoding ("gzip", "br", or "identity")
+    content_type :
+        The content type of uploaded objects
+    manifest_key :
+        The s3 key of the manifest of content hashes; if not provided, every
+        object is uploaded
+    manifest_path :
+        Where to save a local copy of the manifest, for reference; it is
+        never used to skip uploads, since it may not match the bucket
+    force :
+        If True, upload every object even if it is unchanged
+
+    Examples
+    --------
+    >>> with S3Publisher(manifest_key="v2/manifest.json") as publisher:
+    ...     publisher.put("v2/spi-data.json", body)
+    >>> print(publisher.summary())
+    """
+
+    def __init__(
+        self,
+        bucket: str = BUCKET,
+        max_workers: int = 16,
+        max_retries: int = 5,
+        acl: str | None = "public-read",
+        client=None,
+        content_encoding: str = "gzip",
+        content_type: str | None = "application/json",
+        manifest_key: str | None = None,
+        manifest_path: Path | None = None,
+        force: bool = False,
+    ):
+        if client is None:
+            config = Config(
+                max_pool_connections=max_workers,
+                retries={"mode": "standard", "total_max_attempts": max_retries + 1},
+            )
+            client = boto3.client("s3", config=config)
+        self.client = client
+        self.bucket = bucket
+        self.acl = acl
+        self.content_encoding = content_encoding
+        self.content_type = content_type
+        self.force = force
+
+        # The bounded pool
+        self._executor = ThreadPoolExecutor(
+            max_workers=max_workers, thread_name_prefix="s3-publisher"
+        )
+        self._slots = threading.BoundedSemaphore(2 * max_workers)
+        self._futures: list[Future] = []
+
+        # The previous and current manifests
+        self.manifest_key = manifest_key
+        self.manifest_path = Path(manifest_path) if manifest_path else None
+        self.previous_manifest = self._load_manifest() if manifest_key else {}
+        self.manifest: dict[str, dict] = {}
+
+        # Stats
+        self._lock = threading.Lock()
+        self._start = None
+        self._end = None
+        self.objects = 0
+        self.bytes = 0
+        self.uncompressed_bytes = 0
+        self.retries = 0
+        self.skipped_objects = 0
+        self.skipped_bytes = 0
+        self.deleted_objects = 0
+
+    def __enter__(self) -> S3Publisher:
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        # Don't mask the original error
+        if exc_type is not None:
+            for future in self._futures:
+                future.cancel()
+            self._executor.shutdown(wait=True)
+        else:
+            self.close()
+
+    def _load_manifest(self) -> dict[str, dict]:
+        """Load the previous manifest from s3 (empty if it doesn't exist)."""
+        try:
+            response = self.client.get_object(Bucket=self.bucket, Key=self.manifest_key)
+        except ClientError as e:
+            if e.response.get("Error", {}).get("Code") not in ("NoSuchKey", "404"):
+                raise
+            # Without a manifest on s3, nothing is known to be uploaded
+            return {}
+        return json.loads(response["Body"].read())
+
+    def put(
+        self,
+        key: str,
+        body: bytes | str,
+        content_encoding: str | None = None,
+        **kwargs,
+    ) -> Future | None:
+        """
+        Schedule an upload of ``body`` to ``key``.
+
+        The body is compressed with ``content_encoding`` (by default, the
+        publisher's encoding) before uploading. Any other keyword arguments
+        are passed to the client's ``put_object``. Returns None if the object
+        is unchanged and the upload is skipped.
+        """
+        if isinstance(body, str):
+            body = body.encode("utf-8")
+        if self._start is None:
+            self._start = time.perf_counter()
+
+        # Set the headers
+        if content_encoding is None:
+            content_encoding = self.content_encoding
+        if content_encoding != "identity":
+            kwargs.setdefault("ContentEncoding", content_encoding)
+        if self.content_type is not None:
+            kwargs.setdefault("ContentType", self.content_type)
+
+        # Skip unchanged objects
+        entry = {"hash": _hash_object(body, kwargs), "bytes": len(body)}
+        with self._lock:
+            self.manifest[key] = entry
+        if not self.force and self.previous_manifest.get(key) == entry:
+            with self._lock:
+                self.skipped_objects += 1
+                self.skipped_bytes += len(body)
+            event("s3.put", "s3", key=key, bytes=0, cached=True)
+            return None
+
+        self._slots.acquire()
+        try:
+            future = self._executor.submit(
+                self._put, key, body, content_encoding, kwargs
+            )
+        except BaseException:
+            self._slots.release()
+            raise
+        future.add_done_callback(lambda _: self._slots.release())
+        self._futures.append(future)
+        return future
+
+    def _put(self, key: str, body: bytes, content_encoding: str, kwargs: dict):
+        """Compress and upload a single object."""
+        if self.acl is not None:
+            kwargs = {"ACL": self.acl, **kwargs}
+        uncompressed_bytes = len(body)
+        with span("compress", "s3", key=key, encoding=content_encoding):
+            body = compress(body, content_encoding)
+
+        with span("s3.put", "s3", key=key, bytes=len(body)) as args:
+            response = self.client.put_object(
+                Bucket=self.bucket, Key=key, Body=body, **kwargs
+            )
+            # The client retries transient errors itself
+            retries = response.get("ResponseMetadata", {}).get("RetryAttempts", 0)
+            if retries:
+                args["retries"] = retries
+
+        with self._lock:
+            self.retries += retries
+            self.objects += 1
+            self.bytes += len(body)
+            self.uncompressed_bytes += uncompressed_bytes
+
+    def _delete_removed(self):
+        """Delete objects from the previous manifest not published in this run."""
+        removed = sorted(set(self.previous_manifest) - set(self.manifest))
+        for i in range(0, len(removed), 1000):
+            chunk = removed[i : i + 1000]
+            self.client.delete_objects(
+                Bucket=self.bucket,
+                Delete={"Objects": [{"Key": key} for key in chunk], "Quiet": True},
+            )
+            self.deleted_objects += len(chunk)
+
+    def close(self, delete_removed: bool = True):
+        """
+        Wait for all uploads to finish, raising the first error.
+
+        If a manifest is being tracked, objects that were not published in
+        this run are deleted (if ``delete_removed`` is True, otherwise they
+        are kept in the manifest) and the new manifest is saved.
+        """
+        try:
+            for future in self._futures:
+                future.result()
+        finally:
+            for future in self._futures:
+                future.cancel()
+            self._executor.shutdown(wait=True)
+            self._futures = []
+
+        # Update the manifest
+        if self.manifest_key is not None:
+            if delete_removed:
+                self._delete_removed()
+            else:
+                self.manifest = {**self.previous_manifest, **self.manifest}
+
+            body = json.dumps(self.manifest, indent=2, sort_keys=True)
+            self.client.put_object(
+                Bucket=self.bucket, Key=self.manifest_key, Body=body.encode("utf-8")
+            )
+            if self.manifest_path is not None:
+                self.manifest_path.write_text(body)
+
+            self.previous_manifest = self.manifest
+            self.manifest = {}
+
+        self._end = time.perf_counter()
+
+    @property
+    def elapsed(self) -> float:
+        """The time since the first upload was scheduled (until closed)."""
+        if self._start is None:
+            return 0.0
+        end = self._end if self._end is not None else time.perf_counter()
+        return end - self._start
+
+    def summary(self) -> str:
+        """A summary of the uploads and their throughput."""
+        elapsed = max(self.elapsed, 1e-9)
+        return (
+            f"Uploaded {self.objects} objects ({self.bytes / 1e6:.2f} MB, "
+            f"{self.uncompressed_bytes / 1e6:.2f} MB uncompressed) "
+            f"in {elapsed:.1f} s: {self.objects / elapsed:.1f} objects/s, "
+            f"{self.bytes / 1e6 / elapsed:.2f} MB/s, {self.retries} retries; "
+            f"skipped {self.skipped_objects} unchanged objects "
+            f"({self.skipped_bytes / 1e6:.2f} MB); "
+            f"deleted {self.deleted_objects} removed objects"
+        )
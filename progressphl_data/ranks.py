@@ -0,0 +1,293 @@
+"""A persisted index of SPI ranks and percentiles for "compare" queries."""
+
+from __future__ import annotations
+
+import hashlib
+import os
+import warnings
+from functools import lru_cache
+from pathlib import Path
+from typing import Literal
+
+import numpy as np
+import pandas as pd
+
+from . import DATA_DIR
+from .core import SPIDataset, get_spi_dataset
+from .profiling import span
+
+__all__ = ["RankIndex", "get_rank_index"]
+
+# The percentiles stored for each variable
+PERCENTILES = np.arange(101)
+
+# Bump when the stored arrays change
+INDEX_FORMAT = "1"
+
+
+class RankIndex:
+    """
+    The sorted values, ranks, and percentile boundaries of each SPI variable.
+
+    Values are stored as sort keys, with the sign flipped for variables
+    where higher values are better, so that ascending keys run from the
+    best tract to the worst (as with the ranks in :class:`SPIDataset`).
+    The rank of any value is then a binary search into the sorted keys, and
+    the tracts in a top percentile are a prefix of the sorted order.
+
+    Parameters
+    ----------
+    variables :
+        The variable names
+    geoids :
+        The tract geoids
+    sorted_keys :
+        The sort keys of each variable, ascending, with missing values last;
+        shape (variables, tracts)
+    order :
+        The position of the tract for each sorted key; shape (variables, tracts)
+    ranks :
+        The rank of each tract (NaN if missing); shape (variables, tracts)
+    counts :
+        The number of non-missing values of each variable
+    percentiles :
+        The value at each of :data:`PERCENTILES`; shape (variables, 101)
+    inverted :
+        Whether lower values are better, for each variable
+
+    Examples
+    --------
+    >>> index = get_rank_index(version="2")
+    >>> index.locate("42101000100", "shelter")
+    >>> index.top("shelter", percent=10)  # Top decile, best first
+    """
+
+    def __init__(
+        self,
+        variables: list[str],
+        geoids: list[str],
+        sorted_keys: np.ndarray,
+        order: np.ndarray,
+        ranks: np.ndarray,
+        counts: np.ndarray,
+        percentiles: np.ndarray,
+        inverted: np.ndarray,
+    ):
+        self.variables = [str(v) for v in variables]
+        self.geoids = np.asarray(geoids, dtype=str)
+        self.sorted_keys = sorted_keys
+        self.order = order
+        self.ranks = ranks
+        self.counts = counts
+        self.percentiles = percentiles
+        self.inverted = np.asarray(inverted, dtype=bool)
+
+        # Integer index maps
+        self._variable_index = {v: i for i, v in enumerate(self.variables)}
+        self._geoid_index = {g: i for i, g in enumerate(self.geoids.tolist())}
+
+    def __repr__(self) -> str:
+        return f"RankIndex(variables={len(self.variables)}, tracts={len(self.geoids)})"
+
+    @classmethod
+    def from_values(cls, values: pd.DataFrame, inverted: np.ndarray) -> RankIndex:
+        """
+        Build the index from SPI values in wide format.
+
+        Parameters
+        ----------
+        values :
+            The values, indexed by geoid (or by geoid and tract name), with a
+            column for each variable
+        inverted :
+            Whether lower values are better, for each column
+        """
+        geoids = values.index.get_level_values(0).astype(str)
+        data = values.to_numpy(dtype=float).T
+
+        # Sort keys, with missing values last
+        sign = np.where(inverted, 1.0, -1.0)[:, None]
+        keys = data * sign
+        order = np.argsort(keys, axis=1, kind="stable")
+        sorted_keys = np.take_along_axis(keys, order, axis=1)
+        counts = np.count_nonzero(~np.isnan(keys), axis=1)
+
+        # The minimum rank, so ties share a rank
+        ranks = np.full(keys.shape, np.nan)
+        for i, count in enumerate(counts):
+            valid = ~np.isnan(keys[i])
+            ranks[i, valid] = (
+                np.searchsorted(sorted_keys[i, :count], keys[i, valid], side="left") + 1
+            )
+
+        # Variables without any values have missing percentiles
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore", RuntimeWarning)
+            percentiles = np.nanpercentile(data, PERCENTILES, axis=1).T
+
+        return cls(
+            list(values.columns),
+            list(geoids),
+            sorted_keys,
+            order,
+            ranks,
+            counts,
+            percentiles,
+            inverted,
+        )
+
+    @classmethod
+    def from_dataset(cls, dataset: SPIDataset) -> RankIndex:
+        """Build the index for all of the variables in an SPI dataset."""
+        values = dataset.values
+        return cls.from_values(values, dataset.meta.is_inverted(list(values.columns)))
+
+    def save(self, path: Path | str):
+        """Save the index as a ``.npz`` file."""
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+
+        # Write atomically, so readers never load a partial file
+        # NOTE: the temporary file doesn't match the "ranks-*.npz" indexes
+        tmp = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+        with tmp.open("wb") as f:
+            np.savez(
+                f,
+                variables=np.asarray(self.variables, dtype=str),
+                geoids=self.geoids,
+                sorted_keys=self.sorted_keys,
+                order=self.order,
+                ranks=self.ranks,
+                counts=self.counts,
+                percentiles=self.percentiles,
+                inverted=self.inverted,
+            )
+        os.replace(tmp, path)
+
+    @classmethod
+    def load(cls, path: Path | str) -> RankIndex:
+        """Load an index saved with :meth:`save`."""
+        with np.load(path) as arrays:
+            return cls(**{name: arrays[name] for name in arrays.files})
+
+    def _get_variable(self, variable: str) -> int:
+        try:
+            return self._variable_index[variable]
+        except KeyError:
+            raise ValueError(f"Unknown SPI variable '{variable}'") from None
+
+    def _get_geoid(self, geoid: str) -> int:
+        try:
+            return self._geoid_index[geoid]
+        except KeyError:
+            raise ValueError(f"Unknown geoid '{geoid}'") from None
+
+    def _sign(self, i: int) -> float:
+        return 1.0 if self.inverted[i] else -1.0
+
+    def rank_of(self, variable: str, value: float) -> int:
+        """The rank a value would have among all tracts, for a variable."""
+        i = self._get_variable(variable)
+        keys = self.sorted_keys[i, : self.counts[i]]
+        return int(np.searchsorted(keys, value * self._sign(i), side="left")) + 1
+
+    def percentile_of(self, variable: str, value: float) -> float:
+        """The percent of tracts with a value less than or equal to a value."""
+        i = self._get_variable(variable)
+        count = self.counts[i]
+        keys = self.sorted_keys[i, :count]
+
+        # Keys are ascending values for inverted variables, else descending
+        if self.inverted[i]:
+            n_below = np.searchsorted(keys, value, side="right")
+        else:
+            n_below = count - np.searchsorted(keys, -value, side="left")
+        return 100 * float(n_below) / count if count else np.nan
+
+    def locate(self, geoid: str, variable: str) -> dict:
+        """
+        Return where a tract falls for a variable.
+
+        Returns
+        -------
+        The tract's "value", "rank" (out of "count" tracts), and "percentile"
+        (the percent of tracts with a lower or equal value); the value, rank,
+        and percentile are NaN if the tract's value is missing.
+        """
+        i = self._get_variable(variable)
+        g = self._get_geoid(geoid)
+        rank = self.ranks[i, g]
+        if np.isnan(rank):
+            value = percentile = np.nan
+        else:
+            # Tied tracts share the minimum rank, so this is the tract's key
+            value = float(self.sorted_keys[i, int(rank) - 1] * self._sign(i))
+            percentile = self.percentile_of(variable, value)
+        return {
+            "geoid": geoid,
+            "variable": variable,
+            "value": value,
+            "rank": float(rank),
+            "count": int(self.counts[i]),
+            "percentile": percentile,
+        }
+
+    def boundary(self, variable: str, percent: int) -> float:
+        """
+        The value at the edge of the top percent of tracts for a variable.
+
+        This is the (100 - percent)th percentile, or the percent-th
+        percentile for inverted variables.
+        """
+        i = self._get_variable(variable)
+        if not 0 <= percent <= 100 or int(percent) != percent:
+            raise ValueError("'percent' must be an integer between 0 and 100")
+        percent = int(percent)
+        return float(
+            self.percentiles[i, percent if self.inverted[i] else 100 - percent]
+        )
+
+    def top(self, variable: str, percent: int = 10) -> list[str]:
+        """
+        Return the geoids of the tracts in the top percent for a variable.
+
+        Tracts are ordered from best to worst, and include any tract at the
+        boundary (see :meth:`boundary`).
+        """
+        i = self._get_variable(variable)
+        key = self.boundary(variable, percent) * self._sign(i)
+        keys = self.sorted_keys[i, : self.counts[i]]
+        n = np.searchsorted(keys, key, side="right")
+        return self.geoids[self.order[i, :n]].tolist()
+
+
+def _get_index_key(dataset: SPIDataset) -> str:
+    """A hash of the SPI values and which variables are inverted."""
+    values = dataset.values
+    sha = hashlib.sha256(INDEX_FORMAT.encode())
+    sha.update(pd.util.hash_pandas_object(values, index=True).to_numpy().tobytes())
+    sha.update(repr(list(values.columns)).encode())
+    sha.update(dataset.meta.is_inverted(list(values.columns)).tobytes())
+    return sha.hexdigest()[:16]
+
+
+@lru_cache(maxsize=None)
+def get_rank_index(version: Literal["1", "2"] = "2") -> RankIndex:
+    """
+    Return the (cached) rank index for an SPI version.
+
+    The index is saved in the version's data folder, keyed by a hash of the
+    SPI values, and is only rebuilt if the values change.
+    """
+    dataset = get_spi_dataset(version=version)
+    path = DATA_DIR / f"v{version}" / f"ranks-{_get_index_key(dataset)}.npz"
+
+    with span("get_rank_index", "spi", version=version) as args:
+        args["cached"] = path.exists()
+        if not args["cached"]:
+            # Remove stale indexes and save
+            for stale in path.parent.glob("ranks-*.npz"):
+                stale.unlink(missing_ok=True)
+            RankIndex.from_dataset(dataset).save(path)
+
+        return RankIndex.load(path)
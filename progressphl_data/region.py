@@ -0,0 +1,83 @@
+from __future__ import annotations
+
+import os
+from concurrent.futures import ProcessPoolExecutor
+from typing import Callable
+
+import pandas as pd
+
+from .census_indicators import GEOGRAPHIES, get_census_indicators
+from .scope import Scope, get_region_scopes
+
+__all__ = ["get_regional_census_indicators", "run_by_county"]
+
+
+def run_by_county(
+    func: Callable[..., pd.DataFrame],
+    scopes: list[Scope] | None = None,
+    max_workers: int | None = None,
+    **kwargs,
+) -> pd.DataFrame:
+    """
+    Run a function for each county across a process pool and merge the results.
+
+    The function is called as ``func(scope=scope, **kwargs)`` in a separate
+    process for each county, so it (and its arguments) must be picklable.
+    Census API responses and boundary files are cached on disk, so they
+    are shared by all processes and reused on later runs.
+
+    Parameters
+    ----------
+    func :
+        The function to run; it should return a data frame
+    scopes :
+        The counties to run for; by default, the Philadelphia region
+    max_workers :
+        The maximum number of processes; by default, one per county (up to
+        the number of CPUs)
+
+    Returns
+    -------
+    The combined results, with a "fips" column identifying the county.
+    """
+    if scopes is None:
+        scopes = get_region_scopes()
+    if max_workers is None:
+        max_workers = min(len(scopes), os.cpu_count() or 1)
+
+    with ProcessPoolExecutor(max_workers=max_workers) as executor:
+        futures = [executor.submit(func, scope=scope, **kwargs) for scope in scopes]
+
+        # Combine in order, raising the first error
+        results = []
+        for scope, future in zip(scopes, futures):
+            try:
+                results.append(future.result().assign(fips=scope.fips))
+            except BaseException:
+                for other in futures:
+                    other.cancel()
+                raise
+
+    return pd.concat(results, ignore_index=True)
+
+
+def get_regional_census_indicators(
+    scopes: list[Scope] | None = None,
+    max_workers: int | None = None,
+    geographies: list[str] = GEOGRAPHIES,
+) -> pd.DataFrame:
+    """
+    Get census-based indicators for every county in the region.
+
+    Each row keeps its "geoid" and "geography", since names can repeat
+    across counties and geographies. Outside of Philadelphia, only
+    tract-level (and block-group-level) indicators are calculated. See
+    :func:`run_by_county` for a description of the parameters.
+    """
+    return run_by_county(
+        get_census_indicators,
+        scopes=scopes,
+        max_workers=max_workers,
+        geographies=geographies,
+        with_geography=True,
+    )
@@ -0,0 +1,78 @@
+from __future__ import annotations
+
+from dataclasses import dataclass
+
+__all__ = ["PHILADELPHIA", "REGION", "Scope", "get_region_scopes"]
+
+
+@dataclass(frozen=True)
+class Scope:
+    """
+    The geographic extent of a run: a single county, or a whole state.
+
+    Parameters
+    ----------
+    state :
+        The two-digit state FIPS code
+    county :
+        The three-digit county FIPS code; if None, the whole state
+    puma_pattern :
+        If provided, only keep PUMAs whose name contains this string (PUMAs
+        are requested for the whole state)
+    """
+
+    state: str = "42"
+    county: str | None = "101"
+    puma_pattern: str | None = None
+
+    @classmethod
+    def from_fips(cls, fips: str) -> Scope:
+        """Create a scope from a two-digit state or five-digit county FIPS code."""
+        if len(fips) == 2:
+            return cls(state=fips, county=None)
+        elif len(fips) == 5:
+            if fips == PHILADELPHIA.fips:
+                return PHILADELPHIA
+            return cls(state=fips[:2], county=fips[2:])
+        raise ValueError(f"Invalid FIPS code '{fips}'; expected 2 or 5 digits")
+
+    @property
+    def fips(self) -> str:
+        """The state or state + county FIPS code."""
+        return self.state + (self.county or "")
+
+    def census_params(self, geography: str) -> dict[str, str]:
+        """The "for" and "in" parameters for a Census API query."""
+        county = self.county or "*"
+        if geography == "tract":
+            return {"for": "tract:*", "in": f"state:{self.state} county:{county}"}
+        elif geography == "county":
+            return {"for": f"county:{county}", "in": f"state:{self.state}"}
+        elif geography in ["block group", "block"]:
+            return {
+                "for": f"{geography}:*",
+                "in": f"state:{self.state} county:{county} tract:*",
+            }
+        elif geography == "puma":
+            return {"for": "public use microdata area:*", "in": f"state:{self.state}"}
+        else:
+            raise ValueError("Unrecognized 'geography' keyword")
+
+
+# The default scope
+PHILADELPHIA = Scope(state="42", county="101", puma_pattern="Philadelphia City")
+
+# The counties in the Philadelphia region (DVRPC), by state
+REGION = {
+    "42": ["017", "029", "045", "091", "101"],
+    "34": ["005", "007", "015", "021"],
+}
+
+
+def get_region_scopes() -> list[Scope]:
+    """Return a scope for each county in the Philadelphia region."""
+    return [
+        Scope.from_fips(state + county)
+        for state, counties in REGION.items()
+        for county in counties
+    ]
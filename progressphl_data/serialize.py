@@ -0,0 +1,334 @@
+from __future__ import annotations
+
+import gzip
+import re
+from io import BytesIO
+from typing import BinaryIO, Dict, Literal, Union
+
+import numpy as np
+import orjson
+import pandas as pd
+
+__all__ = [
+    "bundle",
+    "compress",
+    "decimals_from_fmt",
+    "dumps",
+    "from_columnar",
+    "grouped_records_to_json",
+    "grouped_to_columnar",
+    "records_to_json",
+    "to_columnar",
+]
+
+# The supported content encodings
+ENCODINGS = ["gzip", "br", "identity"]
+
+# The supported output formats
+FORMATS = ["records", "columnar"]
+
+# Decimals for each column, optionally per group
+Decimals = Dict[str, Union[int, Dict[str, int]]]
+
+
+def dumps(obj) -> bytes:
+    """
+    Serialize an object to JSON bytes.
+
+    NaN and infinite values are written as null.
+    """
+    return orjson.dumps(obj, option=orjson.OPT_SERIALIZE_NUMPY)
+
+
+def records_to_json(df: pd.DataFrame) -> bytes:
+    """Serialize a data frame to JSON bytes as a list of records."""
+    return df.to_json(orient="records").encode("utf-8")
+
+
+def grouped_records_to_json(
+    df: pd.DataFrame, by: str, fp: BinaryIO | None = None
+) -> bytes | None:
+    """
+    Serialize a data frame to a JSON object of records grouped by a column.
+
+    The output maps each unique value of ``by`` (in order of appearance) to
+    the list of records for that value, without the ``by`` column. The frame
+    is converted to records once and each group is streamed to the output,
+    so the time is linear in the number of rows.
+
+    Parameters
+    ----------
+    df :
+        The data to serialize
+    by :
+        The column to group by
+    fp :
+        A binary file-like object to write to; if not provided, the JSON
+        bytes are returned
+
+    Returns
+    -------
+    The JSON bytes, if ``fp`` is not provided.
+    """
+    # Group positions, in order of first appearance
+    uniques, order, bounds = _get_group_positions(df[by])
+
+    # Convert to records in a single pass
+    records = df.drop(columns=[by]).iloc[order].to_dict(orient="records")
+
+    # Stream each group
+    out = BytesIO() if fp is None else fp
+    out.write(b"{")
+    for i, key in enumerate(uniques):
+        if i > 0:
+            out.write(b",")
+        out.write(dumps(str(key)))
+        out.write(b":")
+        out.write(dumps(records[bounds[i] : bounds[i + 1]]))
+    out.write(b"}")
+
+    if fp is None:
+        return out.getvalue()
+
+
+def decimals_from_fmt(fmt: str | None, default: int = 2) -> int:
+    """
+    Return the number of decimals to keep for a d3-style format string.
+
+    For example, ".1f" gives 1, ".0%" gives 2, and ",d" gives 0.
+    """
+    fmt = fmt or ""
+    match = re.search(r"\.(\d+)([a-z%]?)$", fmt)
+    if match is None:
+        return 0 if fmt.endswith("d") else default
+    decimals = int(match.group(1))
+    return decimals + 2 if match.group(2) == "%" else decimals
+
+
+def _get_group_positions(
+    values: pd.Series,
+) -> tuple[pd.Index, np.ndarray, np.ndarray]:
+    """
+    Return the unique values, sort order, and group bounds of a column.
+
+    The rows of the i-th unique value (in order of first appearance) are
+    ``order[bounds[i]:bounds[i + 1]]``, in their original order. Missing
+    values aren't in any group.
+    """
+    codes, uniques = pd.factorize(values, sort=False)
+    order = np.argsort(codes, kind="stable")
+    bounds = np.searchsorted(codes[order], np.arange(len(uniques) + 1))
+    return uniques, order, bounds
+
+
+def _encode_column(values: pd.Series, dictionary: list) -> np.ndarray:
+    """Dictionary-encode a column, extending the shared dictionary if needed."""
+    known = set(dictionary)
+    dictionary.extend(v for v in pd.unique(values.dropna()) if v not in known)
+    return pd.Index(dictionary).get_indexer(values)
+
+
+def _quantize(values: np.ndarray, decimals: int | None) -> list:
+    """Round numeric values, writing whole numbers as integers."""
+    if decimals is None:
+        return values.tolist()
+    rounded = np.round(values.astype(float), decimals)
+    if decimals > 0:
+        return rounded.tolist()
+
+    # Whole numbers, with None for missing values
+    missing = ~np.isfinite(rounded)
+    out = np.where(missing, 0, rounded).astype(np.int64).astype(object)
+    out[missing] = None
+    return out.tolist()
+
+
+def _columns_to_dict(
+    df: pd.DataFrame, encoded: dict[str, np.ndarray], decimals: dict[str, int | None]
+) -> dict:
+    """Convert a frame to a dict of column arrays."""
+    columns = {}
+    for col in df.columns:
+        if col in encoded:
+            columns[col] = encoded[col].tolist()
+        elif pd.api.types.is_numeric_dtype(df[col]):
+            columns[col] = _quantize(df[col].to_numpy(), decimals.get(col))
+        else:
+            columns[col] = (
+                df[col].astype(object).where(df[col].notnull(), None).tolist()
+            )
+    return {"length": len(df), "columns": columns}
+
+
+def to_columnar(
+    df: pd.DataFrame,
+    dictionary_columns: list[str] | None = None,
+    decimals: dict[str, int] | None = None,
+) -> dict:
+    """
+    Convert a data frame to a columnar, dictionary-encoded payload.
+
+    The payload stores an array for each column. String columns listed in
+    ``dictionary_columns`` are stored as integer codes into a shared list of
+    unique values (-1 for missing values), and numeric columns are rounded
+    to the specified number of decimals.
+
+    Parameters
+    ----------
+    df :
+        The data to convert
+    dictionary_columns :
+        The columns to dictionary-encode
+    decimals :
+        The number of decimals to keep for numeric columns; columns that are
+        not listed are not rounded
+
+    Returns
+    -------
+    The payload, which can be read back with :func:`from_columnar`.
+    """
+    dictionaries = {col: [] for col in dictionary_columns or []}
+    encoded = {col: _encode_column(df[col], d) for col, d in dictionaries.items()}
+
+    return {
+        "format": "columnar",
+        "dictionaries": dictionaries,
+        **_columns_to_dict(df, encoded, decimals or {}),
+    }
+
+
+def grouped_to_columnar(
+    df: pd.DataFrame,
+    by: str,
+    dictionary_columns: list[str] | None = None,
+    decimals: Decimals | None = None,
+) -> dict:
+    """
+    Convert a data frame to a columnar payload for each group of a column.
+
+    This is the columnar equivalent of :func:`grouped_records_to_json`. The
+    dictionaries are shared across all groups, and the decimals for a column
+    can be specified per group.
+
+    Parameters
+    ----------
+    df :
+        The data to convert
+    by :
+        The column to group by
+    dictionary_columns :
+        The columns to dictionary-encode
+    decimals :
+        The number of decimals to keep for numeric columns, either a single
+        value or a mapping from group to decimals (missing groups are not
+        rounded)
+
+    Returns
+    -------
+    The payload, which can be read back with :func:`from_columnar`.
+    """
+    decimals = decimals or {}
+    uniques, order, bounds = _get_group_positions(df[by])
+    df = df.drop(columns=[by]).iloc[order]
+
+    # Encode the dictionary columns all at once
+    dictionaries = {col: [] for col in dictionary_columns or []}
+    encoded = {col: _encode_column(df[col], d) for col, d in dictionaries.items()}
+
+    groups = {}
+    for i, key in enumerate(uniques):
+        start, stop = bounds[i], bounds[i + 1]
+        group_decimals = {
+            col: (value.get(key) if isinstance(value, dict) else value)
+            for col, value in decimals.items()
+        }
+        groups[str(key)] = _columns_to_dict(
+            df.iloc[start:stop],
+            {col: codes[start:stop] for col, codes in encoded.items()},
+            group_decimals,
+        )
+
+    return {"format": "columnar", "dictionaries": dictionaries, "groups": groups}
+
+
+def from_columnar(payload: dict) -> pd.DataFrame | dict[str, pd.DataFrame]:
+    """
+    Read a columnar payload back into a data frame.
+
+    Grouped payloads are returned as a dictionary of data frames, keyed by
+    group. Use ``.to_dict(orient="records")`` to get the records format.
+    """
+    if payload.get("format") != "columnar":
+        raise ValueError("Input payload is not in the columnar format")
+
+    # The dictionaries, with a trailing missing value for code -1
+    dictionaries = {
+        col: np.asarray(values + [None], dtype=object)
+        for col, values in payload["dictionaries"].items()
+    }
+
+    def _decode(data):
+        columns = {}
+        for col, values in data["columns"].items():
+            if col in dictionaries:
+                columns[col] = dictionaries[col][np.asarray(values, dtype=np.int64)]
+            else:
+                columns[col] = values
+        return pd.DataFrame(columns, index=pd.RangeIndex(data["length"]))
+
+    if "groups" in payload:
+        return {key: _decode(data) for key, data in payload["groups"].items()}
+    return _decode(payload)
+
+
+def bundle(payloads: dict[str, bytes]) -> tuple[bytes, dict[str, list[int]]]:
+    """
+    Pack JSON payloads into a single file with a byte-offset index.
+
+    The bundle is a JSON array of the payloads, so it can be parsed as a
+    whole, and each payload can also be fetched on its own with an HTTP
+    range request (``Range: bytes={offset}-{offset + length - 1}``).
+
+    Parameters
+    ----------
+    payloads :
+        The serialized JSON payloads, keyed by name
+
+    Returns
+    -------
+    The bundle bytes and the index, mapping each name to its
+    ``[offset, length]`` in the bundle.
+    """
+    out = BytesIO()
+    index = {}
+
+    out.write(b"[")
+    for i, (name, body) in enumerate(payloads.items()):
+        if i > 0:
+            out.write(b",")
+        index[name] = [out.tell(), len(body)]
+        out.write(body)
+    out.write(b"]")
+
+    return out.getvalue(), index
+
+
+def compress(body: bytes, encoding: Literal["gzip", "br", "identity"]) -> bytes:
+    """
+    Compress a payload with the specified content encoding.
+
+    Gzip output is deterministic (no timestamp), so identical payloads
+    give identical bytes.
+    """
+    if encoding == "gzip":
+        return gzip.compress(body, compresslevel=9, mtime=0)
+    elif encoding == "br":
+        try:
+            import brotli
+        except ImportError:
+            raise ImportError("The 'brotli' package is required for 'br' encoding")
+        return brotli.compress(body, mode=brotli.MODE_TEXT)
+    elif encoding == "identity":
+        return body
+    else:
+        raise ValueError(f"Unrecognized encoding '{encoding}'; allowed: {ENCODINGS}")
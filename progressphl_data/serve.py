@@ -0,0 +1,426 @@
+"""A local HTTP service for querying the outputs of the ETL pipeline."""
+
+from __future__ import annotations
+
+import hashlib
+from dataclasses import dataclass
+from functools import lru_cache
+from http import HTTPStatus
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+import numpy as np
+import pandas as pd
+
+from .etl import get_data_stages
+from .pipeline import Pipeline
+from .ranks import RankIndex, get_rank_index
+from .serialize import _get_group_positions, compress, dumps, records_to_json
+
+__all__ = ["QueryService", "Response", "make_server"]
+
+# Only compress bodies larger than this, in bytes
+MIN_COMPRESS_SIZE = 512
+
+# The SPI columns that can be filtered on, keyed by query parameter
+SPI_FILTERS = {
+    "geoid": "geoid",
+    "neighborhood": "neighborhood_name",
+    "puma": "puma_name",
+    "variable": "variable",
+}
+
+# The census columns that can be filtered on, keyed by query parameter
+CENSUS_FILTERS = {"name": "name", "indicator": "indicator"}
+
+
+@dataclass(frozen=True)
+class Response:
+    """
+    A serialized response, with a precompressed copy of the body.
+
+    Parameters
+    ----------
+    status :
+        The HTTP status code
+    body :
+        The JSON body
+    etag :
+        The entity tag, a hash of the (uncompressed) body
+    gzipped :
+        The gzip-compressed body, if it is worth compressing
+    """
+
+    status: int
+    body: bytes
+    etag: str
+    gzipped: bytes | None = None
+
+    @classmethod
+    def from_body(cls, body: bytes, status: int = HTTPStatus.OK) -> Response:
+        """Create a response, hashing and compressing the body once."""
+        etag = f'W/"{hashlib.sha256(body).hexdigest()[:16]}"'
+        gzipped = None
+        if len(body) >= MIN_COMPRESS_SIZE:
+            gzipped = compress(body, "gzip")
+            if len(gzipped) >= len(body):
+                gzipped = None
+        return cls(status=int(status), body=body, etag=etag, gzipped=gzipped)
+
+
+def _index_positions(
+    data: pd.DataFrame, filters: dict[str, str]
+) -> dict[str, dict[str, np.ndarray]]:
+    """
+    Return the (sorted) row positions of each value, for each filter column.
+
+    Missing values aren't grouped, so they aren't indexed.
+    """
+    index = {}
+    for param, col in filters.items():
+        uniques, order, bounds = _get_group_positions(data[col])
+        index[param] = {
+            key: order[bounds[i] : bounds[i + 1]] for i, key in enumerate(uniques)
+        }
+    return index
+
+
+def _get_param(query: dict[str, list[str]], name: str) -> str:
+    """Return a required query parameter."""
+    if name not in query:
+        raise ValueError(f"'{name}' is required")
+    return query[name][-1]
+
+
+def _parse_int(query: dict[str, list[str]], name: str) -> int | None:
+    """Parse an optional integer query parameter."""
+    if name not in query:
+        return None
+    try:
+        return int(query[name][-1])
+    except ValueError:
+        raise ValueError(f"'{name}' must be an integer") from None
+
+
+class QueryService:
+    """
+    Lookups over the SPI data and census indicators, held in memory.
+
+    The outputs are loaded once, and the row positions of each geoid,
+    neighborhood, PUMA, variable, and census name are indexed up front, so a
+    lookup selects rows by position rather than filtering the whole frame.
+    The outputs don't change while the service is running, so responses
+    are serialized (and compressed) once and cached by path and query.
+
+    Parameters
+    ----------
+    spi :
+        The SPI data, as output by the ETL pipeline
+    census :
+        The census indicators, as output by the ETL pipeline
+    version :
+        The SPI version
+    ranks :
+        The rank index of the SPI variables, for the "/rank" and "/top"
+        endpoints
+    cache_size :
+        The maximum number of responses to cache
+
+    Examples
+    --------
+    >>> service = QueryService.load(version="2")
+    >>> service.spi({"neighborhood": ["Fishtown"], "variable": ["shelter"]})
+    >>> service.respond("/spi", "puma=South&min_rank=1&max_rank=10")
+    >>> service.respond("/top", "variable=shelter&percent=10")
+    """
+
+    def __init__(
+        self,
+        spi: pd.DataFrame,
+        census: pd.DataFrame,
+        version: str = "2",
+        ranks: RankIndex | None = None,
+        cache_size: int = 4096,
+    ):
+        self.version = version
+        self.ranks = ranks
+        self.spi_data = spi.reset_index(drop=True)
+        self.census_data = census.reset_index(drop=True)
+
+        # Index the row positions of each lookup value
+        self._spi_index = _index_positions(self.spi_data, SPI_FILTERS)
+        self._census_index = _index_positions(self.census_data, CENSUS_FILTERS)
+        self._ranks = self.spi_data["rank"].to_numpy()
+
+        # Cache serialized responses
+        self.respond = lru_cache(maxsize=cache_size)(self._respond)
+
+    def __repr__(self) -> str:
+        return (
+            f"QueryService(version={self.version!r}, spi={len(self.spi_data)}, "
+            f"census={len(self.census_data)})"
+        )
+
+    @classmethod
+    def load(cls, version: str = "2", **kwargs) -> QueryService:
+        """
+        Load the outputs of the ETL pipeline.
+
+        The census indicators are read from the pipeline's stage cache if the
+        ETL has been run; otherwise, they are calculated (and cached). The
+        rank index is loaded with :func:`get_rank_index`.
+        """
+        pipeline = Pipeline(get_data_stages(version))
+        outputs = pipeline.run(targets=["spi", "census"])
+        return cls(
+            outputs["spi"],
+            outputs["census"],
+            version=version,
+            ranks=get_rank_index(version=version),
+            **kwargs,
+        )
+
+    def _select(
+        self, index: dict, query: dict[str, list[str]], n_rows: int
+    ) -> np.ndarray:
+        """Return the positions of the rows matching all filters in the query."""
+        positions = None
+        for param, lookup in index.items():
+            if param not in query:
+                continue
+
+            # Rows matching any of the requested values
+            unknown = [value for value in query[param] if value not in lookup]
+            if unknown:
+                raise ValueError(f"Unknown {param}(s): {unknown}")
+            matches = np.concatenate([lookup[value] for value in query[param]])
+
+            # Rows matching all filters
+            if positions is None:
+                positions = np.unique(matches)
+            else:
+                positions = np.intersect1d(positions, matches)
+
+        if positions is None:
+            return np.arange(n_rows)
+        return positions
+
+    def spi(self, query: dict[str, list[str]]) -> pd.DataFrame:
+        """
+        Return the SPI data matching a query.
+
+        Parameters
+        ----------
+        query :
+            The values to match for each filter, as returned by
+            :func:`urllib.parse.parse_qs`: "geoid", "neighborhood", "puma",
+            and/or "variable"; rows matching any value of a filter are kept.
+            The "min_rank" and "max_rank" filters keep ranks within a range
+            (inclusive).
+        """
+        positions = self._select(self._spi_index, query, len(self.spi_data))
+
+        # Trim to the rank range
+        min_rank = _parse_int(query, "min_rank")
+        max_rank = _parse_int(query, "max_rank")
+        if min_rank is not None or max_rank is not None:
+            ranks = self._ranks[positions]
+            keep = np.ones(len(positions), dtype=bool)
+            if min_rank is not None:
+                keep &= ranks >= min_rank
+            if max_rank is not None:
+                keep &= ranks <= max_rank
+            positions = positions[keep]
+
+        return self.spi_data.iloc[positions]
+
+    def census(self, query: dict[str, list[str]]) -> pd.DataFrame:
+        """
+        Return the census indicators matching a query.
+
+        Parameters
+        ----------
+        query :
+            The values to match for each filter: "name" and/or "indicator"
+        """
+        positions = self._select(self._census_index, query, len(self.census_data))
+        return self.census_data.iloc[positions]
+
+    def rank(self, query: dict[str, list[str]]) -> dict:
+        """
+        Return where a tract falls for a variable.
+
+        The query must include a "geoid" and a "variable"; see
+        :meth:`RankIndex.locate`.
+        """
+        return self.ranks.locate(
+            _get_param(query, "geoid"), _get_param(query, "variable")
+        )
+
+    def top(self, query: dict[str, list[str]]) -> dict:
+        """
+        Return the tracts in the top percent for a variable, best first.
+
+        The query must include a "variable", and can include a "percent"
+        (10 by default); see :meth:`RankIndex.top`.
+        """
+        variable = _get_param(query, "variable")
+        percent = _parse_int(query, "percent")
+        if percent is None:
+            percent = 10
+        return {
+            "variable": variable,
+            "percent": percent,
+            "boundary": self.ranks.boundary(variable, percent),
+            "geoids": self.ranks.top(variable, percent),
+        }
+
+    def summary(self) -> dict:
+        """The endpoints and the values that can be looked up."""
+        endpoints = {
+            "/spi": list(SPI_FILTERS) + ["min_rank", "max_rank"],
+            "/census": list(CENSUS_FILTERS),
+        }
+        if self.ranks is not None:
+            endpoints.update(
+                {"/rank": ["geoid", "variable"], "/top": ["variable", "percent"]}
+            )
+        return {
+            "version": self.version,
+            "endpoints": endpoints,
+            **{param: list(index) for param, index in self._spi_index.items()},
+            "name": list(self._census_index["name"]),
+            "indicator": list(self._census_index["indicator"]),
+        }
+
+    def _respond(self, path: str, query_string: str) -> Response:
+        """Serialize the response for a path and query string."""
+        query = parse_qs(query_string)
+        try:
+            if path in ["/", "/summary"]:
+                body = dumps(self.summary())
+            elif path == "/spi":
+                body = records_to_json(self.spi(query))
+            elif path == "/census":
+                body = records_to_json(self.census(query))
+            elif path in ["/rank", "/top"] and self.ranks is not None:
+                body = dumps(self.rank(query) if path == "/rank" else self.top(query))
+            else:
+                return Response.from_body(
+                    dumps({"error": f"Unknown path '{path}'"}), HTTPStatus.NOT_FOUND
+                )
+        except ValueError as e:
+            return Response.from_body(dumps({"error": str(e)}), HTTPStatus.BAD_REQUEST)
+
+        return Response.from_body(body)
+
+
+def _accepts_gzip(header: str | None) -> bool:
+    """Whether an Accept-Encoding header allows gzip."""
+    for token in (header or "").split(","):
+        coding, _, params = token.strip().partition(";")
+        if coding.strip() in ["gzip", "*"]:
+            return params.replace(" ", "") not in ["q=0", "q=0.0", "q=0.00"]
+    return False
+
+
+def _matches(header: str | None, etag: str) -> bool:
+    """Whether an If-None-Match header matches an entity tag (weak comparison)."""
+    if header is None:
+        return False
+    if header.strip() == "*":
+        return True
+
+    def strip(tag):
+        tag = tag.strip()
+        return tag[2:] if tag.startswith("W/") else tag
+
+    return strip(etag) in [strip(tag) for tag in header.split(",")]
+
+
+class _QueryHandler(BaseHTTPRequestHandler):
+    """Serve the cached responses of a :class:`QueryService`."""
+
+    # Keep connections alive, sending the headers and body without delay
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+
+    service: QueryService
+    quiet: bool = False
+
+    def do_GET(self):
+        self._send(head=False)
+
+    def do_HEAD(self):
+        self._send(head=True)
+
+    def _send(self, head: bool):
+        url = urlsplit(self.path)
+        response = self.service.respond(url.path.rstrip("/") or "/", url.query)
+
+        # Nothing changed
+        common = {
+            "ETag": response.etag,
+            "Cache-Control": "no-cache",
+            "Vary": "Accept-Encoding",
+        }
+        if response.status == HTTPStatus.OK and _matches(
+            self.headers.get("If-None-Match"), response.etag
+        ):
+            self.send_response(HTTPStatus.NOT_MODIFIED)
+            for key, value in common.items():
+                self.send_header(key, value)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+
+        # Send the precompressed body, if accepted
+        body = response.body
+        self.send_response(response.status)
+        for key, value in common.items():
+            self.send_header(key, value)
+        self.send_header("Content-Type", "application/json")
+        if response.gzipped is not None and _accepts_gzip(
+            self.headers.get("Accept-Encoding")
+        ):
+            body = response.gzipped
+            self.send_header("Content-Encoding", "gzip")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        if not head:
+            self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        if not self.quiet:
+            super().log_message(format, *args)
+
+
+def make_server(
+    service: QueryService,
+    host: str = "127.0.0.1",
+    port: int = 8000,
+    quiet: bool = False,
+) -> ThreadingHTTPServer:
+    """
+    Return a threaded HTTP server for a query service.
+
+    Each connection is handled in its own thread. Call ``serve_forever()``
+    on the result to start serving.
+
+    Parameters
+    ----------
+    service :
+        The service to query
+    host :
+        The host to bind to
+    port :
+        The port to listen on; use 0 for any free port
+    quiet :
+        If True, don't log each request
+    """
+    handler = type(
+        "QueryHandler", (_QueryHandler,), {"service": service, "quiet": quiet}
+    )
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    return server
@@ -0,0 +1,249 @@
+from __future__ import annotations
+
+from typing import Literal
+
+import geopandas as gpd
+import numpy as np
+import pandas as pd
+import shapely
+
+from . import EPSG
+from .core import SPIDataset
+from .meta import get_metadata
+
+__all__ = [
+    "make_acs_data",
+    "make_block_groups",
+    "make_crosswalks",
+    "make_spi_data",
+    "make_spi_dataset",
+    "make_tracts",
+]
+
+# Size of each synthetic tract, in feet
+TRACT_SIZE = 5000
+
+
+def _make_tract_geoids(n_tracts: int) -> np.ndarray:
+    """Tract geoids (state + county + tract), with 1,000 tracts per county."""
+    i = np.arange(n_tracts)
+    county = i // 1000
+    state = 1 + county // 100
+    return np.char.add(
+        np.char.add(
+            np.char.zfill(state.astype(str), 2),
+            np.char.zfill((2 * (county % 100) + 1).astype(str), 3),
+        ),
+        np.char.zfill((100 * (i % 1000 + 1)).astype(str), 6),
+    ).astype(object)
+
+
+def make_tracts(n_tracts: int, size: float = TRACT_SIZE) -> gpd.GeoDataFrame:
+    """
+    Return a grid of square, tract-like polygons.
+
+    The grid is as close to square as possible, and the tracts have the same
+    columns as :func:`progressphl_data.geo.get_census_tracts`.
+
+    Parameters
+    ----------
+    n_tracts :
+        The number of tracts
+    size :
+        The width of each tract, in the units of the CRS (feet)
+    """
+    ncols = int(np.ceil(np.sqrt(n_tracts)))
+    i = np.arange(n_tracts)
+    x = (i % ncols) * size
+    y = (i // ncols) * size
+
+    geoids = _make_tract_geoids(n_tracts)
+    return gpd.GeoDataFrame(
+        {
+            "id": geoids,
+            "name": [f"Census Tract {int(g[-6:]) / 100:g}" for g in geoids],
+        },
+        geometry=shapely.box(x, y, x + size, y + size),
+        crs=f"EPSG:{EPSG}",
+    )
+
+
+def make_block_groups(
+    tracts: gpd.GeoDataFrame, block_groups_per_tract: int = 3
+) -> gpd.GeoDataFrame:
+    """
+    Split each tract into block groups.
+
+    Each tract is split into vertical strips, and the block group geoid is
+    the tract geoid plus the block group number.
+    """
+    n = block_groups_per_tract
+    xmin, ymin, xmax, ymax = tracts.geometry.bounds.to_numpy().T
+    width = (xmax - xmin) / n
+
+    j = np.tile(np.arange(n), len(tracts))
+    x0 = np.repeat(xmin, n) + j * np.repeat(width, n)
+    geoids = np.repeat(tracts["id"].to_numpy(), n) + (j + 1).astype(str).astype(object)
+    return gpd.GeoDataFrame(
+        {
+            "id": geoids,
+            "name": [f"Block Group {k + 1}" for k in j],
+            "tract_id": np.repeat(tracts["id"].to_numpy(), n),
+        },
+        geometry=shapely.box(
+            x0, np.repeat(ymin, n), x0 + np.repeat(width, n), np.repeat(ymax, n)
+        ),
+        crs=tracts.crs,
+    )
+
+
+def make_crosswalks(
+    tracts: gpd.GeoDataFrame,
+    tracts_per_neighborhood: int = 10,
+    neighborhoods_per_puma: int = 15,
+) -> tuple[pd.DataFrame, pd.DataFrame]:
+    """
+    Return tract-to-neighborhood and tract-to-PUMA crosswalks.
+
+    Consecutive tracts are grouped into neighborhoods, and consecutive
+    neighborhoods into PUMAs. The crosswalks have the same columns as the
+    cached crosswalk files.
+    """
+    geoids = tracts["id"].to_numpy()
+    i = np.arange(len(tracts))
+    hood = i // tracts_per_neighborhood
+    puma = hood // neighborhoods_per_puma
+
+    neighborhood_id = np.char.zfill(hood.astype(str), 5).astype(object)
+    neighborhood_name = "Neighborhood " + neighborhood_id
+    tract_id = np.char.zfill((i % tracts_per_neighborhood + 1).astype(str), 2).astype(
+        object
+    )
+
+    tract_hood_crosswalk = pd.DataFrame(
+        {
+            "tract_geoid_alt": geoids,
+            "neighborhood_id": neighborhood_id,
+            "neighborhood_name": neighborhood_name,
+            "tract_id": tract_id,
+            "tract_name": neighborhood_name + " " + tract_id,
+            "tract_geoid": neighborhood_id + tract_id,
+        }
+    )
+    tract_puma_crosswalk = pd.DataFrame(
+        {
+            "tract_geoid_alt": geoids,
+            "puma_id": np.char.zfill(puma.astype(str), 7).astype(object),
+            "puma_name": "PUMA " + np.char.zfill(puma.astype(str), 4).astype(object),
+        }
+    )
+    return tract_hood_crosswalk, tract_puma_crosswalk
+
+
+def make_spi_data(
+    tracts: gpd.GeoDataFrame,
+    version: Literal["1", "2"] = "2",
+    missing: float = 0.0,
+    seed: int = 42,
+) -> pd.DataFrame:
+    """
+    Return raw SPI data, in the same format as the SPI workbook.
+
+    The frame is indexed by (geoid, tract_name) and has a column for each
+    raw variable in the version's metadata. Values are uniformly distributed
+    between 0 and 100 (or 0 and 1 for variables that are stored as
+    fractions).
+
+    Parameters
+    ----------
+    tracts :
+        The tracts to generate data for
+    version :
+        The SPI version, which determines the variables
+    missing :
+        The fraction of values to set to NaN
+    seed :
+        The random seed
+    """
+    rng = np.random.default_rng(seed)
+    registry = get_metadata(version=version)
+    columns = list(registry.variables)
+
+    # Random values, with fractions for the rescaled variables
+    values = rng.uniform(0, 100, (len(tracts), len(columns)))
+    fractions = [registry.variables[col] in registry.rescale for col in columns]
+    values[:, fractions] /= 100
+    if missing > 0:
+        values[rng.random(values.shape) < missing] = np.nan
+
+    index = pd.MultiIndex.from_arrays(
+        [
+            tracts["id"].to_numpy(),
+            [f"{int(g[-6:]) / 100:g}" for g in tracts["id"]],
+        ],
+        names=["geoid", "tract_name"],
+    )
+    return pd.DataFrame(values, index=index, columns=columns)
+
+
+def make_spi_dataset(
+    n_tracts: int, version: Literal["1", "2"] = "2", seed: int = 42
+) -> SPIDataset:
+    """
+    Return an SPI dataset for synthetic tracts, neighborhoods, and PUMAs.
+
+    See :func:`make_tracts`, :func:`make_crosswalks`, and
+    :func:`make_spi_data`.
+    """
+    tracts = make_tracts(n_tracts)
+    tract_hood_crosswalk, tract_puma_crosswalk = make_crosswalks(tracts)
+    geographies = tract_hood_crosswalk[
+        ["tract_geoid_alt", "neighborhood_name", "tract_id"]
+    ].merge(
+        tract_puma_crosswalk[["tract_geoid_alt", "puma_name"]], on="tract_geoid_alt"
+    )
+
+    return SPIDataset(
+        version=version,
+        data=make_spi_data(tracts, version=version, seed=seed),
+        geographies=geographies,
+    )
+
+
+def make_acs_data(
+    geographies: gpd.GeoDataFrame | pd.DataFrame,
+    variables: list[str] | int = 20,
+    seed: int = 42,
+) -> pd.DataFrame:
+    """
+    Return ACS-shaped data, in the same format as :func:`get_acs`.
+
+    Parameters
+    ----------
+    geographies :
+        The geographies (e.g., tracts or block groups) to generate data for,
+        with "id" and "name" columns
+    variables :
+        The variable names, or the number of variables to generate
+    seed :
+        The random seed
+
+    Returns
+    -------
+    A tidy frame with "id", "name", "variable", "estimate", and "moe"
+    columns, with a row for each geography and variable.
+    """
+    rng = np.random.default_rng(seed)
+    if isinstance(variables, int):
+        variables = [f"variable_{i}" for i in range(variables)]
+    n = len(geographies) * len(variables)
+
+    return pd.DataFrame(
+        {
+            "id": np.repeat(geographies["id"].to_numpy(), len(variables)),
+            "name": np.repeat(geographies["name"].to_numpy(), len(variables)),
+            "variable": np.tile(np.asarray(variables, dtype=object), len(geographies)),
+            "estimate": rng.integers(0, 5000, n).astype(float),
+            "moe": rng.integers(0, 500, n).astype(float),
+        }
+    )
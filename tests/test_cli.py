@@ -0,0 +1,17 @@
+"""Tests for the command line tool."""
+
+import importlib.util
+
+import pytest
+from click.testing import CliRunner
+
+from progressphl_data.__main__ import cli
+
+
+@pytest.mark.skipif(
+    importlib.util.find_spec("brotli") is not None, reason="brotli is installed"
+)
+def test_etl_br_without_brotli():
+    result = CliRunner().invoke(cli, ["etl", "--encoding", "br"])
+    assert result.exit_code == 2
+    assert "brotli" in result.output
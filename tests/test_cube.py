@@ -0,0 +1,27 @@
+"""Tests for the indicator cube."""
+
+import numpy as np
+import pandas as pd
+
+from progressphl_data.cube import IndicatorCube
+
+
+def test_save_load(tmp_path):
+    data = pd.DataFrame(
+        {
+            "name": ["Fishtown 1", "Fishtown 1", "Kensington 2"],
+            "indicator": ["poverty_rate", "shelter", "poverty_rate"],
+            "estimate": [0.2, 61.5, 0.3],
+        }
+    )
+    cube = IndicatorCube.from_frame(data, geoids={"Fishtown 1": "42101000100"})
+    cube.save(tmp_path)
+
+    # Only the values and labels are left
+    assert sorted(p.name for p in tmp_path.iterdir()) == ["labels.json", "values.npy"]
+
+    loaded = IndicatorCube.load(tmp_path)
+    assert loaded.values.shape == (2, 2)
+    assert loaded.get("42101000100", "shelter") == 61.5
+    assert np.isnan(loaded.get("Kensington 2", "shelter"))
+    assert loaded.indicator("poverty_rate").tolist() == [0.2, 0.3]
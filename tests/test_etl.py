@@ -0,0 +1,45 @@
+"""Smoke tests for the outputs of the ETL pipeline."""
+
+from progressphl_data.etl import Output
+from progressphl_data.profiling import Profiler
+from progressphl_data.publish import S3Publisher
+
+
+class FakeS3Client:
+    """Record the objects put to s3."""
+
+    def __init__(self):
+        self.objects = {}
+
+    def put_object(self, Bucket, Key, Body, **kwargs):
+        self.objects[Key] = Body
+        return {"ResponseMetadata": {"HTTPStatusCode": 200, "RetryAttempts": 0}}
+
+
+def _get_output(tmp_path, client):
+    publisher = S3Publisher(bucket="test", client=client, max_workers=2)
+    return Output(publisher=publisher, version="2", folder=tmp_path)
+
+
+def test_publish(tmp_path):
+    client = FakeS3Client()
+    output = _get_output(tmp_path, client)
+
+    output.publish("census-data/Fishtown.json", b"[]")
+    output.publisher.close()
+
+    assert (tmp_path / "census-data" / "Fishtown.json").read_bytes() == b"[]"
+    assert list(client.objects) == ["v2/census-data/Fishtown.json"]
+
+
+def test_publish_profiled(tmp_path):
+    client = FakeS3Client()
+    output = _get_output(tmp_path, client)
+
+    with Profiler(memory=False) as profiler:
+        output.publish("spi-data.json", b"{}")
+        output.publisher.close()
+
+    assert list(client.objects) == ["v2/spi-data.json"]
+    write = next(s for s in profiler.spans if s.name == "write")
+    assert write.args["name"] == "spi-data.json"
@@ -0,0 +1,39 @@
+"""Tests for the pipeline's stage cache."""
+
+import pytest
+
+from progressphl_data.pipeline import Pipeline, Stage
+
+
+def test_cache_key(tmp_path):
+    calls = []
+
+    def compute(year):
+        calls.append(year)
+        return year
+
+    def run(key="", year=2019):
+        stage = Stage("census", compute, params={"year": year}, cache=True, key=key)
+        return Pipeline([stage], cache_dir=tmp_path).run()["census"]
+
+    # Cached
+    assert run() == 2019
+    assert run() == 2019
+    assert calls == [2019]
+
+    # Recalculated when the parameters or the key change
+    assert run(year=2020) == 2020
+    assert run(key="changed", year=2020) == 2020
+    assert calls == [2019, 2020, 2020]
+
+
+def test_cache_partial(tmp_path):
+    def compute():
+        # Fails to pickle after the list is partly written
+        return [b"x" * 100_000, lambda: None]
+
+    # A failed save leaves no output to load on the next run
+    stage = Stage("census", compute, cache=True)
+    with pytest.raises(Exception):
+        Pipeline([stage], cache_dir=tmp_path).run()
+    assert not list(tmp_path.glob("census-*.pkl"))
@@ -0,0 +1,125 @@
+"""Tests for publishing to s3, against a mocked bucket."""
+
+import json
+import threading
+
+import boto3
+import pytest
+from botocore.exceptions import ConnectionClosedError
+from moto import mock_aws
+
+from progressphl_data.publish import S3Publisher
+
+BUCKET = "test"
+
+
+@pytest.fixture
+def client():
+    with mock_aws():
+        client = boto3.client("s3", region_name="us-east-1")
+        client.create_bucket(Bucket=BUCKET)
+        yield client
+
+
+def _list_keys(client) -> list[str]:
+    response = client.list_objects_v2(Bucket=BUCKET)
+    return sorted(obj["Key"] for obj in response.get("Contents", []))
+
+
+def _publish(client, objects: dict, **kwargs) -> S3Publisher:
+    with S3Publisher(
+        bucket=BUCKET, client=client, manifest_key="v2/manifest.json", **kwargs
+    ) as publisher:
+        for key, body in objects.items():
+            publisher.put(key, body)
+    return publisher
+
+
+def test_publish_unchanged(client):
+    objects = {"v2/a.json": b"[1]", "v2/b.json": b"[2]"}
+    _publish(client, objects)
+
+    # Unchanged objects are skipped, and removed objects are deleted
+    publisher = _publish(client, {"v2/a.json": b"[1]"})
+    assert (publisher.objects, publisher.skipped_objects) == (0, 1)
+    assert _list_keys(client) == ["v2/a.json", "v2/manifest.json"]
+
+
+def test_publish_stale_local_manifest(client, tmp_path):
+    objects = {"v2/a.json": b"[1]", "v2/b.json": b"[2]"}
+
+    # A local manifest from another bucket matches every object
+    manifest_path = tmp_path / "manifest.json"
+    _publish(client, objects, manifest_path=manifest_path)
+    client.delete_objects(
+        Bucket=BUCKET,
+        Delete={"Objects": [{"Key": key} for key in _list_keys(client)]},
+    )
+    assert json.loads(manifest_path.read_text()).keys() == objects.keys()
+
+    # Without a manifest on s3, everything is uploaded
+    publisher = _publish(client, objects, manifest_path=manifest_path)
+    assert (publisher.objects, publisher.skipped_objects) == (2, 0)
+    assert _list_keys(client) == ["v2/a.json", "v2/b.json", "v2/manifest.json"]
+
+
+def _fail_once(publisher: S3Publisher) -> list[str]:
+    """Respond to the first upload with a transient error."""
+    failures = []
+
+    def fail(request, **kwargs):
+        if not failures:
+            failures.append(request.url)
+            raise ConnectionClosedError(endpoint_url=request.url)
+
+    publisher.client.meta.events.register_first("before-send.s3.PutObject", fail)
+    return failures
+
+
+def test_publish_retry(client):
+    # The publisher's own client retries transient errors
+    with S3Publisher(bucket=BUCKET) as publisher:
+        failures = _fail_once(publisher)
+        publisher.put("v2/a.json", b"[1]")
+
+    assert len(failures) == 1
+    assert (publisher.objects, publisher.retries) == (1, 1)
+    assert _list_keys(client) == ["v2/a.json"]
+
+    # Without retries, the error is raised
+    publisher = S3Publisher(bucket=BUCKET, max_retries=0)
+    _fail_once(publisher)
+    publisher.put("v2/b.json", b"[2]")
+    with pytest.raises(ConnectionClosedError):
+        publisher.close()
+    assert _list_keys(client) == ["v2/a.json"]
+
+
+def test_publish_bounded(client):
+    started = []
+    release = threading.Event()
+
+    def block(**kwargs):
+        started.append(1)
+        release.wait()
+
+    client.meta.events.register_first("before-send.s3.PutObject", block)
+    publisher = S3Publisher(bucket=BUCKET, client=client, max_workers=2)
+
+    def put_all():
+        for i in range(10):
+            publisher.put(f"v2/{i}.json", b"[]")
+
+    thread = threading.Thread(target=put_all)
+    thread.start()
+    thread.join(timeout=0.5)
+
+    # Two uploads are running, two are queued, and put() blocks
+    assert thread.is_alive()
+    assert len(started) == 2
+    assert len(publisher._futures) == 4
+
+    release.set()
+    thread.join()
+    publisher.close()
+    assert publisher.objects == 10
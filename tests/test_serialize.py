@@ -0,0 +1,33 @@
+"""Tests for serializing grouped outputs."""
+
+import json
+
+import numpy as np
+import pandas as pd
+
+from progressphl_data.serialize import grouped_records_to_json
+from progressphl_data.serve import _index_positions
+
+
+def _get_data():
+    return pd.DataFrame(
+        {
+            "variable": ["shelter", "water", None, "shelter", np.nan],
+            "value": [1, 2, 3, 4, 5],
+        }
+    )
+
+
+def test_grouped_records_to_json():
+    # Groups are in order of appearance, and rows without a group are dropped
+    assert json.loads(grouped_records_to_json(_get_data(), by="variable")) == {
+        "shelter": [{"value": 1}, {"value": 4}],
+        "water": [{"value": 2}],
+    }
+
+
+def test_index_positions():
+    index = _index_positions(_get_data(), {"var": "variable"})
+    assert list(index["var"]) == ["shelter", "water"]
+    assert index["var"]["shelter"].tolist() == [0, 3]
+    assert index["var"]["water"].tolist() == [1]
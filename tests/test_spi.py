@@ -0,0 +1,19 @@
+"""Tests for the SPI dataset."""
+
+from concurrent.futures import ThreadPoolExecutor
+
+from progressphl_data.synthetic import make_spi_dataset
+
+
+def test_concurrent_materialize():
+    # The ETL builds the SPI data and the quantiles at the same time
+    for seed in range(10):
+        dataset = make_spi_dataset(384, seed=seed)
+        with ThreadPoolExecutor(max_workers=2) as executor:
+            data = executor.submit(dataset.to_frame)
+            quantiles = executor.submit(dataset.quantiles)
+            data, quantiles = data.result(), quantiles.result()
+
+        n_variables = len(dataset.values.columns)
+        assert len(data) == 384 * n_variables
+        assert quantiles.index.is_unique and len(quantiles) == n_variables